@@ -1,96 +1,410 @@
 # dependency_extracton/backend/api/ast_parser.py
 import os
 import ast
+import time
+import signal
 import subprocess
-from typing import Dict, Any
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Tuple, Union
 from bs4 import BeautifulSoup  # For HTML parsing
-import clang.cindex  # For C/C++ parsing
-import tempfile
 import re
+from bisect import bisect_left
 import javalang
 import esprima
+try:
+    import resource  # Unix only; memory budgets are skipped elsewhere
+except ImportError:
+    resource = None
+from backend.api.parse_cache import get_parse_cache, content_key
+from backend.api.file_filter import PathFilter, filter_from_files, walk_directory
+from backend.api.cpp_parser import (  # C/C++ parsing with libclang
+    parse_cpp_file, parse_cpp_source, extract_cpp_info, compile_args_for, find_compile_database, CompileDatabase,
+    COMPILE_DATABASE_LOCATIONS,
+)
+from backend.api.symbols import SourceLines, make_symbol, symbol_from_offsets
+from backend.api.module_resolver import JS_CONFIG_FILES, extract_js_config_info
+
+def read_source(file_path: str) -> str:
+    with open(file_path, 'r') as file:
+        return file.read()
 
 # Python AST Parsing
 def parse_python_file(file_path: str) -> ast.AST:
-    with open(file_path, 'r') as file:
-        file_content = file.read()
-    tree = ast.parse(file_content, filename=file_path)
-    return tree
+    return parse_python_source(read_source(file_path), file_path)
 
-def extract_python_info(tree: ast.AST) -> Dict[str, Any]:
-    info = {
-        "functions": [],
-        "classes": [],
-        "imports": []
-    }
+def parse_python_source(source: str, file_path: str = '<unknown>') -> ast.AST:
+    return ast.parse(source, filename=file_path)
 
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            info["functions"].append(node.name)
-        elif isinstance(node, ast.ClassDef):
-            info["classes"].append(node.name)
-        elif isinstance(node, ast.Import):
-            for alias in node.names:
-                info["imports"].append(alias.name)
-        elif isinstance(node, ast.ImportFrom):
-            for alias in node.names:
-                info["imports"].append(f"{node.module}.{alias.name}")
-    
-    return info
+class _PythonSymbolVisitor(ast.NodeVisitor):
+    """Collects names, imports and symbols in one pass, tracking the enclosing class/function."""
+
+    def __init__(self, lines: Optional[SourceLines]):
+        self.lines = lines
+        self.info = {
+            "functions": [],
+            "classes": [],
+            "imports": [],
+            "symbols": []
+        }
+        self.scope = []  # (kind, qualified name) of the enclosing definitions
+
+    def _add_symbol(self, kind: str, node: ast.AST) -> str:
+        parent = self.scope[-1][1] if self.scope else None
+        # A decorated definition starts at its first decorator, whose `@` sits at the definition's indentation
+        start_line = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        start_byte = end_byte = None
+        if self.lines is not None:
+            start_byte = self.lines.line_byte(start_line) + node.col_offset
+            end_byte = self.lines.line_byte(node.end_lineno) + node.end_col_offset
+        symbol = make_symbol(kind, node.name, parent, start_line, node.end_lineno, start_byte, end_byte)
+        self.info["symbols"].append(symbol)
+        return symbol["qualified_name"]
+
+    def _visit_scope(self, kind: str, node: ast.AST) -> None:
+        self.scope.append((kind, self._add_symbol(kind, node)))
+        self.generic_visit(node)
+        self.scope.pop()
+
+    def visit_FunctionDef(self, node: ast.AST) -> None:
+        self.info["functions"].append(node.name)
+        in_class = bool(self.scope) and self.scope[-1][0] == 'class'
+        self._visit_scope('method' if in_class else 'function', node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.info["classes"].append(node.name)
+        self._visit_scope('class', node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.info["imports"].append(alias.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        # Relative imports keep their leading dots: `.models.User`, or `.views` for `from . import views`
+        module = '.' * node.level + (node.module or '')
+        for alias in node.names:
+            self.info["imports"].append(f"{module}.{alias.name}" if node.module else f"{module}{alias.name}")
+
+def extract_python_info(tree: ast.AST, source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Function, class and import names, plus a `symbols` entry per function,
+    method and class with its span. Byte offsets need the `source` the tree
+    was parsed from and are None without it.
+    """
+    visitor = _PythonSymbolVisitor(SourceLines(source) if source is not None else None)
+    visitor.visit(tree)
+    return visitor.info
 
 # JavaScript AST Parsing (using esprima)
 def parse_javascript_file(file_path: str) -> Dict:
-    with open(file_path, 'r') as file:
-        content = file.read()
-    return esprima.parseModule(content, {'jsx': True, 'tokens': True})
+    return parse_javascript_source(read_source(file_path))
 
-def extract_javascript_info(parsed_data: esprima.nodes.Module) -> Dict[str, Any]:
+def parse_javascript_source(source: str) -> Dict:
+    return esprima.parseModule(source, {'jsx': True, 'tokens': True, 'range': True, 'loc': True})
+
+def _esprima_symbol(kind: str, name: str, parent: Optional[str], node: Any,
+                    lines: Optional[SourceLines]) -> Dict[str, Any]:
+    start_byte = end_byte = None
+    if lines is not None:
+        start_byte, end_byte = lines.byte(node.range[0]), lines.byte(node.range[1])
+    return make_symbol(kind, name, parent, node.loc.start.line, node.loc.end.line, start_byte, end_byte)
+
+def extract_javascript_info(parsed_data: esprima.nodes.Module, source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Top-level (and exported) functions and classes, imports, and a `symbols`
+    entry for each of them and for class methods. Byte offsets need the `source`.
+    """
     info = {
         "functions": [],
         "classes": [],
-        "imports": []
+        "imports": [],
+        "symbols": []
     }
-    
-    for node in parsed_data.body:
-        if isinstance(node, esprima.nodes.FunctionDeclaration):
+    lines = SourceLines(source) if source is not None else None
+
+    for statement in parsed_data.body:
+        node = statement
+        if isinstance(node, (esprima.nodes.ExportNamedDeclaration, esprima.nodes.ExportDefaultDeclaration)):
+            node = node.declaration
+        if isinstance(node, esprima.nodes.FunctionDeclaration) and node.id:
             info["functions"].append(node.id.name)
-        elif isinstance(node, esprima.nodes.ClassDeclaration):
+            info["symbols"].append(_esprima_symbol('function', node.id.name, None, statement, lines))
+        elif isinstance(node, esprima.nodes.ClassDeclaration) and node.id:
             info["classes"].append(node.id.name)
+            info["symbols"].append(_esprima_symbol('class', node.id.name, None, statement, lines))
+            for member in node.body.body:
+                name = getattr(member.key, 'name', None)  # string-literal keys have a value instead
+                if isinstance(member, esprima.nodes.MethodDefinition) and not member.computed and name:
+                    info["symbols"].append(_esprima_symbol('method', name, node.id.name, member, lines))
         elif isinstance(node, esprima.nodes.ImportDeclaration):
             if node.source.value:
                 info["imports"].append(node.source.value)
-    
+
+    return info
+
+# JavaScript/TypeScript scanning. One pass over the source in which the regex
+# engine skips everything except strings, comments, template and regex
+# literals, brackets and the few keywords that matter; it handles TypeScript
+# and JSX syntax esprima rejects, at a fraction of the cost.
+_JS_INTERESTING = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|$))
+  | (?P<string>'(?:[^'\\\n]|\\.)*'?|"(?:[^"\\\n]|\\.)*"?)
+  | (?P<template>`)
+  | (?P<slash>/)
+  | (?P<open>[{(\[])
+  | (?P<close>[})\]])
+  | (?<![\w$.])(?P<keyword>import|export|require|function|class)(?![\w$])
+""", re.VERBOSE)
+_JS_REGEX_LITERAL = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\]?)*/?[A-Za-z]*")
+_JS_TEMPLATE_CHUNK = re.compile(r"(?:[^`\\$]|\\[\s\S]|\$(?!\{))*")
+_JS_WORD_BEFORE = re.compile(r"[\w$]+$")
+_JS_CALL_ARGUMENT = re.compile(r"""\s*\(\s*(?:'((?:[^'\\\n]|\\.)*)'|"((?:[^"\\\n]|\\.)*)"|`([^`\\$]*)`)""")
+_JS_IMPORT_FROM = re.compile(r"""
+    import\s*(?:type\s+)?(?:[\w$\s,*{}]*?\bfrom\s*)?(?:'([^'\\\n]*)'|"([^"\\\n]*)")
+  | export\s+(?:type\s+)?(?:\*(?:\s*as\s+[\w$]+)?|\{[\w$\s,]*\})\s*from\s*(?:'([^'\\\n]*)'|"([^"\\\n]*)")
+""", re.VERBOSE)
+_JS_DECLARED_NAME = re.compile(r"\s*(?:\*\s*)?([A-Za-z_$][\w$]*)")
+_JS_DECLARATION_PREFIX = re.compile(r"(?:\b(?:export|default|async|declare|abstract)\s+)*\Z")
+_JS_SPACE = ' \t\r\n\f\v\u00a0\ufeff'
+# After these words a `/` starts a regex literal rather than a division
+_JS_REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                      'case', 'do', 'else', 'yield', 'await'}
+# After these words `function`/`class` start a declaration rather than an expression
+_JS_DECLARATION_KEYWORDS = {'export', 'default', 'async', 'declare', 'abstract'}
+
+def _js_previous(source: str, pos: int) -> Tuple[Optional[str], bool]:
+    """The significant text just before `pos` (a word or one character) and whether a newline separates them."""
+    i = pos - 1
+    newline = False
+    while i >= 0 and source[i] in _JS_SPACE:
+        newline = newline or source[i] == '\n'
+        i -= 1
+    if i < 0:
+        return None, newline
+    word = _JS_WORD_BEFORE.search(source, max(0, i - 63), i + 1)
+    return (word.group() if word else source[i]), newline
+
+def _js_starts_statement(previous: Optional[str], newline: bool) -> bool:
+    if previous is None or previous in (';', '}') or previous in _JS_DECLARATION_KEYWORDS:
+        return True
+    if not newline:
+        return False
+    # Automatic semicolon insertion: a line break ends the statement unless the
+    # previous line ends mid-expression
+    if previous[0].isalnum() or previous[0] in '_$':
+        return previous not in _JS_REGEX_KEYWORDS and previous != 'extends'
+    return previous in (')', ']', '"', "'", '`')
+
+def scan_javascript_source(source: str) -> Dict[str, Any]:
+    """
+    Imports (static, dynamic, `require` and re-exports) plus top-level
+    functions and classes of a JavaScript or TypeScript module, without
+    building an AST. Each function and class also gets a `symbols` entry
+    spanning its declaration up to the closing brace of its body.
+    """
+    info = {
+        "functions": [],
+        "classes": [],
+        "imports": []
+    }
+
+    declarations = []  # [kind, name, start, end] of top-level functions and classes
+    pending = None  # declaration whose body has not opened yet: [declaration, end of its name, header done]
+    in_body = None  # top-level declaration whose body is open
+
+    stack = []  # open brackets, with '${' for template substitutions
+    pos, end = 0, len(source)
+    while pos < end:
+        match = _JS_INTERESTING.search(source, pos)
+        if match is None:
+            break
+        kind = match.lastgroup
+        pos = match.end()
+
+        if kind == 'template' or (kind == 'close' and stack and stack[-1] == '${'):
+            if kind == 'close':
+                stack.pop()
+            pos = _JS_TEMPLATE_CHUNK.match(source, pos).end()
+            if source.startswith('${', pos):
+                stack.append('${')
+                pos += 2
+            else:
+                pos += 1
+        elif kind == 'slash':
+            previous, _ = _js_previous(source, match.start())
+            if (previous is None or previous in _JS_REGEX_KEYWORDS or
+                    (len(previous) == 1 and not previous.isalnum() and previous not in ')]}<_$\'"')):
+                pos = _JS_REGEX_LITERAL.match(source, match.start()).end()
+        elif kind == 'open':
+            # A function body is the first top-level brace after its parameters, a class body the first one at all
+            if pending and not stack and match.group() == '{' and pending[2]:
+                in_body, pending = pending[0], None
+            stack.append(match.group())
+        elif kind == 'close':
+            if stack:
+                stack.pop()
+            if not stack:
+                if in_body:
+                    in_body[3] = pos
+                    in_body = None
+                elif pending and match.group() == ')':
+                    pending[2] = True
+        elif kind == 'keyword':
+            keyword = match.group()
+            if keyword in ('require', 'import'):
+                argument = _JS_CALL_ARGUMENT.match(source, pos)
+                if argument:
+                    info["imports"].append(next(group for group in argument.groups() if group is not None))
+                    pos = argument.end()
+                    continue
+            if stack:
+                continue
+            previous, newline = _js_previous(source, match.start())
+            if keyword in ('import', 'export'):
+                if previous is None or previous in (';', '}') or newline:
+                    statement = _JS_IMPORT_FROM.match(source, match.start())
+                    if statement:
+                        info["imports"].append(next(group for group in statement.groups() if group is not None))
+                        pos = statement.end()
+            elif _js_starts_statement(previous, newline):
+                name = _JS_DECLARED_NAME.match(source, pos)
+                if keyword == 'function' and name:
+                    info["functions"].append(name.group(1))
+                elif keyword == 'class' and name and name.group(1) not in ('extends', 'implements'):
+                    info["classes"].append(name.group(1))
+                else:
+                    continue
+                if pending:  # a bodiless declaration, e.g. a TypeScript overload
+                    pending[0][3] = pending[1]
+                prefix = _JS_DECLARATION_PREFIX.search(source, max(0, match.start() - 64), match.start())
+                declaration = [keyword, name.group(1), prefix.start(), None]
+                declarations.append(declaration)
+                pending = [declaration, name.end(), keyword == 'class']
+
+    if pending:
+        pending[0][3] = pending[1]
+    if in_body:
+        in_body[3] = end
+    lines = SourceLines(source)
+    info["symbols"] = [symbol_from_offsets(kind, name, None, lines, start, stop)
+                       for kind, name, start, stop in declarations]
     return info
 
 # Java AST Parsing (using javaparser)
 def parse_java_file(file_path: str) -> Dict:
-    with open(file_path, 'r') as file:
-        content = file.read()
-    return javalang.parse.parse(content)
+    return parse_java_source(read_source(file_path))
+
+def parse_java_source(source: str) -> Dict:
+    return javalang.parse.parse(source)
+
+_JAVA_SYMBOL_KINDS = {
+    javalang.tree.ClassDeclaration: 'class',
+    javalang.tree.InterfaceDeclaration: 'interface',
+    javalang.tree.EnumDeclaration: 'enum',
+    javalang.tree.AnnotationDeclaration: 'annotation',
+    javalang.tree.MethodDeclaration: 'method',
+    javalang.tree.ConstructorDeclaration: 'constructor',
+}
+
+class _JavaSpans:
+    """
+    Declaration spans from the token stream, since javalang only records
+    where a declaration starts: a span runs from its first annotation or
+    modifier to the brace closing its body, or to the `;` of a bodiless one.
+    """
+
+    def __init__(self, source: str):
+        self.lines = SourceLines(source)
+        self.tokens = list(javalang.tokenizer.tokenize(source))
+        self.positions = [(token.position.line, token.position.column) for token in self.tokens]
+        self.closing = {}
+        opened = []
+        for i, token in enumerate(self.tokens):
+            if token.value == '{':
+                opened.append(i)
+            elif token.value == '}' and opened:
+                self.closing[opened.pop()] = i
 
-def extract_java_info(parsed_data: javalang.tree.CompilationUnit) -> Dict[str, Any]:
+    def _offset(self, i: int, end: bool = False) -> int:
+        token = self.tokens[i]
+        offset = self.lines.offset(token.position.line, token.position.column - 1)
+        return offset + len(token.value) if end else offset
+
+    def span(self, node: javalang.ast.Node) -> Optional[Tuple[int, int]]:
+        first = min([node.position] + [annotation.position for annotation in getattr(node, 'annotations', None) or []
+                                       if annotation.position], key=tuple)
+        start = bisect_left(self.positions, tuple(first))
+        while start > 0 and isinstance(self.tokens[start - 1], javalang.tokenizer.Modifier):
+            start -= 1
+        depth = 0
+        for i in range(start, len(self.tokens)):
+            value = self.tokens[i].value
+            if value == '(':
+                depth += 1
+            elif value == ')':
+                depth -= 1
+            elif depth == 0 and value == ';':
+                return self._offset(start), self._offset(i, end=True)
+            elif depth == 0 and value == '{':
+                close = self.closing.get(i, len(self.tokens) - 1)
+                return self._offset(start), self._offset(close, end=True)
+        return None
+
+def extract_java_info(parsed_data: javalang.tree.CompilationUnit, source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Method, class and import names, plus a `symbols` entry per type, method
+    and constructor. Spans need the `source`; without it symbols only carry
+    their start line.
+    """
     info = {
         "functions": [],
         "classes": [],
-        "imports": []
+        "imports": [],
+        "symbols": []
     }
-    
-    for path, node in parsed_data.filter(javalang.tree.MethodDeclaration):
-        info["functions"].append(node.name)
-    
-    for path, node in parsed_data.filter(javalang.tree.ClassDeclaration):
-        info["classes"].append(node.name)
-    
+    spans = _JavaSpans(source) if source is not None else None
+
+    def visit(node, parent):
+        for child in node.children:
+            if isinstance(child, (list, tuple, set)):
+                for item in child:
+                    if isinstance(item, javalang.ast.Node):
+                        visit_node(item, parent)
+            elif isinstance(child, javalang.ast.Node):
+                visit_node(child, parent)
+
+    def visit_node(node, parent):
+        kind = _JAVA_SYMBOL_KINDS.get(type(node))
+        if kind is None or node.position is None:
+            visit(node, parent)
+            return
+        if kind == 'method':
+            info["functions"].append(node.name)
+        elif kind == 'class':
+            info["classes"].append(node.name)
+        span = spans.span(node) if spans is not None else None
+        if span is not None:
+            symbol = symbol_from_offsets(kind, node.name, parent, spans.lines, *span)
+        else:
+            symbol = make_symbol(kind, node.name, parent, node.position.line, node.position.line, None, None)
+        info["symbols"].append(symbol)
+        visit(node, symbol["qualified_name"])
+
+    visit(parsed_data, None)
+
     for imp in parsed_data.imports:
         info["imports"].append(imp.path)
-    
+
     return info
 
 # Go AST Parsing
 def parse_go_file(file_path: str) -> Dict:
-    with open(file_path, 'r') as file:
-        content = file.read()
-    return content
+    return read_source(file_path)
 
 def extract_go_info(parsed_data: str) -> Dict[str, Any]:
     info = {
@@ -118,37 +432,12 @@ def extract_go_info(parsed_data: str) -> Dict[str, Any]:
     
     return info
 
-# C/C++ AST Parsing using clang
-def parse_cpp_file(file_path: str) -> clang.cindex.TranslationUnit:
-    index = clang.cindex.Index.create()
-    tu = index.parse(file_path)
-    return tu
-
-def extract_cpp_info(tu: clang.cindex.TranslationUnit) -> Dict[str, Any]:
-    info = {
-        "functions": [],
-        "classes": [],
-        "imports": []
-    }
-
-    for node in tu.cursor.get_children():
-        if node.kind == clang.cindex.CursorKind.FUNCTION_DECL:
-            info["functions"].append(node.spelling)
-        elif node.kind == clang.cindex.CursorKind.CLASS_DECL:
-            info["classes"].append(node.spelling)
-        elif node.kind == clang.cindex.CursorKind.INCLUSION_DIRECTIVE:
-            included_file = node.get_included_file()
-            if included_file:
-                info["imports"].append(included_file.name)
-
-    return info
-
 # HTML Parsing
 def parse_html_file(file_path: str) -> BeautifulSoup:
-    with open(file_path, 'r') as file:
-        file_content = file.read()
-    soup = BeautifulSoup(file_content, 'html.parser')
-    return soup
+    return parse_html_source(read_source(file_path))
+
+def parse_html_source(source: str) -> BeautifulSoup:
+    return BeautifulSoup(source, 'html.parser')
 
 def extract_html_info(soup: BeautifulSoup) -> Dict[str, Any]:
     info = {
@@ -158,9 +447,7 @@ def extract_html_info(soup: BeautifulSoup) -> Dict[str, Any]:
 
 # SQL Parsing
 def parse_sql_file(file_path: str) -> str:
-    with open(file_path, 'r') as file:
-        file_content = file.read()
-    return file_content
+    return read_source(file_path)
 
 def extract_sql_info(sql_content: str) -> Dict[str, Any]:
     info = {
@@ -169,81 +456,385 @@ def extract_sql_info(sql_content: str) -> Dict[str, Any]:
     return info
 
 # Handling Non-Code Files
-def handle_non_code_file(file_path: str) -> Dict[str, Any]:
+def handle_non_code_file(file_path: str, size: int = None) -> Dict[str, Any]:
     return {
         "type": "non-code",
         "name": os.path.basename(file_path),
-        "size": os.path.getsize(file_path)
+        "size": os.path.getsize(file_path) if size is None else size
     }
 
 # Generic file parser
-def parse_code_file(file_path: str) -> Dict[str, Any]:
+LANGUAGES = {
+    '.py': 'python',
+    '.js': 'javascript', '.jsx': 'javascript', '.ts': 'javascript', '.tsx': 'javascript',
+    '.java': 'java',
+    '.go': 'go',
+    '.c': 'cpp', '.cpp': 'cpp', '.h': 'cpp', '.hpp': 'cpp',
+    '.html': 'html',
+    '.sql': 'sql',
+}
+CODE_EXTENSIONS = set(LANGUAGES)
+
+# Run the full esprima parse on JavaScript instead of the import/symbol scanner
+JAVASCRIPT_FULL_PARSE = os.getenv("VISDEP_JS_FULL_PARSE", "0") == "1"
+
+# Bump a language's version whenever its parser or extractor output changes;
+# cached results from other versions are then ignored.
+EXTRACTOR_VERSIONS = {
+    'python': 3,
+    'javascript': 3,
+    'javascript_ast': 2,
+    'java': 2,
+    'go': 1,
+    'cpp': 3,
+    'html': 1,
+    'sql': 1,
+}
+
+def parse_code_file(file_path: str, compile_args: Optional[List[str]] = None) -> Dict[str, Any]:
     file_extension = os.path.splitext(file_path)[1].lower()
+    if file_extension not in CODE_EXTENSIONS:
+        return handle_non_code_file(file_path)
+    try:
+        source = read_source(file_path)
+    except Exception as e:
+        return {"error": str(e)}
+    return parse_code_source(file_path, source, compile_args=compile_args)
+
+def parse_code_source(file_path: str, source: Union[str, bytes], javascript_ast: bool = JAVASCRIPT_FULL_PARSE,
+                      compile_args: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Parse an in-memory file; `file_path` only selects the parser and labels errors.
+    JavaScript/TypeScript is scanned rather than parsed unless `javascript_ast` is set.
+    C/C++ files are parsed with `compile_args`, or the default flags for their language.
+    """
+    language = LANGUAGES.get(os.path.splitext(file_path)[1].lower())
+    if language == 'javascript' and javascript_ast:
+        language = 'javascript_ast'
     try:
-        if file_extension == '.py':
-            tree = parse_python_file(file_path)
-            return extract_python_info(tree)
-        elif file_extension in ['.js', '.jsx', '.ts', '.tsx']:
-            parsed_data = parse_javascript_file(file_path)
-            return extract_javascript_info(parsed_data)
-        elif file_extension == '.java':
-            parsed_data = parse_java_file(file_path)
-            return extract_java_info(parsed_data)
-        elif file_extension == '.go':
-            parsed_data = parse_go_file(file_path)
-            return extract_go_info(parsed_data)
-        elif file_extension in ['.c', '.cpp', '.h', '.hpp']:
-            tu = parse_cpp_file(file_path)
-            return extract_cpp_info(tu)
-        elif file_extension == '.html':
-            soup = parse_html_file(file_path)
-            return extract_html_info(soup)
-        elif file_extension == '.sql':
-            sql_content = parse_sql_file(file_path)
-            return extract_sql_info(sql_content)
+        if isinstance(source, bytes):
+            source = source.decode('utf-8')
+        if language is None:
+            info = handle_non_code_file(file_path, len(source.encode('utf-8')))
+            if os.path.basename(file_path) in JS_CONFIG_FILES:
+                try:
+                    info.update(extract_js_config_info(source))
+                except (ValueError, AttributeError) as e:
+                    info["error"] = f"Unreadable {info['name']}: {e}"
+            return info
+
+        cache = get_parse_cache(EXTRACTOR_VERSIONS)
+        if cache is None:
+            return extract_source_info(language, file_path, source, compile_args)
+        # C/C++ results depend on the flags and where includes resolve from, so both are part of the key
+        if language == 'cpp':
+            compile_args = compile_args_for(file_path) if compile_args is None else compile_args
+            key = content_key(source, file_path, *compile_args)
         else:
-            return handle_non_code_file(file_path)
+            key = content_key(source)
+        info = cache.get(language, key)
+        if info is None:
+            info = extract_source_info(language, file_path, source, compile_args)
+            cache.put(language, key, info)
+        return info
+    except MemoryError:
+        raise  # a budget overrun, handled by the parse worker
     except Exception as e:
         return {"error": str(e)}
 
-def traverse_directory(directory_path: str) -> Dict[str, Any]:
-    ast_data = {}
+def extract_source_info(language: str, file_path: str, source: str,
+                        compile_args: Optional[List[str]] = None) -> Dict[str, Any]:
+    if language == 'python':
+        tree = parse_python_source(source, file_path)
+        return extract_python_info(tree, source)
+    elif language == 'javascript':
+        return scan_javascript_source(source)
+    elif language == 'javascript_ast':
+        parsed_data = parse_javascript_source(source)
+        return extract_javascript_info(parsed_data, source)
+    elif language == 'java':
+        parsed_data = parse_java_source(source)
+        return extract_java_info(parsed_data, source)
+    elif language == 'go':
+        return extract_go_info(source)
+    elif language == 'cpp':
+        tu = parse_cpp_source(source, file_path, compile_args)
+        return extract_cpp_info(tu, source)
+    elif language == 'html':
+        soup = parse_html_source(source)
+        return extract_html_info(soup)
+    elif language == 'sql':
+        return extract_sql_info(source)
+    raise ValueError(f"No extractor for {language}")
 
-    for root, _, files in os.walk(directory_path):
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_info = parse_code_file(file_path)
-            ast_data[file_path] = file_info
+# Parallel parsing
+PARSE_WORKERS = int(os.getenv("VISDEP_PARSE_WORKERS", str(os.cpu_count() or 1)))
+PARSE_CHUNK_SIZE = int(os.getenv("VISDEP_PARSE_CHUNK_SIZE", "16"))
+# Per-file budgets, enforced in worker processes; 0 disables either one
+PARSE_TIMEOUT_SECONDS = float(os.getenv("VISDEP_PARSE_TIMEOUT", "30"))
+PARSE_MEMORY_LIMIT_BYTES = int(os.getenv("VISDEP_PARSE_MEMORY_MB", "2048")) * 1024 * 1024
+# How long past its timeout a file stuck in native code may run before its worker exits
+PARSE_HARD_TIMEOUT_GRACE = 5.0
 
-    return ast_data
+_parse_pool = None
+_parse_pool_key = None
+_parse_pool_lock = threading.Lock()
+# Workers are spawned rather than forked: parsing is driven from server threads
+_parse_context = multiprocessing.get_context("spawn")
+
+ParseItem = Tuple[str, Optional[str], Optional[List[str]]]
+
+class ParseTimeout(BaseException):
+    """Raised in a parse worker when a file runs out of time; not an Exception, so extractors cannot swallow it."""
+
+def _raise_parse_timeout(signum, frame):
+    raise ParseTimeout()
+
+# Monotonic time after which the worker's watchdog kills the process
+_parse_deadline = None
+
+def _parse_watchdog():
+    # The alarm signal only lands between Python bytecodes. Native parsers run
+    # with the GIL released, so this thread still sees them overrun.
+    while True:
+        deadline = _parse_deadline
+        if deadline is not None and time.monotonic() > deadline:
+            os._exit(1)
+        time.sleep(0.25)
 
-def parse_code_to_ast(repo_content: Dict[str, Any]) -> Dict[str, Any]:
-    repo_path = download_repo_content(repo_content)
-    ast_data = traverse_directory(repo_path)
+def _init_parse_worker(memory_limit: int) -> None:
+    if hasattr(signal, 'SIGALRM'):
+        signal.signal(signal.SIGALRM, _raise_parse_timeout)
+    # Before the memory limit, which also caps the thread's stack reservation
+    threading.Thread(target=_parse_watchdog, daemon=True).start()
+    if memory_limit > 0 and resource is not None:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            memory_limit = min(memory_limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
 
-    updated_ast_data = {}
-    for file_path, info in ast_data.items():
-        relative_path = os.path.relpath(file_path, repo_path)
-        with open(file_path, 'r', encoding='utf-8') as f:
-            file_content = f.read()
-        info['content'] = file_content
-        updated_ast_data[relative_path] = info
+def _skipped(reason: str, started: float) -> Dict[str, Any]:
+    return {"skipped": reason, "elapsed": round(time.perf_counter() - started, 3)}
 
-    return updated_ast_data
+def _set_parse_alarm(timeout: float) -> None:
+    global _parse_deadline
+    if timeout > 0:
+        _parse_deadline = time.monotonic() + timeout + PARSE_HARD_TIMEOUT_GRACE
+    else:
+        _parse_deadline = None
+    if hasattr(signal, 'setitimer'):
+        signal.setitimer(signal.ITIMER_REAL, max(timeout, 0))
 
+def _parse_item(item: ParseItem, timeout: float) -> Dict[str, Any]:
+    path, source, compile_args = item
+    started = time.perf_counter()
+    try:
+        if timeout > 0:
+            _set_parse_alarm(timeout)
+        # Entries without a source are read from disk
+        info = (parse_code_file(path, compile_args) if source is None
+                else parse_code_source(path, source, compile_args=compile_args))
+        if timeout > 0:
+            _set_parse_alarm(0)
+        return info
+    except ParseTimeout:
+        return _skipped("timeout", started)
+    except MemoryError:
+        return _skipped("memory", started)
+    finally:
+        if timeout > 0:
+            _set_parse_alarm(0)
+
+def _parse_chunk(chunk: List[ParseItem], timeout: float = 0) -> List[Dict[str, Any]]:
+    return [_parse_item(item, timeout) for item in chunk]
+
+def _get_parse_pool(workers: int, memory_limit: int) -> ProcessPoolExecutor:
+    global _parse_pool, _parse_pool_key
+    with _parse_pool_lock:
+        if _parse_pool is None or _parse_pool_key != (workers, memory_limit):
+            if _parse_pool is not None:
+                _parse_pool.shutdown(wait=False)
+            _parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=_parse_context,
+                                              initializer=_init_parse_worker, initargs=(memory_limit,))
+            _parse_pool_key = (workers, memory_limit)
+        return _parse_pool
+
+def _has_parse_pool(workers: int, memory_limit: int) -> bool:
+    with _parse_pool_lock:
+        return _parse_pool is not None and _parse_pool_key == (workers, memory_limit)
 
-def download_repo_content(repo_content: Dict[str, Any]) -> str:
+def _discard_parse_pool(pool: ProcessPoolExecutor) -> None:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False)
+
+def parse_in_parallel(items: List[ParseItem], workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                      timeout: Optional[float] = None, memory_limit: Optional[int] = None) -> List[Dict[str, Any]]:
     """
-    Download the repository content to a local directory.
-    This function assumes repo_content is a list of files with 'path' and 'content' keys.
+    Parse (path, source, compile_args) items across a shared process pool and
+    return the results in input order. Each file runs under a wall-clock
+    `timeout` and its worker under a `memory_limit` (bytes); a file that
+    exceeds either comes back as {"skipped": reason, "elapsed": seconds}
+    instead of stalling or sinking the run. Only a few chunks per worker are
+    in flight at a time; when a worker dies on a pathological file, those
+    chunks are re-run side by side in throwaway processes that report file
+    by file, so the offending file is pinned down and skipped while the
+    chunks not yet submitted carry on in a fresh pool.
+    Single-worker and small runs do without the pool: in-process with both
+    budgets disabled, otherwise in one budgeted process unless the shared
+    pool is already up.
     """
-    repo_path = tempfile.mkdtemp()  # Use a temporary directory for testing
-    os.makedirs(repo_path, exist_ok=True)
+    workers = workers or PARSE_WORKERS
+    chunk_size = chunk_size or PARSE_CHUNK_SIZE
+    timeout = PARSE_TIMEOUT_SECONDS if timeout is None else timeout
+    memory_limit = PARSE_MEMORY_LIMIT_BYTES if memory_limit is None else memory_limit
+    budgeted = timeout > 0 or memory_limit > 0
+    if not items:
+        return []
+    if workers <= 1 or len(items) <= chunk_size:
+        if not budgeted:
+            return _parse_chunk(items)
+        if not _has_parse_pool(workers, memory_limit):
+            return _parse_isolated(items, timeout, memory_limit)
+
+    results = [None] * len(items)
+    pending = deque(list(range(start, min(start + chunk_size, len(items))))
+                    for start in range(0, len(items), chunk_size))
+    # Enough queued to keep every worker busy, few enough that a crash only costs these
+    window = 2 * workers
+    in_flight = {}
+    pool = None
+    while pending or in_flight:
+        if pool is None:
+            pool = _get_parse_pool(workers, memory_limit)
+        broken = []
+        while pending and len(in_flight) < window:
+            chunk = pending.popleft()
+            try:
+                in_flight[pool.submit(_parse_chunk, [items[i] for i in chunk], timeout)] = chunk
+            except BrokenProcessPool:
+                broken.append(chunk)
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED) if in_flight else (set(), set())
+        for future in done:
+            chunk = in_flight.pop(future)
+            try:
+                for i, info in zip(chunk, future.result()):
+                    results[i] = info
+            except BrokenProcessPool:
+                broken.append(chunk)
+        if not broken:
+            continue
+
+        # A broken pool fails everything else in flight as well
+        for future in wait(in_flight)[0]:
+            chunk = in_flight.pop(future)
+            try:
+                for i, info in zip(chunk, future.result()):
+                    results[i] = info
+            except BrokenProcessPool:
+                broken.append(chunk)
+        _discard_parse_pool(pool)
+        pool = None
+        with ThreadPoolExecutor(max_workers=min(workers, len(broken))) as executor:
+            isolated = executor.map(lambda chunk: _parse_isolated([items[i] for i in chunk], timeout, memory_limit),
+                                    broken)
+            for chunk, infos in zip(broken, isolated):
+                for i, info in zip(chunk, infos):
+                    results[i] = info
+    return results
 
+def _run_isolated(connection, items: List[ParseItem], timeout: float, memory_limit: int) -> None:
+    _init_parse_worker(memory_limit)
+    for item in items:
+        connection.send(_parse_item(item, timeout))
+    connection.close()
+
+def _parse_isolated(items: List[ParseItem], timeout: float, memory_limit: int) -> List[Dict[str, Any]]:
+    """
+    Parse files in a throwaway process that sends back each result as it is
+    done, so a crash or hang is pinned on the file being parsed: that file is
+    skipped and a fresh process carries on with the rest.
+    """
+    results = []
+    while len(results) < len(items):
+        receiver, sender = _parse_context.Pipe(duplex=False)
+        process = _parse_context.Process(target=_run_isolated, args=(sender, items[len(results):], timeout,
+                                                                     memory_limit), daemon=True)
+        process.start()
+        sender.close()
+        started = time.perf_counter()
+        try:
+            # Allow for process start-up on top of the worker's own hard deadline
+            while len(results) < len(items) and \
+                    receiver.poll(timeout + PARSE_HARD_TIMEOUT_GRACE + 30 if timeout > 0 else None):
+                results.append(receiver.recv())
+                started = time.perf_counter()
+        except EOFError:
+            pass
+        finally:
+            receiver.close()
+            process.join(1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        if len(results) < len(items):
+            timed_out = timeout > 0 and time.perf_counter() - started >= timeout
+            results.append(_skipped("timeout" if timed_out else "crashed", started))
+    return results
+
+def _compile_args(file_path: str, compile_database: Optional[CompileDatabase]) -> Optional[List[str]]:
+    if compile_database is None or LANGUAGES.get(os.path.splitext(file_path)[1].lower()) != 'cpp':
+        return None
+    return compile_args_for(file_path, compile_database)
+
+def traverse_directory(directory_path: str, workers: Optional[int] = None,
+                       compile_database: Optional[CompileDatabase] = None,
+                       path_filter: Optional[PathFilter] = None) -> Dict[str, Any]:
+    if compile_database is None:
+        compile_database = find_compile_database(directory_path)
+    path_filter = path_filter if path_filter is not None else PathFilter()
+    file_paths = []
+    items = []
+    for relative_path, file_path, _ in walk_directory(directory_path, path_filter):
+        file_paths.append(file_path)
+        items.append((file_path, None, _compile_args(relative_path, compile_database)))
+
+    results = parse_in_parallel(items, workers)
+    return dict(zip(file_paths, results))
+
+def compile_database_from_content(repo_content: List[Dict[str, Any]]) -> Optional[CompileDatabase]:
+    """A compile_commands.json among fetched files, if one was committed."""
     for file in repo_content:
-        file_path = os.path.join(repo_path, file['path'])
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as f:  
-            f.write(file['content'])  
-    
-    return repo_path
+        if file['path'].strip('/') in COMPILE_DATABASE_LOCATIONS:
+            try:
+                return CompileDatabase.from_json(file['content'])
+            except (ValueError, KeyError):
+                return None
+    return None
+
+def parse_code_to_ast(repo_content: Dict[str, Any], workers: Optional[int] = None,
+                      compile_database: Optional[CompileDatabase] = None,
+                      path_filter: Optional[PathFilter] = None) -> Dict[str, Any]:
+    """
+    Parse fetched files straight from memory, across worker processes for large inputs.
+    This function assumes repo_content is a list of files with 'path' and 'content' keys.
+    C/C++ files take their flags from `compile_database`, or from a compile_commands.json
+    in repo_content. Files `path_filter` (by default, one loaded from the rules files in
+    repo_content) rejects are left out of the result.
+    """
+    if compile_database is None:
+        compile_database = compile_database_from_content(repo_content)
+    if path_filter is None:
+        path_filter = filter_from_files(repo_content)
+    repo_content = [file for file in repo_content
+                    if path_filter.accepts(file['path']) and path_filter.accepts_content(file['content'])]
+    items = [(file['path'], file['content'], _compile_args(file['path'], compile_database)) for file in repo_content]
+    results = parse_in_parallel(items, workers)
+
+    ast_data = {}
+    for file, info in zip(repo_content, results):
+        info['content'] = file['content']
+        ast_data[os.path.normpath(file['path'])] = info
+    return ast_data
@@ -0,0 +1,161 @@
+# backend/api/blob_cache.py
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+CACHE_DIR = os.getenv("VISDEP_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "visdep"))
+BLOB_CACHE_MAX_BYTES = int(os.getenv("VISDEP_BLOB_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+ETAG_CACHE_MAX_BYTES = int(os.getenv("VISDEP_ETAG_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+def git_blob_sha(data: bytes) -> str:
+    """Compute the SHA GitHub reports for a blob with these bytes."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+class BlobCache:
+    """
+    Content-addressable on-disk cache of raw blob bytes keyed by Git SHA.
+    Entries are evicted least-recently-used first once max_bytes is exceeded;
+    recency survives restarts through file mtimes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = BLOB_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # sha -> size, least recently used first
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                # Skips partial writes and anything not laid out as <sha[:2]>/<sha>
+                if name.endswith('.tmp') or os.path.join(root, name) != self._path(name):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                found.append((stat.st_mtime, name, stat.st_size))
+        for _, sha, size in sorted(found):
+            self._entries[sha] = size
+            self._total_bytes += size
+
+    def _path(self, sha: str) -> str:
+        return os.path.join(self.directory, sha[:2], sha)
+
+    def __contains__(self, sha: str) -> bool:
+        return sha in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, sha: str) -> Optional[bytes]:
+        with self._lock:
+            if sha not in self._entries:
+                return None
+            self._entries.move_to_end(sha)
+        path = self._path(sha)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._total_bytes -= self._entries.pop(sha, 0)
+            return None
+        return data
+
+    def put(self, sha: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if sha in self._entries:
+                self._entries.move_to_end(sha)
+                return
+        path = self._path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if sha not in self._entries:
+                self._entries[sha] = len(data)
+                self._total_bytes += len(data)
+            self._evict()
+
+    def discard(self, sha: str) -> None:
+        with self._lock:
+            size = self._entries.pop(sha, None)
+            if size is None:
+                return
+            self._total_bytes -= size
+        try:
+            os.remove(self._path(sha))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            sha, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(sha))
+            except OSError:
+                pass
+
+class ETagCache:
+    """
+    Last ETag and response body per URL, for conditional (If-None-Match)
+    requests. Entries live in a BlobCache keyed by the URL's hash, so they
+    share its least-recently-used bound.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = ETAG_CACHE_MAX_BYTES):
+        self._entries = BlobCache(directory, max_bytes)
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, url: str) -> Optional[Tuple[str, Any]]:
+        data = self._entries.get(self._key(url))
+        if data is None:
+            return None
+        try:
+            entry = json.loads(data)
+        except ValueError:
+            return None
+        return entry['etag'], entry['body']
+
+    def put(self, url: str, etag: str, body: Any) -> None:
+        key = self._key(url)
+        data = json.dumps({'etag': etag, 'body': body}).encode('utf-8')
+        # Entries are keyed by URL, not content, so a newer response replaces the stored one
+        self._entries.discard(key)
+        self._entries.put(key, data)
+
+_blob_cache = None
+_etag_cache = None
+
+def get_blob_cache() -> BlobCache:
+    global _blob_cache
+    if _blob_cache is None:
+        _blob_cache = BlobCache(os.path.join(CACHE_DIR, "blobs"))
+    return _blob_cache
+
+def get_etag_cache() -> ETagCache:
+    global _etag_cache
+    if _etag_cache is None:
+        _etag_cache = ETagCache(os.path.join(CACHE_DIR, "etags"))
+    return _etag_cache
@@ -3,6 +3,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import logging
 from backend.api.langchain_integration import get_jamba_response
+from backend.api.code_queries import resolve_repo_id
+from typing import Optional
 import json
 
 router = APIRouter()
@@ -13,7 +15,9 @@ logging.basicConfig(level=logging.DEBUG)
 # Define the request model
 class QueryRequest(BaseModel):
     query: str
-    context: dict
+    # The ingested repository to chat about (id or name); its stored files are the context
+    repo: Optional[str] = None
+    context: Optional[dict] = None
 
 # Define the response model
 class QueryResponse(BaseModel):
@@ -24,15 +28,21 @@ class QueryResponse(BaseModel):
 async def chat_with_jamba(request: QueryRequest):
     try:
         query = request.query
-        context = request.context
-        
-        response = await get_jamba_response(query, context)
+        repo_id = resolve_repo_id(request.repo) if request.repo else None
+        if request.repo and repo_id is None:
+            raise HTTPException(status_code=404, detail=f"Repository {request.repo} has not been ingested")
+        if repo_id is None and request.context is None:
+            raise HTTPException(status_code=400, detail="Provide repo or context")
+
+        response = await get_jamba_response(query, request.context, repo_id=repo_id)
         
         if response:
             return QueryResponse(response=response)
         else:
             raise HTTPException(status_code=500, detail="Failed to get a response from the model.")
     
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error in chat_with_jamba: {e}")
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,71 @@
+# backend/api/code_queries.py
+from typing import Any, Dict, List, Optional
+from backend.api.data_storage import get_pool, retrieve_latest_ingestion, retrieve_repository
+
+# Upper bound on rows returned by a single lookup
+QUERY_LIMIT = 500
+
+_SYMBOL_COLUMNS = ('kind', 'name', 'qualified_name', 'parent', 'start_line', 'end_line', 'start_byte', 'end_byte')
+
+def resolve_repo_id(repo: str) -> Optional[int]:
+    """
+    A repository row given its id (as returned by an ingestion), or the row of
+    the latest completed ingestion when given a repository name.
+    """
+    if repo.isdigit():
+        row = retrieve_repository(int(repo))
+        return row['repo_id'] if row else None
+    latest = retrieve_latest_ingestion(repo)
+    return latest['repo_id'] if latest else None
+
+def _children_range(prefix: str):
+    # Everything that starts with `prefix.` or `prefix/`, as an index range: '.' and '/' are followed by '0'
+    return prefix + '.', prefix + '0'
+
+def find_definitions(repo_id: int, name: str, kind: Optional[str] = None,
+                     limit: int = QUERY_LIMIT) -> List[Dict[str, Any]]:
+    """Symbols whose name or qualified name is `name`, with the file defining each."""
+    query = (f"SELECT files.path, {', '.join('symbols.' + column for column in _SYMBOL_COLUMNS)} "
+             "FROM symbols JOIN files ON files.id = symbols.file_id "
+             "WHERE symbols.id IN (SELECT id FROM symbols WHERE repo_id = ? AND name = ? "
+             "UNION SELECT id FROM symbols WHERE repo_id = ? AND qualified_name = ?)")
+    params = [repo_id, name, repo_id, name]
+    if kind is not None:
+        query += " AND symbols.kind = ?"
+        params.append(kind)
+    query += " ORDER BY files.path, symbols.start_line LIMIT ?"
+    params.append(limit)
+    with get_pool().connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [{"path": row[0], **dict(zip(_SYMBOL_COLUMNS, row[1:]))} for row in rows]
+
+def find_importers(repo_id: int, module: str, limit: int = QUERY_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Files importing `module` itself or anything under it (`module.x`,
+    `module/x`), with the import as written.
+    """
+    low, high = _children_range(module)
+    query = ("SELECT files.path, imports.module, imports.line FROM imports JOIN files ON files.id = imports.file_id "
+             "WHERE imports.id IN (SELECT id FROM imports WHERE repo_id = ? AND module = ? "
+             "UNION SELECT id FROM imports WHERE repo_id = ? AND module >= ? AND module < ?) "
+             "ORDER BY files.path, imports.module LIMIT ?")
+    with get_pool().connection() as conn:
+        rows = conn.execute(query, (repo_id, module, repo_id, low, high, limit)).fetchall()
+    return [{"path": path, "module": imported, "line": line} for path, imported, line in rows]
+
+def list_directory(repo_id: int, directory: str = '') -> Dict[str, Any]:
+    """The files directly in `directory` and the names of its immediate sub-directories."""
+    directory = directory.strip('/')
+    with get_pool().connection() as conn:
+        files = [row[0] for row in conn.execute(
+            "SELECT name FROM files WHERE repo_id = ? AND directory = ? ORDER BY name", (repo_id, directory))]
+        if directory:
+            low, high = directory + '/', directory + '0'
+            nested = conn.execute("SELECT DISTINCT directory FROM files WHERE repo_id = ? AND directory >= ? "
+                                  "AND directory < ?", (repo_id, low, high))
+        else:
+            nested = conn.execute("SELECT DISTINCT directory FROM files WHERE repo_id = ? AND directory != ''",
+                                  (repo_id,))
+        offset = len(directory) + 1 if directory else 0
+        directories = sorted({row[0][offset:].split('/', 1)[0] for row in nested})
+    return {"directory": directory, "files": files, "directories": directories}
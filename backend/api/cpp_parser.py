@@ -0,0 +1,246 @@
+# backend/api/cpp_parser.py
+import os
+import re
+import json
+import shlex
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+import clang.cindex
+from backend.api.symbols import make_symbol
+
+# Flags for files without a compile_commands.json entry
+CPP_DEFAULT_ARGS = shlex.split(os.getenv("VISDEP_CPP_ARGS", "-std=c++17"))
+C_DEFAULT_ARGS = shlex.split(os.getenv("VISDEP_C_ARGS", "-std=c11"))
+
+# Declarations only, with #include cursors, and carrying on past missing
+# headers, which are the norm when a file is parsed without the rest of its tree
+PARSE_OPTIONS = (clang.cindex.TranslationUnit.PARSE_SKIP_FUNCTION_BODIES
+                 | clang.cindex.TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD
+                 | clang.cindex.TranslationUnit.PARSE_INCOMPLETE
+                 | 0x200)  # CXTranslationUnit_KeepGoing, not exposed by the bindings
+
+COMPILE_DATABASE_LOCATIONS = ('compile_commands.json', 'build/compile_commands.json')
+
+# Compiler flags that change how a file parses; everything else (-c, -o, warnings, ...) is dropped
+_PATH_FLAGS = ('-I', '-isystem', '-iquote', '-idirafter', '-include')
+_KEPT_FLAGS = _PATH_FLAGS + ('-D', '-U', '-std=', '-x')
+
+_local = threading.local()
+
+def get_index() -> clang.cindex.Index:
+    """One libclang index per thread, and so per parse worker, reused for every file."""
+    index = getattr(_local, 'index', None)
+    if index is None:
+        index = _local.index = clang.cindex.Index.create()
+    return index
+
+def _relevant_flags(arguments: List[str], directory: str) -> List[str]:
+    flags = []
+    i = 0
+    while i < len(arguments):
+        argument = arguments[i]
+        flag = next((prefix for prefix in _KEPT_FLAGS if argument.startswith(prefix)), None)
+        if flag is None:
+            i += 1
+            continue
+        value = argument[len(flag):]
+        if not value and flag != '-std=' and i + 1 < len(arguments):
+            i += 1
+            value = arguments[i]
+        if flag in _PATH_FLAGS:
+            value = os.path.normpath(os.path.join(directory, value))
+        flags += [flag + value] if flag in ('-D', '-U', '-std=') else [flag, value]
+        i += 1
+    return flags
+
+class CompileDatabase:
+    """
+    Per-file flags from a compile_commands.json. Entries hold build-machine
+    paths, so repository paths are matched by path suffix;
+    headers, which have no entries, borrow the flags of a source file in
+    the same directory.
+    """
+
+    def __init__(self, commands: List[Dict[str, Any]]):
+        self._by_name = defaultdict(list)
+        self._by_directory = {}
+        for command in commands:
+            directory = command.get('directory', '')
+            arguments = command.get('arguments') or shlex.split(command.get('command', ''))
+            path = os.path.normpath(os.path.join(directory, command['file'])).replace(os.sep, '/')
+            flags = _relevant_flags(arguments[1:], directory)
+            self._by_name[os.path.basename(path)].append((path, flags))
+            self._by_directory.setdefault(os.path.dirname(path), flags)
+
+    @classmethod
+    def from_json(cls, text: str) -> 'CompileDatabase':
+        return cls(json.loads(text))
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._by_name.values())
+
+    def flags_for(self, file_path: str) -> Optional[List[str]]:
+        file_path = os.path.normpath(file_path).replace(os.sep, '/').lstrip('/')
+        matches = [(path, flags) for path, flags in self._by_name.get(os.path.basename(file_path), [])
+                   if path.endswith('/' + file_path) or path == file_path]
+        if matches:
+            return matches[0][1]
+        directory = os.path.dirname(file_path)
+        for path, flags in self._by_directory.items():
+            if directory and (path.endswith('/' + directory) or path == directory):
+                return flags
+        return None
+
+def find_compile_database(directory_path: str) -> Optional[CompileDatabase]:
+    """The compile_commands.json at the root or in build/ of a checkout, if any."""
+    for location in COMPILE_DATABASE_LOCATIONS:
+        path = os.path.join(directory_path, location)
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r') as f:
+                    return CompileDatabase.from_json(f.read())
+            except (OSError, ValueError, KeyError):
+                return None
+    return None
+
+def compile_args_for(file_path: str, compile_database: Optional[CompileDatabase] = None) -> List[str]:
+    flags = compile_database.flags_for(file_path) if compile_database is not None else None
+    if flags is None:
+        flags = C_DEFAULT_ARGS if file_path.lower().endswith('.c') else CPP_DEFAULT_ARGS
+    # Headers are parsed as C++ unless the flags say otherwise
+    if file_path.lower().endswith(('.h', '.hpp')) and '-x' not in flags:
+        flags = ['-x', 'c++'] + flags
+    return list(flags)
+
+def parse_cpp_file(file_path: str, args: Optional[List[str]] = None) -> clang.cindex.TranslationUnit:
+    args = compile_args_for(file_path) if args is None else args
+    return get_index().parse(file_path, args=args, options=PARSE_OPTIONS)
+
+def parse_cpp_source(source: str, file_path: str, args: Optional[List[str]] = None) -> clang.cindex.TranslationUnit:
+    # libclang reads the buffer as an unsaved file; nothing touches the disk
+    args = compile_args_for(file_path) if args is None else args
+    return get_index().parse(file_path, args=args, unsaved_files=[(file_path, source)], options=PARSE_OPTIONS)
+
+_FUNCTION_KINDS = {clang.cindex.CursorKind.FUNCTION_DECL, clang.cindex.CursorKind.FUNCTION_TEMPLATE}
+_METHOD_KINDS = {clang.cindex.CursorKind.CXX_METHOD, clang.cindex.CursorKind.CONSTRUCTOR,
+                 clang.cindex.CursorKind.DESTRUCTOR}
+_CLASS_KINDS = {clang.cindex.CursorKind.CLASS_DECL, clang.cindex.CursorKind.STRUCT_DECL,
+                clang.cindex.CursorKind.CLASS_TEMPLATE}
+_SCOPE_KINDS = {clang.cindex.CursorKind.NAMESPACE, clang.cindex.CursorKind.LINKAGE_SPEC}
+
+def _included_file(node: clang.cindex.Cursor) -> Optional[str]:
+    try:
+        included = node.get_included_file()
+    except AssertionError:  # the bindings assert on headers that were not found
+        return None
+    return included.name if included else None
+
+def _is_named(node: clang.cindex.Cursor) -> bool:
+    # Anonymous records are spelled "(anonymous struct at ...)"
+    return bool(node.spelling) and not node.spelling.startswith('(')
+
+def _scope_name(node: clang.cindex.Cursor) -> Optional[str]:
+    """Qualified name of the namespace/class a declaration belongs to, dot-separated like the other languages."""
+    names = []
+    scope = node.semantic_parent
+    while scope is not None and scope.kind != clang.cindex.CursorKind.TRANSLATION_UNIT:
+        if scope.kind != clang.cindex.CursorKind.LINKAGE_SPEC and _is_named(scope):
+            names.append(scope.spelling)
+        scope = scope.semantic_parent
+    return '.'.join(reversed(names)) or None
+
+_CPP_TOKEN = re.compile(rb"""//[^\n]*|/\*.*?\*/|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|::|[{}();:]|\w+""", re.S)
+
+def _body_end(data: bytes, offset: int) -> int:
+    """
+    End of the function body following a declarator that ends at `offset`.
+    Bodies are skipped by the parser, so their extent stops at the declarator;
+    the body is found by brace matching, stepping over constructor
+    initializer lists. A declaration without a body keeps `offset`.
+    """
+    parens = braces = 0
+    initializers = body = False
+    previous = b''
+    for match in _CPP_TOKEN.finditer(data, offset):
+        token = match.group()
+        if token[:1] in (b'/', b'"', b"'"):
+            continue
+        if braces:
+            if token == b'{':
+                braces += 1
+            elif token == b'}':
+                braces -= 1
+                if not braces and body:
+                    return match.end()
+        elif token == b'(':
+            parens += 1
+        elif token == b')':
+            parens -= 1
+        elif parens:
+            pass
+        elif token == b';':
+            return offset
+        elif token == b':':
+            initializers = True
+        elif token == b'{':
+            braces = 1
+            # In an initializer list `member{value}` is a brace initializer, not the body
+            body = not (initializers and (previous[:1].isalnum() or previous[:1] == b'_'))
+        previous = token
+    return offset
+
+def extract_cpp_info(tu: clang.cindex.TranslationUnit, source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Functions, classes and #includes declared in the file itself (not in the
+    headers it pulls in). `imports` holds each include as written; `includes`
+    adds its line and, when the header was found, the resolved path.
+    `symbols` has an entry per function, class and method; function spans
+    include their body only when the `source` is given.
+    """
+    info = {
+        "functions": [],
+        "classes": [],
+        "imports": [],
+        "includes": [],
+        "symbols": []
+    }
+    main_file = tu.spelling
+    data = source.encode('utf-8', 'surrogatepass') if source is not None else None
+
+    def add_symbol(kind, node):
+        extent = node.extent
+        start, end, end_line = extent.start.offset, extent.end.offset, extent.end.line
+        if data is not None and kind != 'class':
+            body_end = _body_end(data, end)
+            end_line += data.count(b'\n', end, body_end)
+            end = body_end
+        info["symbols"].append(make_symbol(kind, node.spelling, _scope_name(node), extent.start.line, end_line,
+                                           start, end))
+
+    def visit(cursor, in_class=False):
+        for node in cursor.get_children():
+            location = node.location.file
+            if location is None or location.name != main_file:
+                continue
+            if node.kind == clang.cindex.CursorKind.INCLUSION_DIRECTIVE:
+                info["imports"].append(node.spelling)
+                info["includes"].append({"header": node.spelling, "line": node.location.line,
+                                         "resolved": _included_file(node)})
+            elif node.kind in _METHOD_KINDS or (in_class and node.kind in _FUNCTION_KINDS):
+                add_symbol('method', node)
+            elif node.kind in _FUNCTION_KINDS:
+                if node.spelling not in info["functions"]:
+                    info["functions"].append(node.spelling)
+                add_symbol('function', node)
+            elif node.kind in _CLASS_KINDS:
+                if _is_named(node):
+                    if not in_class and node.spelling not in info["classes"]:
+                        info["classes"].append(node.spelling)
+                    add_symbol('class', node)
+                    visit(node, in_class=True)
+            elif node.kind in _SCOPE_KINDS:
+                visit(node)
+
+    visit(tu.cursor)
+    return info
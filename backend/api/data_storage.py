@@ -1,78 +1,596 @@
 # backend/api/data_storage.py
 
+import os
+import time
+import zlib
 import sqlite3
 import json
-from typing import Dict, Any
+import atexit
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+try:
+    import zstandard  # optional; blobs are zlib-compressed without it
+except ImportError:
+    zstandard = None
 
 DATABASE_PATH = 'data_storage.db'
+# Idle connections kept open per database file
+DATABASE_POOL_SIZE = int(os.getenv("VISDEP_DB_POOL_SIZE", "4"))
+
+# File contents are stored once per distinct content, compressed with this codec ("zstd", "zlib" or "none")
+BLOB_COMPRESSION = os.getenv("VISDEP_BLOB_COMPRESSION", "zstd" if zstandard is not None else "zlib")
+
+# Revisions per repository whose artifacts (graph, records, vector index, ...) are kept
+ARTIFACT_REVISIONS = int(os.getenv("VISDEP_ARTIFACT_REVISIONS", "10"))
+
+# Stay well under SQLite's bound-parameter limit in IN (...) queries
+_QUERY_CHUNK_SIZE = 500
+
+def _file_identity(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+class ConnectionPool:
+    """
+    Long-lived connections to one database file in WAL mode, so readers are
+    not blocked by a writer and a commit appends to the log instead of
+    rewriting pages. Connections are handed out one caller at a time.
+    """
+
+    def __init__(self, path: str, size: int = DATABASE_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.identity = None
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if self.identity is None:
+            self.identity = _file_identity(self.path)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """The pool for DATABASE_PATH, replaced when the file was deleted or swapped underneath it."""
+    path = os.path.abspath(DATABASE_PATH)
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is not None and pool.identity is not None and pool.identity != _file_identity(path):
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+        return pool
+
+@atexit.register
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
 
 def initialize_database():
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS repositories (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        repo_name TEXT NOT NULL,
-        metadata TEXT NOT NULL
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS ast_data (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        repo_id INTEGER NOT NULL,
-        file_path TEXT NOT NULL,
-        ast_info TEXT NOT NULL,
-        FOREIGN KEY (repo_id) REFERENCES repositories (id)
-    )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-def store_repository_metadata(repo_name: str, metadata: Dict[str, Any]):
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('INSERT INTO repositories (repo_name, metadata) VALUES (?, ?)', 
-                   (repo_name, json.dumps(metadata)))
-    
-    repo_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS repositories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repo_name TEXT NOT NULL,
+            metadata TEXT NOT NULL,
+            commit_sha TEXT,
+            sub_directory TEXT
+        )
+        ''')
+
+        # Databases created before commit tracking lack these columns
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(repositories)')}
+        for column in ('commit_sha', 'sub_directory'):
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE repositories ADD COLUMN {column} TEXT')
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ast_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repo_id INTEGER NOT NULL,
+            file_path TEXT NOT NULL,
+            ast_info TEXT NOT NULL,
+            FOREIGN KEY (repo_id) REFERENCES repositories (id)
+        )
+        ''')
+        # Databases created before content deduplication keep the content inside ast_info
+        if 'content_hash' not in {row[1] for row in cursor.execute('PRAGMA table_info(ast_data)')}:
+            cursor.execute('ALTER TABLE ast_data ADD COLUMN content_hash TEXT')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ast_data_repo_path ON ast_data (repo_id, file_path)')
+
+        # Content-addressed file contents, shared by every repository and revision that contains them
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            compression TEXT NOT NULL,
+            data BLOB NOT NULL
+        )
+        ''')
+        # One row per ingested commit; the manifest blob maps each path to its content hash
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repo_id INTEGER NOT NULL,
+            commit_sha TEXT,
+            sub_directory TEXT,
+            manifest_hash TEXT NOT NULL,
+            file_count INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            FOREIGN KEY (repo_id) REFERENCES repositories (id)
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_revisions_repo ON revisions (repo_id, id)')
+        # Derived per-revision state (graph, file records, vector index), stored as blobs
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS artifacts (
+            repo_id INTEGER NOT NULL,
+            revision_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (repo_id, name, revision_id),
+            FOREIGN KEY (repo_id) REFERENCES repositories (id)
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_repositories_name ON repositories (repo_name, id)')
+        # Snapshots being written; their rows are stored under repo_id = -id until published
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repo_id INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            FOREIGN KEY (repo_id) REFERENCES repositories (id)
+        )
+        ''')
+
+        # Normalized copies of the parse results, so lookups hit an index instead of decoding every ast_info
+        backfill = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'files'"
+                                  ).fetchone() is None
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repo_id INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            directory TEXT NOT NULL,
+            name TEXT NOT NULL,
+            UNIQUE (repo_id, path),
+            FOREIGN KEY (repo_id) REFERENCES repositories (id)
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_directory ON files (repo_id, directory)')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS symbols (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repo_id INTEGER NOT NULL,
+            file_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            qualified_name TEXT NOT NULL,
+            parent TEXT,
+            start_line INTEGER,
+            end_line INTEGER,
+            start_byte INTEGER,
+            end_byte INTEGER,
+            FOREIGN KEY (file_id) REFERENCES files (id)
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols (repo_id, name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_symbols_qualified_name ON symbols (repo_id, qualified_name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_symbols_file ON symbols (file_id)')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS imports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            repo_id INTEGER NOT NULL,
+            file_id INTEGER NOT NULL,
+            module TEXT NOT NULL,
+            line INTEGER,
+            FOREIGN KEY (file_id) REFERENCES files (id)
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_imports_module ON imports (repo_id, module)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_imports_file ON imports (file_id)')
+
+        if backfill:
+            rows = conn.execute('SELECT repo_id, file_path, ast_info FROM ast_data ORDER BY id')
+            for repo_id, file_path, ast_info in rows.fetchall():
+                AstDataWriter(conn, repo_id).index_many([(file_path, json.loads(ast_info))])
+
+        conn.commit()
+
+def store_repository_metadata(repo_name: str, metadata: Dict[str, Any], sub_directory: str = ''):
+    """
+    The id of the repository row for `repo_name` and `sub_directory`, created
+    on first use; later calls refresh its metadata. Each sub-directory of a
+    repository keeps its own row, and so its own files.
+    """
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+
+        row = cursor.execute("SELECT id FROM repositories WHERE repo_name = ? AND COALESCE(sub_directory, '') = ? "
+                             "ORDER BY id DESC LIMIT 1", (repo_name, sub_directory)).fetchone()
+        if row:
+            repo_id = row[0]
+            cursor.execute('UPDATE repositories SET metadata = ? WHERE id = ?', (json.dumps(metadata), repo_id))
+        else:
+            cursor.execute('INSERT INTO repositories (repo_name, metadata, sub_directory) VALUES (?, ?, ?)',
+                           (repo_name, json.dumps(metadata), sub_directory))
+            repo_id = cursor.lastrowid
+        conn.commit()
+
     return repo_id
 
+def update_repository(repo_id: int, metadata: Dict[str, Any], commit_sha: Optional[str] = None,
+                      sub_directory: Optional[str] = None):
+    with get_pool().connection() as conn:
+        conn.execute('UPDATE repositories SET metadata = ?, commit_sha = ?, sub_directory = ? WHERE id = ?',
+                     (json.dumps(metadata), commit_sha, sub_directory, repo_id))
+        conn.commit()
+
+def retrieve_repository(repo_id: int) -> Optional[Dict[str, Any]]:
+    with get_pool().connection() as conn:
+        row = conn.execute('SELECT id, repo_name, commit_sha, sub_directory FROM repositories WHERE id = ?',
+                           (repo_id,)).fetchone()
+
+    if row:
+        return {'repo_id': row[0], 'repo_name': row[1], 'commit_sha': row[2], 'sub_directory': row[3] or ''}
+    return None
+
+def retrieve_latest_ingestion(repo_name: str, sub_directory: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The latest completed ingestion of `repo_name`, of any sub-directory unless one is given."""
+    query = 'SELECT id, commit_sha, sub_directory FROM repositories WHERE repo_name = ? AND commit_sha IS NOT NULL'
+    params = [repo_name]
+    if sub_directory is not None:
+        query += " AND COALESCE(sub_directory, '') = ?"
+        params.append(sub_directory)
+    with get_pool().connection() as conn:
+        row = conn.execute(query + ' ORDER BY id DESC LIMIT 1', params).fetchone()
+
+    if row:
+        return {'repo_id': row[0], 'commit_sha': row[1], 'sub_directory': row[2] or ''}
+    return None
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _encode_content(content: str) -> bytes:
+    return content.encode('utf-8', 'surrogatepass')
+
+def _compress(data: bytes) -> Tuple[str, bytes]:
+    if BLOB_COMPRESSION == 'zstd' and zstandard is not None:
+        compressed, compression = zstandard.ZstdCompressor(level=3).compress(data), 'zstd'
+    elif BLOB_COMPRESSION != 'none':
+        compressed, compression = zlib.compress(data, 6), 'zlib'
+    else:
+        return 'none', data
+    # Small or already-compressed files can come out larger
+    return (compression, compressed) if len(compressed) < len(data) else ('none', data)
+
+def _decompress(compression: str, data: bytes) -> bytes:
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == 'zlib':
+        return zlib.decompress(data)
+    return bytes(data)
+
+def _store_blobs(conn: sqlite3.Connection, blobs: Dict[str, bytes]) -> None:
+    """Insert the blobs not stored yet; only those are compressed."""
+    known = set()
+    for chunk in _chunks(list(blobs)):
+        placeholders = ','.join('?' * len(chunk))
+        known.update(row[0] for row in conn.execute(f'SELECT hash FROM blobs WHERE hash IN ({placeholders})', chunk))
+    rows = [(digest, len(data), *_compress(data)) for digest, data in blobs.items() if digest not in known]
+    conn.executemany('INSERT OR IGNORE INTO blobs (hash, size, compression, data) VALUES (?, ?, ?, ?)', rows)
+
+def retrieve_blob(digest: str) -> Optional[bytes]:
+    with get_pool().connection() as conn:
+        row = conn.execute('SELECT compression, data FROM blobs WHERE hash = ?', (digest,)).fetchone()
+    return _decompress(*row) if row else None
+
+def _symbol_rows(info: Dict[str, Any]) -> List[Tuple]:
+    if 'symbols' in info:
+        return [(symbol['kind'], symbol['name'], symbol['qualified_name'], symbol['parent'], symbol['start_line'],
+                 symbol['end_line'], symbol['start_byte'], symbol['end_byte']) for symbol in info['symbols']]
+    # Extractors without symbol support (and rows stored before it) only have names
+    return ([('function', name, name, None, None, None, None, None) for name in info.get('functions', [])] +
+            [('class', name, name, None, None, None, None, None) for name in info.get('classes', [])])
+
+def _import_rows(info: Dict[str, Any]) -> List[Tuple]:
+    if 'includes' in info:
+        return [(include['header'], include['line']) for include in info['includes']]
+    return [(module, None) for module in info.get('imports', [])]
+
+class AstDataWriter:
+    """
+    Writes ast_data rows of one repository, and their files/symbols/imports
+    index rows, inside a single transaction committed by ast_data_writer
+    when the block ends. Each table gets one executemany per call, so a
+    batch of files costs one commit rather than one per file.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, repo_id: int):
+        self.conn = conn
+        self.repo_id = repo_id
+        self.rows_written = 0
+
+    def store_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Store parse results; a `content` string goes to the blob table and the row keeps its hash."""
+        items = list(items)
+        rows, blobs = [], {}
+        for file_path, ast_info in items:
+            digest = None
+            if isinstance(ast_info.get('content'), str):
+                data = _encode_content(ast_info['content'])
+                digest = content_hash(data)
+                blobs[digest] = data
+                ast_info = {key: value for key, value in ast_info.items() if key != 'content'}
+            rows.append((self.repo_id, file_path, json.dumps(ast_info), digest))
+        _store_blobs(self.conn, blobs)
+        self.conn.executemany('INSERT INTO ast_data (repo_id, file_path, ast_info, content_hash) VALUES (?, ?, ?, ?)',
+                              rows)
+        self.index_many(items)
+        self.rows_written += len(rows)
+
+    def clear(self) -> None:
+        """Drop every row of the repository, ahead of storing a fresh snapshot of it."""
+        for table in ('symbols', 'imports', 'files', 'ast_data'):
+            self.conn.execute(f'DELETE FROM {table} WHERE repo_id = ?', (self.repo_id,))
+
+    def index_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        self._delete_index([file_path for file_path, _ in items])
+        symbol_rows, import_rows = [], []
+        for file_path, ast_info in items:
+            directory, _, name = file_path.rpartition('/')
+            file_id = self.conn.execute('INSERT INTO files (repo_id, path, directory, name) VALUES (?, ?, ?, ?)',
+                                        (self.repo_id, file_path, directory, name)).lastrowid
+            symbol_rows += [(self.repo_id, file_id, *row) for row in _symbol_rows(ast_info)]
+            import_rows += [(self.repo_id, file_id, *row) for row in _import_rows(ast_info)]
+        self.conn.executemany('INSERT INTO symbols (repo_id, file_id, kind, name, qualified_name, parent, start_line, '
+                              'end_line, start_byte, end_byte) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', symbol_rows)
+        self.conn.executemany('INSERT INTO imports (repo_id, file_id, module, line) VALUES (?, ?, ?, ?)', import_rows)
+
+    def _delete_index(self, file_paths: List[str]) -> None:
+        rows = [(self.repo_id, file_path) for file_path in file_paths]
+        file_ids = 'SELECT id FROM files WHERE repo_id = ? AND path = ?'
+        self.conn.executemany(f'DELETE FROM symbols WHERE file_id IN ({file_ids})', rows)
+        self.conn.executemany(f'DELETE FROM imports WHERE file_id IN ({file_ids})', rows)
+        self.conn.executemany('DELETE FROM files WHERE repo_id = ? AND path = ?', rows)
+
+    def delete_many(self, file_paths: Iterable[str]) -> None:
+        file_paths = list(file_paths)
+        self.conn.executemany('DELETE FROM ast_data WHERE repo_id = ? AND file_path = ?',
+                              [(self.repo_id, file_path) for file_path in file_paths])
+        self._delete_index(file_paths)
+
+@contextmanager
+def ast_data_writer(repo_id: int) -> Iterator[AstDataWriter]:
+    """Batched writes for one repository; everything is rolled back if the block raises."""
+    with get_pool().connection() as conn:
+        yield AstDataWriter(conn, repo_id)
+        conn.commit()
+
 def store_ast_data(repo_id: int, file_path: str, ast_info: Dict[str, Any]):
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('INSERT INTO ast_data (repo_id, file_path, ast_info) VALUES (?, ?, ?)', 
-                   (repo_id, file_path, json.dumps(ast_info)))
-    
-    conn.commit()
-    conn.close()
+    store_ast_data_batch(repo_id, [(file_path, ast_info)])
+
+def store_ast_data_batch(repo_id: int, items: Iterable[Tuple[str, Dict[str, Any]]]):
+    with ast_data_writer(repo_id) as writer:
+        writer.store_many(items)
+
+def delete_ast_data(repo_id: int, file_paths: Iterable[str]):
+    with ast_data_writer(repo_id) as writer:
+        writer.delete_many(file_paths)
+
+# Tables holding a repository's parse results, index tables first
+_SNAPSHOT_TABLES = ('symbols', 'imports', 'files', 'ast_data')
+
+def begin_snapshot(repo_id: int) -> int:
+    """
+    A key to write a fresh snapshot of the repository's rows under, with
+    ast_data_writer or store_ast_data_batch, in as many short transactions
+    as it takes. Readers of the repository keep seeing its current rows
+    until publish_snapshot swaps the new ones in.
+    """
+    with get_pool().connection() as conn:
+        snapshot_id = conn.execute('INSERT INTO snapshots (repo_id, created_at) VALUES (?, ?)',
+                                   (repo_id, time.time())).lastrowid
+        conn.commit()
+    return -snapshot_id
+
+def publish_snapshot(repo_id: int, snapshot_key: int) -> None:
+    """Replace the repository's rows with those written under `snapshot_key`, in one transaction."""
+    with get_pool().connection() as conn:
+        for table in _SNAPSHOT_TABLES:
+            conn.execute(f'DELETE FROM {table} WHERE repo_id = ?', (repo_id,))
+        for table in _SNAPSHOT_TABLES:
+            conn.execute(f'UPDATE {table} SET repo_id = ? WHERE repo_id = ?', (repo_id, snapshot_key))
+        conn.execute('DELETE FROM snapshots WHERE id = ?', (-snapshot_key,))
+        conn.commit()
+
+def discard_snapshot(snapshot_key: int) -> None:
+    """Drop the rows of an unpublished snapshot."""
+    with get_pool().connection() as conn:
+        for table in _SNAPSHOT_TABLES:
+            conn.execute(f'DELETE FROM {table} WHERE repo_id = ?', (snapshot_key,))
+        conn.execute('DELETE FROM snapshots WHERE id = ?', (-snapshot_key,))
+        conn.commit()
 
 def retrieve_repository_metadata(repo_name: str) -> Dict[str, Any]:
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT metadata FROM repositories WHERE repo_name = ?', (repo_name,))
-    row = cursor.fetchone()
-    
-    conn.close()
+    with get_pool().connection() as conn:
+        row = conn.execute('SELECT metadata FROM repositories WHERE repo_name = ?', (repo_name,)).fetchone()
+
     if row:
         return json.loads(row[0])
     return {}
 
-def retrieve_ast_data(repo_id: int) -> Dict[str, Any]:
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT file_path, ast_info FROM ast_data WHERE repo_id = ?', (repo_id,))
-    rows = cursor.fetchall()
-    
-    conn.close()
-    ast_data = {row[0]: json.loads(row[1]) for row in rows}
-    return ast_data
+def _chunks(values: List[str], size: int = _QUERY_CHUNK_SIZE) -> Iterator[List[str]]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def _ast_info(ast_info: str, compression: Optional[str], data: Optional[bytes]) -> Dict[str, Any]:
+    info = json.loads(ast_info)
+    if data is not None:
+        info['content'] = _decompress(compression, data).decode('utf-8', 'surrogatepass')
+    return info
+
+def iter_ast_data(repo_id: int, file_paths: Optional[Iterable[str]] = None,
+                  include_content: bool = True) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stored (file_path, ast_info) pairs one row at a time, optionally only for
+    the given paths. Contents are read back from the blob table unless
+    `include_content` is off.
+    """
+    if include_content:
+        select = ('SELECT file_path, ast_info, blobs.compression, blobs.data FROM ast_data '
+                  'LEFT JOIN blobs ON blobs.hash = ast_data.content_hash WHERE repo_id = ?')
+    else:
+        select = 'SELECT file_path, ast_info, NULL, NULL FROM ast_data WHERE repo_id = ?'
+    with get_pool().connection() as conn:
+        if file_paths is None:
+            for file_path, ast_info, compression, data in conn.execute(select, (repo_id,)):
+                yield file_path, _ast_info(ast_info, compression, data)
+            return
+        for chunk in _chunks(list(dict.fromkeys(file_paths))):
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(f'{select} AND file_path IN ({placeholders})', [repo_id, *chunk])
+            for file_path, ast_info, compression, data in rows:
+                yield file_path, _ast_info(ast_info, compression, data)
+
+def retrieve_ast_data(repo_id: int, file_paths: Optional[Iterable[str]] = None,
+                      include_content: bool = True) -> Dict[str, Any]:
+    return dict(iter_ast_data(repo_id, file_paths, include_content))
+
+def retrieve_ast_data_bulk(repo_ids: Iterable[int], include_content: bool = True) -> Dict[int, Dict[str, Any]]:
+    """Stored rows of several repositories in one query, keyed by repository then path."""
+    result = {repo_id: {} for repo_id in repo_ids}
+    with get_pool().connection() as conn:
+        for chunk in _chunks(list(result)):
+            placeholders = ','.join('?' * len(chunk))
+            if include_content:
+                rows = conn.execute('SELECT repo_id, file_path, ast_info, blobs.compression, blobs.data FROM ast_data '
+                                    'LEFT JOIN blobs ON blobs.hash = ast_data.content_hash '
+                                    f'WHERE repo_id IN ({placeholders})', chunk)
+            else:
+                rows = conn.execute('SELECT repo_id, file_path, ast_info, NULL, NULL FROM ast_data '
+                                    f'WHERE repo_id IN ({placeholders})', chunk)
+            for repo_id, file_path, ast_info, compression, data in rows:
+                result[repo_id][file_path] = _ast_info(ast_info, compression, data)
+    return result
+
+def record_revision(repo_id: int, commit_sha: Optional[str], sub_directory: Optional[str] = None) -> int:
+    """
+    Record the repository's stored files as a revision: a manifest of path ->
+    content hash, itself kept as a blob. Re-recording an identical snapshot
+    of the same commit returns the existing revision.
+    """
+    with get_pool().connection() as conn:
+        manifest = dict(sorted(conn.execute('SELECT file_path, content_hash FROM ast_data WHERE repo_id = ?',
+                                            (repo_id,)).fetchall()))
+        data = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+        manifest_hash = content_hash(data)
+        latest = conn.execute('SELECT id, commit_sha, sub_directory, manifest_hash FROM revisions WHERE repo_id = ? '
+                              'ORDER BY id DESC LIMIT 1', (repo_id,)).fetchone()
+        if latest and latest[1:] == (commit_sha, sub_directory, manifest_hash):
+            return latest[0]
+        _store_blobs(conn, {manifest_hash: data})
+        revision_id = conn.execute('INSERT INTO revisions (repo_id, commit_sha, sub_directory, manifest_hash, '
+                                   'file_count, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                                   (repo_id, commit_sha, sub_directory, manifest_hash, len(manifest),
+                                    time.time())).lastrowid
+        conn.commit()
+    return revision_id
+
+def list_revisions(repo_id: int) -> List[Dict[str, Any]]:
+    with get_pool().connection() as conn:
+        rows = conn.execute('SELECT id, commit_sha, sub_directory, file_count, created_at FROM revisions '
+                            'WHERE repo_id = ? ORDER BY id', (repo_id,)).fetchall()
+    return [{'revision_id': row[0], 'commit_sha': row[1], 'sub_directory': row[2] or '', 'file_count': row[3],
+             'created_at': row[4]} for row in rows]
+
+def retrieve_revision_files(revision_id: int) -> Dict[str, Optional[str]]:
+    """Path -> content hash of every file in a revision; retrieve_blob gives the content."""
+    with get_pool().connection() as conn:
+        row = conn.execute('SELECT manifest_hash FROM revisions WHERE id = ?', (revision_id,)).fetchone()
+    if row is None:
+        return {}
+    return json.loads(retrieve_blob(row[0]))
+
+def retrieve_latest_revision(repo_id: int) -> Optional[int]:
+    with get_pool().connection() as conn:
+        row = conn.execute('SELECT MAX(id) FROM revisions WHERE repo_id = ?', (repo_id,)).fetchone()
+    return row[0]
+
+def store_artifact(repo_id: int, revision_id: int, name: str, data: bytes) -> None:
+    """
+    Save a named artifact of a revision, replacing an earlier one of the same
+    name. Only the newest ARTIFACT_REVISIONS revisions of each artifact are kept.
+    """
+    digest = content_hash(data)
+    with get_pool().connection() as conn:
+        _store_blobs(conn, {digest: data})
+        conn.execute('INSERT OR REPLACE INTO artifacts (repo_id, revision_id, name, hash, updated_at) '
+                     'VALUES (?, ?, ?, ?, ?)', (repo_id, revision_id, name, digest, time.time()))
+        stale = conn.execute('SELECT revision_id, hash FROM artifacts WHERE repo_id = ? AND name = ? '
+                             'ORDER BY revision_id DESC LIMIT -1 OFFSET ?',
+                             (repo_id, name, ARTIFACT_REVISIONS)).fetchall()
+        conn.executemany('DELETE FROM artifacts WHERE repo_id = ? AND name = ? AND revision_id = ?',
+                         [(repo_id, name, revision) for revision, _ in stale])
+        # Drop the blobs of pruned artifacts that nothing else refers to
+        conn.executemany('DELETE FROM blobs WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM artifacts WHERE hash = ?) '
+                         'AND NOT EXISTS (SELECT 1 FROM revisions WHERE manifest_hash = ?) '
+                         'AND NOT EXISTS (SELECT 1 FROM ast_data WHERE content_hash = ?)',
+                         [(old_hash,) * 4 for _, old_hash in stale])
+        conn.commit()
+
+def retrieve_artifact(repo_id: int, name: str, revision_id: Optional[int] = None) -> Optional[bytes]:
+    """A named artifact of the given revision, or of the newest revision that has one."""
+    with get_pool().connection() as conn:
+        if revision_id is None:
+            row = conn.execute('SELECT hash FROM artifacts WHERE repo_id = ? AND name = ? '
+                               'ORDER BY revision_id DESC LIMIT 1', (repo_id, name)).fetchone()
+        else:
+            row = conn.execute('SELECT hash FROM artifacts WHERE repo_id = ? AND name = ? AND revision_id = ?',
+                               (repo_id, name, revision_id)).fetchone()
+    return retrieve_blob(row[0]) if row else None
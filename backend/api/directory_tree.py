@@ -0,0 +1,152 @@
+# backend/api/directory_tree.py
+import json
+import posixpath
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+import networkx as nx
+
+# Aggregates kept per directory, over everything under it
+COUNT_FIELDS = ('files', 'symbols', 'imports_in', 'imports_out')
+
+def symbol_count(file_info: Mapping[str, Any]) -> int:
+    symbols = file_info.get("symbols")
+    if symbols is not None:
+        return len(symbols)
+    return len(file_info.get("functions", [])) + len(file_info.get("classes", []))
+
+def import_sources(G: nx.DiGraph, file_path: str) -> Iterator[Optional[str]]:
+    """
+    The file each import of `file_path` in the graph comes from, or None for
+    packages and headers outside the repository.
+    """
+    for source in G.predecessors(file_path):
+        node_type = G.nodes[source].get("type")
+        if node_type == "file":
+            yield source
+        elif node_type == "import":
+            yield source.split("::", 1)[0]
+        elif node_type in ("package", "header"):
+            yield None
+
+def _is_under(file_path: str, directory: str) -> bool:
+    return not directory or file_path.startswith(directory + '/')
+
+class DirectoryTree:
+    """
+    The directories of a repository with the files directly in each, built in
+    one pass over the file paths from a child -> parent map. `counts` holds,
+    per directory and for everything under it, the number of files and
+    symbols, imports of its files from outside it (`imports_in`) and imports
+    its files make of anything outside it, packages included (`imports_out`).
+    The root is ''.
+    """
+
+    def __init__(self):
+        self.parent = {'': None}
+        self.children = defaultdict(list)
+        self.files = defaultdict(list)
+        self.counts = {}
+
+    @classmethod
+    def build(cls, ast_data: Mapping[str, Any], G: Optional[nx.DiGraph] = None) -> 'DirectoryTree':
+        """The tree of `ast_data`'s files; import counts need the dependency graph `G`."""
+        tree = cls()
+        own = defaultdict(lambda: dict.fromkeys(COUNT_FIELDS, 0))
+        for file_path, file_info in ast_data.items():
+            directory = posixpath.dirname(file_path)
+            tree.files[directory].append(file_path)
+            own[directory]['files'] += 1
+            own[directory]['symbols'] += symbol_count(file_info)
+            # Climb only until a directory that is already known
+            while directory not in tree.parent:
+                parent = posixpath.dirname(directory)
+                tree.parent[directory] = parent
+                tree.children[parent].append(directory)
+                directory = parent
+
+        if G is not None:
+            for file_path in ast_data:
+                if not G.has_node(file_path):
+                    continue
+                for source in import_sources(G, file_path):
+                    if source is not None and source not in ast_data:
+                        source = None
+                    # Every directory between each end and the lowest one holding both sees the import cross it
+                    directory = posixpath.dirname(file_path)
+                    while directory is not None and (source is None or not _is_under(source, directory)):
+                        own[directory]['imports_out'] += 1
+                        directory = tree.parent[directory]
+                    if source is not None:
+                        directory = posixpath.dirname(source)
+                        while directory is not None and not _is_under(file_path, directory):
+                            own[directory]['imports_in'] += 1
+                            directory = tree.parent[directory]
+
+        # Deepest first, so each directory is complete before it is added to its parent
+        by_depth = defaultdict(list)
+        for directory in tree.parent:
+            by_depth[directory.count('/') + bool(directory)].append(directory)
+        for depth in sorted(by_depth, reverse=True):
+            for directory in by_depth[depth]:
+                counts = tree.counts[directory] = own[directory]
+                parent = tree.parent[directory]
+                if parent is not None:
+                    for field in ('files', 'symbols'):
+                        own[parent][field] += counts[field]
+        for files in tree.files.values():
+            files.sort()
+        for children in tree.children.values():
+            children.sort()
+        return tree
+
+    def __contains__(self, directory: str) -> bool:
+        return directory in self.parent
+
+    def directories(self) -> List[str]:
+        """Every directory but the root."""
+        return [directory for directory in self.parent if directory]
+
+    def files_under(self, directory: str = '') -> Iterator[str]:
+        """Every file in `directory` and its sub-directories."""
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            yield from self.files.get(current, ())
+            stack.extend(self.children.get(current, ()))
+
+    def summary(self, directory: str = '') -> Dict[str, Any]:
+        """A directory's counts, its files and its immediate sub-directories with their counts."""
+        directory = directory.strip('/')
+        return {
+            "directory": directory,
+            **self.counts[directory],
+            "files": [posixpath.basename(file_path) for file_path in self.files.get(directory, ())],
+            "directories": [{"name": posixpath.basename(child), **self.counts[child]}
+                            for child in self.children.get(directory, ())],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"directories": {directory: [parent, self.files.get(directory, []),
+                                            [self.counts[directory][field] for field in COUNT_FIELDS]]
+                                for directory, parent in self.parent.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DirectoryTree':
+        tree = cls()
+        for directory, (parent, files, counts) in data["directories"].items():
+            tree.parent[directory] = parent
+            if parent is not None:
+                tree.children[parent].append(directory)
+            if files:
+                tree.files[directory] = files
+            tree.counts[directory] = dict(zip(COUNT_FIELDS, counts))
+        for children in tree.children.values():
+            children.sort()
+        return tree
+
+    def dumps(self) -> bytes:
+        return json.dumps(self.to_dict(), separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'DirectoryTree':
+        return cls.from_dict(json.loads(data))
@@ -0,0 +1,334 @@
+# backend/api/file_filter.py
+import os
+import re
+import posixpath
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+# Files larger than this are never fetched or parsed
+MAX_FILE_BYTES = int(os.getenv("VISDEP_MAX_FILE_BYTES", str(1024 * 1024)))
+# Set to 0 to ingest files a .gitignore excludes (they can still be committed)
+HONOR_GITIGNORE = os.getenv("VISDEP_HONOR_GITIGNORE", "1") == "1"
+PROJECT_IGNORE_FILE = ".visdepignore"
+RULES_FILE_NAMES = (".gitignore", ".gitattributes", PROJECT_IGNORE_FILE)
+
+# gitignore syntax, applied from the repository root before any repository rules
+DEFAULT_IGNORE_PATTERNS = [
+    ".git/",
+    "node_modules/",
+    "bower_components/",
+    "__pycache__/",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "package-lock.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+    "Pipfile.lock",
+    "Cargo.lock",
+    "Gemfile.lock",
+    "composer.lock",
+    "go.sum",
+] + [pattern for pattern in os.getenv("VISDEP_IGNORE_PATTERNS", "").split(",") if pattern]
+
+BINARY_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.tif', '.tiff', '.psd',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.tar', '.jar', '.war', '.whl', '.egg',
+    '.exe', '.dll', '.so', '.dylib', '.a', '.o', '.obj', '.lib', '.class', '.pyc', '.pyo', '.wasm',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot',
+    '.mp3', '.mp4', '.wav', '.ogg', '.flac', '.avi', '.mov', '.mkv', '.webm',
+    '.sqlite', '.db', '.bin', '.dat', '.pkl', '.npy', '.npz', '.h5', '.onnx', '.pt',
+}
+# Git's own heuristic: a NUL byte early in the file means binary
+_BINARY_SNIFF_BYTES = 8000
+
+def is_rules_file(path: str) -> bool:
+    return posixpath.basename(path) in RULES_FILE_NAMES
+
+def _glob_to_regex(pattern: str) -> str:
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            out.append('[^/]*')
+        elif char == '?':
+            out.append('[^/]')
+        elif char == '[':
+            close = pattern.find(']', i + 2)
+            if close == -1:
+                out.append(re.escape(char))
+            else:
+                body = pattern[i + 1:close]
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = close
+        elif char == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return ''.join(out)
+
+def _pattern_regex(base: str, pattern: str) -> str:
+    """Regex over repository-relative paths for a gitignore-style pattern found in directory `base`."""
+    # A slash anywhere but the end anchors the pattern to `base`; otherwise it matches at any depth
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    prefix = re.escape(base) + '/' if base else ''
+    return prefix + ('' if anchored else '(?:.*/)?') + _glob_to_regex(pattern)
+
+class _RuleSet:
+    """
+    Ordered (regex, value) rules where the last matching rule wins, evaluated
+    with a single combined regex: alternatives are tried highest priority
+    first, and the index of the matching group names the rule. The regex and
+    its values are swapped in together, so a match never pairs a new regex
+    with old values.
+    """
+
+    def __init__(self):
+        self._rules = []  # (depth of base directory, order, regex, value)
+        self._compiled = None  # (regex, values), rebuilt after rules are added
+        self._lock = threading.Lock()
+
+    def add(self, depth: int, regex: str, value: Any) -> None:
+        with self._lock:
+            self._rules.append((depth, len(self._rules), regex, value))
+            self._compiled = None
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match(self, path: str) -> Optional[Any]:
+        compiled = self._compiled
+        if compiled is None:
+            with self._lock:
+                if self._compiled is None and self._rules:
+                    # Rules from deeper directories override shallower ones, then later lines earlier ones
+                    ordered = sorted(self._rules, reverse=True)
+                    self._compiled = (re.compile('|'.join(f'({regex})$' for _, _, regex, _ in ordered)),
+                                      [value for _, _, _, value in ordered])
+                compiled = self._compiled
+            if compiled is None:
+                return None
+        regex, values = compiled
+        match = regex.match(path)
+        return values[match.lastindex - 1] if match else None
+
+class PathFilter:
+    """
+    Decides which repository paths are ingested at all. Paths are excluded by
+    .gitignore and .visdepignore rules (gitignore syntax, nested files
+    included), by .gitattributes linguist-generated / linguist-vendored, by
+    DEFAULT_IGNORE_PATTERNS, and by size and binary-content caps. Rules files
+    are added with `load` as they are discovered; `skipped` counts exclusions
+    by reason. Fetch threads may `load` while parse threads ask about paths:
+    both take the filter's lock.
+    """
+
+    def __init__(self, patterns: Iterable[str] = DEFAULT_IGNORE_PATTERNS, max_bytes: int = MAX_FILE_BYTES,
+                 honor_gitignore: bool = HONOR_GITIGNORE):
+        self.max_bytes = max_bytes
+        self.honor_gitignore = honor_gitignore
+        self.skipped = Counter()
+        self._file_rules = _RuleSet()
+        self._directory_rules = _RuleSet()
+        self._attributes = {'generated': _RuleSet(), 'vendored': _RuleSet()}
+        self._directory_cache = {}
+        self._lock = threading.RLock()
+        self._add_ignore_rules('', '\n'.join(patterns), depth=-1)
+
+    def load(self, path: str, content: Union[str, bytes]) -> None:
+        """Add the rules in a .gitignore, .gitattributes or .visdepignore found at `path`."""
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'replace')
+        base = posixpath.dirname(path.strip('/'))
+        name = posixpath.basename(path)
+        with self._lock:
+            if name == '.gitattributes':
+                self._add_attributes(base, content)
+            elif name == PROJECT_IGNORE_FILE or (name == '.gitignore' and self.honor_gitignore):
+                self._add_ignore_rules(base, content)
+            self._directory_cache.clear()
+
+    def _add_ignore_rules(self, base: str, content: str, depth: Optional[int] = None) -> None:
+        depth = base.count('/') + 1 if base and depth is None else (depth or 0)
+        for line in content.splitlines():
+            if line.endswith('\\ '):
+                line = line[:-2].rstrip() + '\\ '
+            else:
+                line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            excluded = True
+            if line.startswith('!'):
+                excluded, line = False, line[1:]
+            elif line.startswith(('\\!', '\\#')):
+                line = line[1:]
+            directory_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            regex = _pattern_regex(base, line)
+            self._directory_rules.add(depth, regex, excluded)
+            if not directory_only:
+                self._file_rules.add(depth, regex, excluded)
+
+    def _add_attributes(self, base: str, content: str) -> None:
+        depth = base.count('/') + 1 if base else 0
+        for line in content.splitlines():
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            regex = _pattern_regex(base, fields[0])
+            for attribute in fields[1:]:
+                name, _, value = attribute.lstrip('-!').partition('=')
+                if not name.startswith('linguist-') or name[len('linguist-'):] not in self._attributes:
+                    continue
+                state = not attribute.startswith(('-', '!')) and value.lower() not in ('false', '0')
+                self._attributes[name[len('linguist-'):]].add(depth, regex, state)
+
+    def _directory_excluded(self, directory: str) -> bool:
+        if directory not in self._directory_cache:
+            parent = posixpath.dirname(directory)
+            # Nothing inside an excluded directory can be re-included
+            self._directory_cache[directory] = bool(
+                (parent and self._directory_excluded(parent)) or self._directory_rules.match(directory))
+        return self._directory_cache[directory]
+
+    def excluded(self, path: str, size: Optional[int] = None) -> Optional[str]:
+        """Why `path` (of `size` bytes, when known) should not be ingested, or None."""
+        path = path.strip('/')
+        directory = posixpath.dirname(path)
+        with self._lock:
+            if (directory and self._directory_excluded(directory)) or self._file_rules.match(path):
+                return "ignored"
+            for attribute, rules in self._attributes.items():
+                if rules and rules.match(path):
+                    return attribute
+        if size is not None and size > self.max_bytes:
+            return "too large"
+        if posixpath.splitext(path)[1].lower() in BINARY_EXTENSIONS:
+            return "binary"
+        return None
+
+    def content_excluded(self, data: Union[str, bytes]) -> Optional[str]:
+        """Why already-read content should not be parsed, or None."""
+        if isinstance(data, str):
+            # Characters never outnumber bytes; only encode when the answer depends on it
+            if len(data) > self.max_bytes or (len(data) * 4 > self.max_bytes and
+                                              len(data.encode('utf-8', 'surrogateescape')) > self.max_bytes):
+                return "too large"
+            return "binary" if '\0' in data[:_BINARY_SNIFF_BYTES] else None
+        if len(data) > self.max_bytes:
+            return "too large"
+        return "binary" if b'\0' in data[:_BINARY_SNIFF_BYTES] else None
+
+    def _skip(self, reason: str) -> None:
+        with self._lock:
+            self.skipped[reason] += 1
+
+    def accepts(self, path: str, size: Optional[int] = None) -> bool:
+        reason = self.excluded(path, size)
+        if reason is not None:
+            self._skip(reason)
+        return reason is None
+
+    def accepts_directory(self, directory: str) -> bool:
+        with self._lock:
+            excluded = self._directory_excluded(directory.strip('/'))
+        if excluded:
+            self._skip("ignored")
+        return not excluded
+
+    def accepts_content(self, data: Union[str, bytes]) -> bool:
+        reason = self.content_excluded(data)
+        if reason is not None:
+            self._skip(reason)
+        return reason is None
+
+    def select(self, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The {'path', 'size'?} entries that pass, counting the rest in `skipped`."""
+        return [entry for entry in entries if self.accepts(entry['path'], entry.get('size'))]
+
+def rules_files_for(paths: Iterable[str], prefix: str = '') -> List[str]:
+    """Rules files that can affect paths under `prefix`: those in its ancestors and below it."""
+    prefix = prefix.strip('/')
+    ancestors = set(_ancestors(prefix))
+    selected = []
+    for path in paths:
+        if not is_rules_file(path):
+            continue
+        base = posixpath.dirname(path)
+        if not prefix or base in ancestors or base == prefix or base.startswith(prefix + '/'):
+            selected.append(path)
+    return selected
+
+def filter_from_files(files: Iterable[Dict[str, Any]]) -> PathFilter:
+    """A filter loaded from {'path', 'content'} records of rules files."""
+    path_filter = PathFilter()
+    for file in files:
+        if is_rules_file(file['path']) and file.get('content') is not None:
+            path_filter.load(file['path'], file['content'])
+    return path_filter
+
+def _ancestors(prefix: str) -> List[str]:
+    """'' and every proper ancestor directory of `prefix`."""
+    parts = prefix.strip('/').split('/') if prefix.strip('/') else []
+    return ['/'.join(parts[:i]) for i in range(len(parts))]
+
+def walk_directory(directory_path: str, path_filter: PathFilter,
+                   sub_directory: Optional[str] = None) -> Iterable[Tuple[str, str, int]]:
+    """
+    Yield (relative_path, full_path, size) for the files under `sub_directory`
+    that `path_filter` accepts. Excluded directories are pruned without being
+    listed, and each directory's rules files are loaded before its entries
+    are looked at.
+    """
+    prefix = (sub_directory or '').strip('/')
+    for ancestor in _ancestors(prefix):
+        for name in RULES_FILE_NAMES:
+            _load_rules_file(path_filter, directory_path, posixpath.join(ancestor, name))
+
+    start = os.path.join(directory_path, prefix) if prefix else directory_path
+    for root, dirs, files in os.walk(start):
+        relative_root = os.path.relpath(root, directory_path).replace(os.sep, '/')
+        relative_root = '' if relative_root == '.' else relative_root
+        for name in files:
+            if name in RULES_FILE_NAMES:
+                _load_rules_file(path_filter, directory_path, posixpath.join(relative_root, name))
+        dirs[:] = sorted(d for d in dirs if path_filter.accepts_directory(posixpath.join(relative_root, d)))
+        for name in sorted(files):
+            relative_path = posixpath.join(relative_root, name)
+            full_path = os.path.join(root, name)
+            if not os.path.isfile(full_path):
+                continue
+            # Path rules first, so excluded files cost no stat call
+            if not path_filter.accepts(relative_path):
+                continue
+            size = os.path.getsize(full_path)
+            if size > path_filter.max_bytes:
+                path_filter._skip("too large")
+                continue
+            yield relative_path, full_path, size
+
+def _load_rules_file(path_filter: PathFilter, directory_path: str, relative_path: str) -> None:
+    try:
+        with open(os.path.join(directory_path, relative_path), 'rb') as f:
+            path_filter.load(relative_path, f.read())
+    except OSError:
+        pass
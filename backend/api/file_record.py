@@ -0,0 +1,205 @@
+# backend/api/file_record.py
+import json
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+from backend.api.symbols import make_symbol
+
+# Name lists stored as string-table indices; everything else a parser returns
+# (sizes, errors, includes, ...) is kept as-is in `extra`
+NAME_FIELDS = ('functions', 'classes', 'imports', 'tags')
+# Per symbol: kind, name, parent (-1 for none), start/end line, start/end byte (-1 when unknown)
+_SYMBOL_WIDTH = 7
+RECORD_FORMAT = 1
+
+class StringTable:
+    """Each distinct string stored once and referred to by its index."""
+
+    __slots__ = ('strings', '_index')
+
+    def __init__(self, strings: Optional[List[str]] = None):
+        self.strings = []
+        self._index = {}
+        for string in strings or []:
+            self.intern(string)
+
+    def intern(self, string: str) -> int:
+        index = self._index.get(string)
+        if index is None:
+            index = self._index[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    def __getitem__(self, index: int) -> str:
+        return self.strings[index]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+def _optional(value: Optional[int]) -> int:
+    return -1 if value is None else value
+
+class FileRecord:
+    """
+    The parse result of one file without its content, in a few flat arrays
+    of string-table indices instead of lists of strings and symbol dicts.
+    Reads like the dict it was built from (`get`, `[]`, `in`), decoding on access.
+    """
+
+    __slots__ = ('table', 'names', 'symbols', 'extra')
+
+    def __init__(self, table: StringTable, names: Dict[str, array], symbols: array, extra: Optional[Dict[str, Any]]):
+        self.table = table
+        self.names = names
+        self.symbols = symbols
+        self.extra = extra
+
+    @classmethod
+    def from_info(cls, info: Dict[str, Any], table: StringTable) -> 'FileRecord':
+        names = {}
+        symbols = array('q')
+        extra = {}
+        for key, value in info.items():
+            if key == 'content':
+                continue
+            if key in NAME_FIELDS and isinstance(value, list):
+                names[key] = array('I', [table.intern(str(name)) for name in value])
+            elif key == 'symbols':
+                for symbol in value:
+                    parent = symbol['parent']
+                    symbols.extend((table.intern(symbol['kind']), table.intern(symbol['name']),
+                                    -1 if parent is None else table.intern(parent),
+                                    symbol['start_line'], symbol['end_line'],
+                                    _optional(symbol['start_byte']), _optional(symbol['end_byte'])))
+            else:
+                extra[key] = value
+        if 'symbols' not in info:
+            symbols = None
+        return cls(table, names, symbols, extra or None)
+
+    def _decode_symbols(self) -> List[Dict[str, Any]]:
+        table, flat = self.table, self.symbols
+        symbols = []
+        for i in range(0, len(flat), _SYMBOL_WIDTH):
+            kind, name, parent, start_line, end_line, start_byte, end_byte = flat[i:i + _SYMBOL_WIDTH]
+            symbols.append(make_symbol(table[kind], table[name], table[parent] if parent >= 0 else None,
+                                       start_line, end_line,
+                                       start_byte if start_byte >= 0 else None, end_byte if end_byte >= 0 else None))
+        return symbols
+
+    def keys(self) -> List[str]:
+        keys = list(self.names)
+        if self.symbols is not None:
+            keys.append('symbols')
+        return keys + list(self.extra or ())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.names:
+            return [self.table[index] for index in self.names[key]]
+        if key == 'symbols':
+            return self._decode_symbols() if self.symbols is not None else default
+        return (self.extra or {}).get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.names or (key == 'symbols' and self.symbols is not None) or key in (self.extra or ())
+
+    def to_info(self) -> Dict[str, Any]:
+        return {key: self.get(key) for key in self.keys()}
+
+    def to_compact(self) -> List[Any]:
+        return [{key: list(indices) for key, indices in self.names.items()},
+                list(self.symbols) if self.symbols is not None else None,
+                self.extra]
+
+    @classmethod
+    def from_compact(cls, data: List[Any], table: StringTable) -> 'FileRecord':
+        names, symbols, extra = data
+        return cls(table, {key: array('I', indices) for key, indices in names.items()},
+                   array('q', symbols) if symbols is not None else None, extra)
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.to_info()!r})"
+
+class FileRecordSet(Mapping):
+    """
+    Records of a whole repository, keyed by path, sharing one string table.
+    Used wherever parse results are held for the length of an ingestion
+    instead of content-carrying dicts; `meta` travels with the serialized form.
+    """
+
+    def __init__(self, table: Optional[StringTable] = None, meta: Optional[Dict[str, Any]] = None):
+        self.table = table if table is not None else StringTable()
+        self.meta = dict(meta or {})
+        self._records = {}
+
+    @classmethod
+    def from_infos(cls, infos: Mapping) -> 'FileRecordSet':
+        records = cls()
+        for file_path, info in infos.items():
+            records.add(file_path, info)
+        return records
+
+    def add(self, file_path: str, info: Dict[str, Any]) -> FileRecord:
+        record = info if isinstance(info, FileRecord) and info.table is self.table else \
+            FileRecord.from_info(info if isinstance(info, dict) else info.to_info(), self.table)
+        self._records[file_path] = record
+        return record
+
+    def discard(self, file_path: str) -> None:
+        self._records.pop(file_path, None)
+
+    def copy(self) -> 'FileRecordSet':
+        """A shallow copy; records are never modified in place, so the two sets can diverge safely."""
+        records = FileRecordSet(self.table, self.meta)
+        records._records = dict(self._records)
+        return records
+
+    def __getitem__(self, file_path: str) -> FileRecord:
+        return self._records[file_path]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, file_path: object) -> bool:
+        return file_path in self._records
+
+    def to_compact(self) -> Dict[str, Any]:
+        return {
+            "format": RECORD_FORMAT,
+            "meta": self.meta,
+            "strings": self.table.strings,
+            "files": {file_path: record.to_compact() for file_path, record in self._records.items()},
+        }
+
+    @classmethod
+    def from_compact(cls, data: Dict[str, Any]) -> 'FileRecordSet':
+        if data.get("format") != RECORD_FORMAT:
+            raise ValueError(f"Unsupported file record format {data.get('format')!r}")
+        records = cls(StringTable(data["strings"]), data.get("meta"))
+        for file_path, record in data["files"].items():
+            records._records[file_path] = FileRecord.from_compact(record, records.table)
+        return records
+
+    def dumps(self) -> bytes:
+        return json.dumps(self.to_compact(), separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'FileRecordSet':
+        return cls.from_compact(json.loads(data))
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_compact(), f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'FileRecordSet':
+        with open(path, 'r') as f:
+            return cls.from_compact(json.load(f))
@@ -1,8 +1,34 @@
 # dependency_extraction/backend/api/github_api.py
+import os
+import json
+import time
+import random
+import hashlib
+import asyncio
+import threading
 import requests
 from requests.auth import HTTPBasicAuth
+import httpx
 import base64
 import re
+import tarfile
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from backend.api.blob_cache import CACHE_DIR, get_blob_cache, get_etag_cache, git_blob_sha
+from backend.api.pipeline import emit_from_thread
+from backend.api.file_filter import PathFilter, is_rules_file, rules_files_for
+
+# Point at a local mock server in tests, or at a GitHub Enterprise instance
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip('/')
+DEFAULT_FETCH_CONCURRENCY = int(os.getenv("GITHUB_FETCH_CONCURRENCY", "16"))
+GITHUB_REQUESTS_PER_SECOND = float(os.getenv("GITHUB_REQUESTS_PER_SECOND", "15"))
+GITHUB_REQUEST_BURST = int(os.getenv("GITHUB_REQUEST_BURST", "30"))
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "5"))
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "checkpoints")
+# Seconds between checkpoint writes while a Contents API fetch is walking the tree
+CHECKPOINT_INTERVAL = float(os.getenv("GITHUB_CHECKPOINT_INTERVAL", "2"))
+# Above this many uncached blobs a single archive download beats per-blob requests
+ARCHIVE_FALLBACK_THRESHOLD = int(os.getenv("GITHUB_ARCHIVE_THRESHOLD", "500"))
 
 def normalize_repo_url(repo_url):
     # Remove trailing slash if present
@@ -15,62 +41,577 @@ def normalize_repo_url(repo_url):
     else:
         raise ValueError("Invalid GitHub repository URL")
 
-def fetch_repo_content(repo_url, auth_token, sub_directory=None):
+def repo_api_url(repo_url):
+    return f"{GITHUB_API_URL}/repos/{repo_url.split('github.com/')[-1]}"
+
+def _at_ref(url, ref):
+    """`url` with its `ref` query parameter set to `ref`."""
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != 'ref'] + [('ref', ref)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+def _header_int(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class RateLimitScheduler:
+    """
+    Shared pacing for all GitHub API traffic: a token bucket caps the request
+    rate, X-RateLimit-Remaining/Reset and Retry-After block further requests
+    until the limit resets, and rate-limited, 5xx or dropped requests are
+    retried with exponential backoff.
+    """
+
+    def __init__(self, rate=GITHUB_REQUESTS_PER_SECOND, burst=GITHUB_REQUEST_BURST,
+                 max_retries=GITHUB_MAX_RETRIES, backoff=1.0, max_backoff=60.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.remaining = None
+        self.retries = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how many seconds to wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(delay, self._blocked_until - now)
+
+    def retry_delay(self, status_code, headers, attempt):
+        """Record rate-limit headers; return seconds to wait before a retry, or None to accept the response."""
+        remaining = _header_int(headers, 'X-RateLimit-Remaining')
+        reset = _header_int(headers, 'X-RateLimit-Reset')
+        retry_after = _header_int(headers, 'Retry-After')
+        rate_limited = status_code == 429 or (status_code == 403 and (remaining == 0 or retry_after is not None))
+
+        wait = None
+        if rate_limited and retry_after is not None:
+            wait = retry_after
+        elif remaining == 0 and reset is not None:
+            wait = max(0.0, reset - time.time())
+        with self._lock:
+            if remaining is not None:
+                self.remaining = remaining
+            if wait is not None:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + wait)
+
+        if not (rate_limited or status_code >= 500) or attempt >= self.max_retries:
+            return None
+        with self._lock:
+            self.retries += 1
+        if wait is not None:
+            return wait
+        return self._backoff(attempt)
+
+    def _backoff(self, attempt):
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def request(self, url, headers=None, **kwargs):
+        attempt = 0
+        while True:
+            delay = self.reserve()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                response = requests.get(url, headers=headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            delay = self.retry_delay(response.status_code, response.headers, attempt)
+            if delay is None:
+                return response
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    async def arequest(self, client, url, **kwargs):
+        attempt = 0
+        while True:
+            delay = self.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                response = await client.get(url, **kwargs)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            delay = self.retry_delay(response.status_code, response.headers, attempt)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+_scheduler = None
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RateLimitScheduler()
+    return _scheduler
+
+class FetchCheckpoint:
+    """
+    Directory listings already walked by a Contents API fetch, persisted as
+    the fetch goes (at most every CHECKPOINT_INTERVAL seconds) and when it
+    fails, so a rerun after an error, a kill or a restart resumes where it
+    stopped. The key is the root listing URL pinned to a commit SHA, so
+    listings of another commit are never reused. File contents are resumed
+    from the blob cache.
+    """
+
+    def __init__(self, key):
+        self.path = os.path.join(CHECKPOINT_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+        self.saved_at = time.monotonic()
+        try:
+            with open(self.path, 'r') as f:
+                self.listings = json.load(f)
+        except (OSError, ValueError):
+            self.listings = {}
+
+    def add(self, url, listing):
+        self.listings[url] = listing
+        if time.monotonic() - self.saved_at >= CHECKPOINT_INTERVAL:
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Written aside and renamed, so a kill mid-write leaves the previous checkpoint intact
+        partial = f"{self.path}.{os.getpid()}.tmp"
+        with open(partial, 'w') as f:
+            json.dump(self.listings, f)
+        os.replace(partial, self.path)
+        self.saved_at = time.monotonic()
+
+    def clear(self):
+        self.listings = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def conditional_get_json(url, headers):
+    """GET a JSON resource, revalidating a previously seen ETag so unchanged responses come back as 304."""
+    etag_cache = get_etag_cache()
+    cached = etag_cache.get(url)
+    request_headers = dict(headers)
+    if cached:
+        request_headers['If-None-Match'] = cached[0]
+    response = get_scheduler().request(url, headers=request_headers)
+    if cached and response.status_code == 304:
+        return cached[1]
+    response.raise_for_status()
+    body = response.json()
+    if 'ETag' in response.headers:
+        etag_cache.put(url, response.headers['ETag'], body)
+    return body
+
+def fetch_repo_content(repo_url, auth_token, sub_directory=None, ref=None, bulk=False):
+    if bulk:
+        return fetch_repo_archive(repo_url, auth_token, sub_directory, ref)
+
+    blob_cache = get_blob_cache()
+    path_filter = PathFilter()
+
     def fetch_directory_content(api_url, headers):
-        response = requests.get(api_url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        if api_url not in checkpoint.listings:
+            checkpoint.add(api_url, [
+                {key: file.get(key) for key in ('type', 'url', 'path', 'sha', 'size')}
+                for file in conditional_get_json(api_url, headers)
+            ])
+        return checkpoint.listings[api_url]
 
     def fetch_file_content(file_path, headers):
-        file_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{file_path}"
-        file_response = requests.get(file_url, headers=headers)
+        file_url = _at_ref(f"{repo_api_url(repo_url)}/contents/{file_path}", commit_sha)
+        file_response = get_scheduler().request(file_url, headers=headers)
         file_response.raise_for_status()
         file_data = file_response.json()
         if 'content' in file_data:
+            data = base64.b64decode(file_data['content'])
+            if file_data.get('sha'):
+                blob_cache.put(file_data['sha'], data)
             try:
-                file_data['content'] = base64.b64decode(file_data['content']).decode('utf-8')
+                file_data['content'] = data.decode('utf-8')
             except UnicodeDecodeError:
                 file_data['content'] = None
         else:
             file_data['content'] = ''
         return file_data
 
+    def fetch_file(file, headers):
+        cached = blob_cache.get(file['sha']) if file.get('sha') else None
+        if cached is not None:
+            try:
+                return dict(file, content=cached.decode('utf-8'))
+            except UnicodeDecodeError:
+                return None
+        file_content = fetch_file_content(file['path'], headers)
+        return file_content if file_content['content'] is not None else None
+
     def fetch_recursive(api_url, headers):
         content = fetch_directory_content(api_url, headers)
         result = []
+        # A directory's rules files decide which of its siblings are fetched
+        rules_files = {}
+        for file in content:
+            if file['type'] == 'file' and is_rules_file(file['path']):
+                rules_files[file['path']] = fetch_file(file, headers)
+                if rules_files[file['path']] is not None:
+                    path_filter.load(file['path'], rules_files[file['path']]['content'])
         for file in content:
             if file['type'] == 'dir':
-                result.extend(fetch_recursive(file['url'], headers))
-            else:
-                file_content = fetch_file_content(file['path'], headers)
-                if file_content['content'] is not None:
+                if path_filter.accepts_directory(file['path']):
+                    result.extend(fetch_recursive(_at_ref(file['url'], commit_sha), headers))
+            elif path_filter.accepts(file['path'], file.get('size')):
+                file_content = rules_files[file['path']] if file['path'] in rules_files else fetch_file(file, headers)
+                if file_content is not None and path_filter.accepts_content(file_content['content']):
                     result.append(file_content)
         return result
 
     try:
         repo_url, path = normalize_repo_url(repo_url)
-        repo_owner, repo_name = repo_url.split('github.com/')[-1].split('/')
         
         if sub_directory:
-            api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{sub_directory}"
+            api_url = f"{repo_api_url(repo_url)}/contents/{sub_directory}"
         elif path:
-            api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents{path}"
+            api_url = f"{repo_api_url(repo_url)}/contents{path}"
         else:
-            api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents"
+            api_url = f"{repo_api_url(repo_url)}/contents"
         
         headers = {'Authorization': f'token {auth_token}'}
-        repo_content = fetch_recursive(api_url, headers)
+        # Every listing is pinned to one commit, which also keys the checkpoint
+        commit_sha = fetch_commit_sha(repo_url, auth_token, ref)
+        api_url = _at_ref(api_url, commit_sha)
+        checkpoint = FetchCheckpoint(api_url)
+        try:
+            repo_content = fetch_recursive(api_url, headers)
+        except Exception:
+            checkpoint.save()
+            raise
+        checkpoint.clear()
         return repo_content
     except requests.exceptions.RequestException as e:
         raise RuntimeError(f"Error fetching repository content: {e}")
 
+def iter_repo_archive(repo_url, auth_token, sub_directory=None, ref=None, path_filter=None, load_rules=True):
+    """
+    Stream the repository as a single tarball for `ref` and yield
+    {'path', 'content'} records, filtering members by sub-directory and
+    `path_filter` on the fly; excluded members are never extracted. Rules
+    files are loaded into the filter as they stream past (git archives list
+    a directory's dotfiles before its other entries) unless `load_rules` is
+    False because the caller already loaded them.
+    """
+    try:
+        repo_url, path = normalize_repo_url(repo_url)
+
+        prefix = (sub_directory or path or '').strip('/')
+        api_url = f"{repo_api_url(repo_url)}/tarball"
+        if ref:
+            api_url = f"{api_url}/{ref}"
+
+        headers = {'Authorization': f'token {auth_token}'}
+        blob_cache = get_blob_cache()
+        path_filter = path_filter or PathFilter()
+        with get_scheduler().request(api_url, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with tarfile.open(fileobj=response.raw, mode='r|gz') as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    # Members are rooted at "<owner>-<repo>-<sha>/"
+                    file_path = member.name.split('/', 1)[-1]
+                    data = None
+                    if load_rules and is_rules_file(file_path) and rules_files_for([file_path], prefix):
+                        data = archive.extractfile(member).read()
+                        path_filter.load(file_path, data)
+                    if prefix and not (file_path == prefix or file_path.startswith(prefix + '/')):
+                        continue
+                    if not path_filter.accepts(file_path, member.size):
+                        continue
+                    if data is None:
+                        data = archive.extractfile(member).read()
+                    sha = git_blob_sha(data)
+                    blob_cache.put(sha, data)
+                    if not path_filter.accepts_content(data):
+                        continue
+                    try:
+                        content = data.decode('utf-8')
+                    except UnicodeDecodeError:
+                        continue
+                    yield {'path': file_path, 'sha': sha, 'content': content}
+    except (requests.exceptions.RequestException, tarfile.TarError) as e:
+        raise RuntimeError(f"Error fetching repository archive: {e}")
+
+def fetch_repo_archive(repo_url, auth_token, sub_directory=None, ref=None, path_filter=None):
+    return list(iter_repo_archive(repo_url, auth_token, sub_directory, ref, path_filter))
+
 def fetch_repo_metadata(repo_url, auth_token):
     try:
         repo_url, _ = normalize_repo_url(repo_url)
-        api_url = f"https://api.github.com/repos/{repo_url.split('github.com/')[-1]}"
         headers = {'Authorization': f'token {auth_token}'}
-        response = requests.get(api_url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return conditional_get_json(repo_api_url(repo_url), headers)
     except requests.exceptions.RequestException as e:
         raise RuntimeError(f"Error fetching repository metadata: {e}")
+
+def fetch_file_text(repo_url, auth_token, file_path, ref=None):
+    """The text of one file at `ref`, or None when it does not exist there or is not UTF-8."""
+    try:
+        repo_url, _ = normalize_repo_url(repo_url)
+        api_url = f"{repo_api_url(repo_url)}/contents/{file_path}"
+        headers = {'Authorization': f'token {auth_token}'}
+        response = get_scheduler().request(api_url, headers=headers, params={'ref': ref} if ref else None)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        file_data = response.json()
+        if not isinstance(file_data, dict) or file_data.get('type') != 'file':
+            return None
+        data = base64.b64decode(file_data.get('content', ''))
+        if file_data.get('sha'):
+            get_blob_cache().put(file_data['sha'], data)
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"Error fetching {file_path}: {e}")
+
+class FetchStats:
+    """Per-stage wall-clock timings and request throughput for one fetch."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.cache_hits = 0
+        self.skipped = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "cache_hits": self.cache_hits,
+            "skipped": dict(self.skipped),
+            "elapsed": round(elapsed, 4),
+            "requests_per_second": round(self.requests / elapsed, 2) if elapsed else 0.0,
+        }
+
+class AsyncGitHubSession:
+    """
+    Pooled keep-alive HTTP client for one repository, bounded to `concurrency`
+    in-flight requests. Blobs go through the SHA cache and JSON resources are
+    revalidated with their last ETag.
+    """
+
+    def __init__(self, repo_url, auth_token, concurrency=DEFAULT_FETCH_CONCURRENCY, stats=None):
+        repo_url, self.path = normalize_repo_url(repo_url)
+        self.repo_url = repo_url
+        self.auth_token = auth_token
+        self.api_base = repo_api_url(repo_url)
+        self.concurrency = concurrency
+        self.stats = stats or FetchStats()
+        self.blob_cache = get_blob_cache()
+        self.etag_cache = get_etag_cache()
+        self.scheduler = get_scheduler()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = None
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self._client = httpx.AsyncClient(headers={'Authorization': f'token {self.auth_token}'},
+                                         limits=limits, timeout=30.0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    async def get(self, url, **kwargs):
+        async with self._semaphore:
+            self.stats.requests += 1
+            response = await self.scheduler.arequest(self._client, url, **kwargs)
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+
+    async def get_json(self, url):
+        cached = self.etag_cache.get(url)
+        response = await self.get(url, headers={'If-None-Match': cached[0]} if cached else {})
+        if cached and response.status_code == 304:
+            self.stats.not_modified += 1
+            return cached[1]
+        body = response.json()
+        if 'ETag' in response.headers:
+            self.etag_cache.put(url, response.headers['ETag'], body)
+        return body
+
+    async def fetch_blob(self, path, sha):
+        data = self.blob_cache.get(sha)
+        if data is None:
+            response = await self.get(f"{self.api_base}/git/blobs/{sha}",
+                                      headers={'Accept': 'application/vnd.github.raw'})
+            data = response.content
+            self.blob_cache.put(sha, data)
+        else:
+            self.stats.cache_hits += 1
+        try:
+            content = data.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+        return {'path': path, 'sha': sha, 'content': content}
+
+    async def fetch_blobs(self, entries):
+        with self.stats.stage("blobs"):
+            blobs = await asyncio.gather(*(self.fetch_blob(entry['path'], entry['sha']) for entry in entries))
+        return [blob for blob in blobs if blob is not None]
+
+async def stream_repo_tree(repo_url, auth_token, emit, sub_directory=None, ref=None,
+                           concurrency=DEFAULT_FETCH_CONCURRENCY, path_filter=None):
+    """
+    List the whole tree with one recursive Git Trees call, then download blobs
+    concurrently over a pooled keep-alive client, awaiting `emit(record)` for
+    each file as it arrives. Repository metadata is fetched alongside the tree
+    listing. Rules files are fetched first so that paths `path_filter`
+    excludes are never downloaded. Returns (repo_metadata, stats).
+    """
+    path_filter = path_filter or PathFilter()
+    async with AsyncGitHubSession(repo_url, auth_token, concurrency) as session:
+        prefix = (sub_directory or session.path or '').strip('/')
+        stats = session.stats
+        stats.skipped = path_filter.skipped
+
+        async def fetch_metadata():
+            with stats.stage("metadata"):
+                return await session.get_json(session.api_base)
+
+        async def fetch_tree():
+            with stats.stage("tree"):
+                return await session.get_json(f"{session.api_base}/git/trees/{ref or 'HEAD'}?recursive=1")
+
+        try:
+            repo_metadata, tree = await asyncio.gather(fetch_metadata(), fetch_tree())
+
+            blobs = [entry for entry in tree.get('tree', []) if entry['type'] == 'blob']
+            rules_paths = set(rules_files_for((entry['path'] for entry in blobs), prefix))
+            with stats.stage("rules"):
+                for rules_file in await session.fetch_blobs([entry for entry in blobs if entry['path'] in rules_paths]):
+                    path_filter.load(rules_file['path'], rules_file['content'])
+
+            entries = path_filter.select(
+                entry for entry in blobs
+                if not prefix or entry['path'] == prefix or entry['path'].startswith(prefix + '/')
+            )
+            missing = sum(1 for entry in entries if entry['sha'] not in session.blob_cache)
+
+            if tree.get('truncated') or missing > ARCHIVE_FALLBACK_THRESHOLD:
+                # The tree listing is capped, or too much is uncached; one archive download wins.
+                with stats.stage("archive"):
+                    stats.requests += 1
+                    await emit_from_thread(
+                        lambda: iter_repo_archive(session.repo_url, auth_token, prefix, ref, path_filter,
+                                                  load_rules=not tree.get('truncated')), emit)
+                return repo_metadata, stats
+
+            pending = iter(entries)
+
+            async def worker():
+                for entry in pending:
+                    blob = await session.fetch_blob(entry['path'], entry['sha'])
+                    if blob is not None and path_filter.accepts_content(blob['content']):
+                        await emit(blob)
+
+            with stats.stage("blobs"):
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Error fetching repository tree: {e}")
+
+    return repo_metadata, stats
+
+async def fetch_repo_tree(repo_url, auth_token, sub_directory=None, ref=None, concurrency=DEFAULT_FETCH_CONCURRENCY,
+                          path_filter=None):
+    """Collect stream_repo_tree into a list. Returns (repo_content, repo_metadata, stats)."""
+    repo_content = []
+
+    async def collect(record):
+        repo_content.append(record)
+
+    repo_metadata, stats = await stream_repo_tree(repo_url, auth_token, collect, sub_directory, ref, concurrency,
+                                                  path_filter)
+    return repo_content, repo_metadata, stats
+
+async def fetch_repo_blobs(repo_url, auth_token, entries, concurrency=DEFAULT_FETCH_CONCURRENCY, path_filter=None):
+    """Fetch the {'path', 'sha'} entries `path_filter` accepts, concurrently. Returns (repo_content, stats)."""
+    path_filter = path_filter or PathFilter()
+    async with AsyncGitHubSession(repo_url, auth_token, concurrency) as session:
+        session.stats.skipped = path_filter.skipped
+        try:
+            repo_content = [blob for blob in await session.fetch_blobs(path_filter.select(entries))
+                            if path_filter.accepts_content(blob['content'])]
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Error fetching repository blobs: {e}")
+    return repo_content, session.stats
+
+def fetch_commit_sha(repo_url, auth_token, ref=None):
+    try:
+        repo_url, _ = normalize_repo_url(repo_url)
+        api_url = f"{repo_api_url(repo_url)}/commits/{ref or 'HEAD'}"
+        headers = {'Authorization': f'token {auth_token}', 'Accept': 'application/vnd.github.sha'}
+        response = get_scheduler().request(api_url, headers=headers)
+        response.raise_for_status()
+        return response.text.strip()
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"Error resolving commit: {e}")
+
+# The compare API lists at most this many files per response
+COMPARE_FILES_LIMIT = 300
+
+def fetch_commit_diff(repo_url, auth_token, base_sha, head_sha):
+    """
+    Return the files changed between two commits as compare-API file entries,
+    or None when head does not descend from base or the diff is too large to
+    be listed completely.
+    """
+    try:
+        repo_url, _ = normalize_repo_url(repo_url)
+        api_url = f"{repo_api_url(repo_url)}/compare/{base_sha}...{head_sha}"
+        headers = {'Authorization': f'token {auth_token}'}
+        response = get_scheduler().request(api_url, headers=headers)
+        response.raise_for_status()
+        comparison = response.json()
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"Error comparing commits: {e}")
+
+    if comparison.get('status') not in ('ahead', 'identical'):
+        return None
+    files = comparison.get('files', [])
+    if len(files) >= COMPARE_FILES_LIMIT:
+        return None
+    return files
@@ -4,94 +4,175 @@ from typing import Dict, Any
 from networkx.readwrite import json_graph
 import json
 from collections import defaultdict
+from itertools import chain
+from backend.api.directory_tree import DirectoryTree
+from backend.api.graph_layout import apply_layout, update_layout
+from backend.api.module_resolver import (
+    ModuleIndex, split_python_import, PYTHON_EXTENSIONS, JAVASCRIPT_EXTENSIONS, JAVA_EXTENSIONS, C_EXTENSIONS,
+)
 
 def create_dependency_graph(ast_data: Dict[str, Any]) -> nx.DiGraph:
     G = nx.DiGraph()
 
-    directories = set()
-    files = set()
-    methods = {}
+    # First pass: collect all methods
+    _, methods = collect_definitions(ast_data)
+    index = ModuleIndex.from_ast_data(ast_data)
     imported_methods = {}
 
-    # First pass: collect all files and methods
+    # Second pass: create nodes and edges
+    for file_path, file_info in ast_data.items():
+        add_file_node(G, file_path, file_info)
+        add_file_imports(G, file_path, file_info, index, methods, imported_methods)
+
+    # Add directory nodes and edges, with counts that take the import edges into account
+    add_directory_nodes(G, DirectoryTree.build(ast_data, G))
+
+    # Perform edge clustering
+    G = cluster_edges(G)
+
+    # Add spatial information
+    G = add_spatial_information(G)
+
+    return G
+
+def collect_definitions(ast_data: Dict[str, Any]):
+    files = set()
+    methods = {}
     for file_path, file_info in ast_data.items():
         files.add(file_path)
         for func in file_info.get("functions", []):
             methods[func] = file_path
         for cls in file_info.get("classes", []):
             methods[cls] = file_path
+    return files, methods
 
-    # Second pass: create nodes and edges
+def add_file_node(G, file_path, file_info):
+    functions = file_info.get("functions", [])
+    classes = file_info.get("classes", [])
+    file_label = f"{os.path.basename(file_path)}\nFunctions: {', '.join(functions)}\nClasses: {', '.join(classes)}"
+    G.add_node(file_path, type="file", label=file_label, shape="ellipse", level=file_path.count('/') + 1)
+
+def add_file_imports(G, file_path, file_info, index: ModuleIndex, methods, imported_methods):
+    file_extension = os.path.splitext(file_path)[1].lower()
+
+    for imp in file_info.get("imports", []):
+        if file_extension in PYTHON_EXTENSIONS:
+            handle_python_style_import(G, imp, file_path, index, methods, imported_methods)
+        elif file_extension in JAVASCRIPT_EXTENSIONS:
+            handle_javascript_style_import(G, imp, file_path, index)
+        elif file_extension in JAVA_EXTENSIONS:
+            handle_java_style_import(G, imp, file_path, index)
+        elif file_extension in ['.go']:
+            handle_go_style_import(G, imp, file_path)
+        elif file_extension in C_EXTENSIONS:
+            handle_c_style_import(G, imp, file_path, index)
+        else:
+            # Generic handling for unknown file types
+            G.add_node(imp, type="package", label=imp, shape="star", level=imp.count('.') + 1)
+            G.add_edge(imp, file_path, relation="imports")
+
+def add_directory_nodes(G, tree: DirectoryTree):
+    for directory in tree.directories():
+        counts = tree.counts[directory]
+        G.add_node(directory, type="directory", label=os.path.basename(directory), shape="box",
+                   level=directory.count('/'), file_count=counts["files"], symbol_count=counts["symbols"],
+                   imports_in=counts["imports_in"], imports_out=counts["imports_out"])
+    for directory, parent in tree.parent.items():
+        if parent:
+            G.add_edge(parent, directory, relation="contains")
+    for directory, files in tree.files.items():
+        if directory:
+            G.add_edges_from((directory, file, {"relation": "contains"}) for file in files)
+
+def update_dependency_graph(G: nx.DiGraph, ast_data: Dict[str, Any], previous_ast_data: Dict[str, Any],
+                            changed_paths, removed_paths) -> nx.DiGraph:
+    """
+    Patch a graph built from previous_ast_data so it matches ast_data, where only
+    changed_paths (added or modified) and removed_paths differ. Only the changed
+    files and the files whose imports could resolve differently are re-linked.
+    """
+    changed_paths, removed_paths = set(changed_paths), set(removed_paths)
+    stale = changed_paths | removed_paths
+    # Untouched nodes keep their place; removed files' neighbours close the gap they leave
+    positions = {node: (data['x'], data['y']) for node, data in G.nodes(data=True) if 'x' in data and 'y' in data}
+    vacated = {neighbour for file_path in removed_paths if G.has_node(file_path)
+               for neighbour in chain(G.predecessors(file_path), G.successors(file_path))}
+    _, methods = collect_definitions(ast_data)
+    _, previous_methods = collect_definitions(previous_ast_data)
+    index = ModuleIndex.from_ast_data(ast_data)
+    previous_index = ModuleIndex.from_ast_data(previous_ast_data)
+
+    # Names whose defining file moved
+    moved_names = {name for name in set(methods) | set(previous_methods)
+                   if methods.get(name) != previous_methods.get(name)}
+
+    def resolution_changed(file_path, imp):
+        if imp in moved_names:
+            return True
+        # Points elsewhere now, or at a file whose node is rebuilt along with its outgoing edges
+        target = index.resolve(file_path, imp)
+        return target != previous_index.resolve(file_path, imp) or target in changed_paths
+
+    relink = set(changed_paths)
     for file_path, file_info in ast_data.items():
-        dir_path = os.path.dirname(file_path)
-        while dir_path:
-            directories.add(dir_path)
-            dir_path = os.path.dirname(dir_path)
-
-        functions = file_info.get("functions", [])
-        classes = file_info.get("classes", [])
-        imports = file_info.get("imports", [])
-
-        file_label = f"{os.path.basename(file_path)}\nFunctions: {', '.join(functions)}\nClasses: {', '.join(classes)}"
-        G.add_node(file_path, type="file", label=file_label, shape="ellipse", level=file_path.count('/') + 1)
-
-        file_extension = os.path.splitext(file_path)[1].lower()
-
-        for imp in imports:
-            if file_extension in ['.py', '.js', '.ts']:
-                handle_python_style_import(G, imp, file_path, files, methods, imported_methods)
-            elif file_extension in ['.java', '.kt']:
-                handle_java_style_import(G, imp, file_path)
-            elif file_extension in ['.go']:
-                handle_go_style_import(G, imp, file_path)
-            elif file_extension in ['.c', '.cpp', '.h', '.hpp']:
-                handle_c_style_import(G, imp, file_path)
-            else:
-                # Generic handling for unknown file types
-                G.add_node(imp, type="package", label=imp, shape="star", level=imp.count('.') + 1)
-                G.add_edge(imp, file_path, relation="imports")
-
-    # Add directory nodes and edges
-    for directory in directories:
-        G.add_node(directory, type="directory", label=os.path.basename(directory), shape="box", level=directory.count('/'))
-        for file in files:
-            if os.path.dirname(file) == directory:
-                G.add_edge(directory, file, relation="contains")
-        subdirs = [d for d in directories if os.path.dirname(d) == directory]
-        for subdir in subdirs:
-            G.add_edge(directory, subdir, relation="contains")
+        if file_path not in stale and any(resolution_changed(file_path, imp) for imp in file_info.get("imports", [])):
+            relink.add(file_path)
 
-    # Perform edge clustering
-    G = cluster_edges(G)
+    # Drop stale file nodes, exports of removed files, and the old import edges of relinked files
+    for file_path in stale:
+        if G.has_node(file_path):
+            G.remove_node(file_path)
+    for node, data in list(G.nodes(data=True)):
+        if data.get("type") == "import" and node.split("::", 1)[0] in removed_paths:
+            G.remove_node(node)
+    for file_path in relink - stale:
+        G.remove_edges_from([(source, file_path) for source in list(G.predecessors(file_path))
+                             if G.nodes[source].get("type") != "directory"])
 
-    # Add spatial information
-    G = add_spatial_information(G)
+    exports = defaultdict(list)
+    for node, data in G.nodes(data=True):
+        if data.get("type") == "import":
+            exports[node.split("::", 1)[0]].append(node)
+    for file_path in changed_paths:
+        add_file_node(G, file_path, ast_data[file_path])
+        # Re-attach exports that unchanged importers still point at
+        for node in exports[file_path]:
+            G.add_edge(file_path, node, relation="exports")
 
-    return G
+    imported_methods = {data["label"]: node for node, data in G.nodes(data=True) if data.get("type") == "import"}
+    for file_path in relink:
+        add_file_imports(G, file_path, ast_data[file_path], index, methods, imported_methods)
 
-def add_spatial_information(G):
-    # Use a layout algorithm to determine node positions
-    pos = nx.spring_layout(G, k=0.5, iterations=50)
-    
-    # Normalize positions to range [0, 1000] for both x and y
-    min_x = min(pos.values(), key=lambda p: p[0])[0]
-    max_x = max(pos.values(), key=lambda p: p[0])[0]
-    min_y = min(pos.values(), key=lambda p: p[1])[1]
-    max_y = max(pos.values(), key=lambda p: p[1])[1]
-    
-    for node, (x, y) in pos.items():
-        normalized_x = (x - min_x) / (max_x - min_x) * 1000
-        normalized_y = (y - min_y) / (max_y - min_y) * 1000
-        G.nodes[node]['x'] = normalized_x
-        G.nodes[node]['y'] = normalized_y
-    
+    # Remove import/package/header nodes nothing depends on any more
+    for node, data in list(G.nodes(data=True)):
+        if data.get("type") in ("import", "package", "header") and G.out_degree(node) == 0:
+            G.remove_node(node)
+
+    # Re-link directories around added and removed files
+    for node, data in list(G.nodes(data=True)):
+        if data.get("type") == "directory":
+            G.remove_node(node)
+    add_directory_nodes(G, DirectoryTree.build(ast_data, G))
+
+    G = add_spatial_information(G, changed=relink | vacated, positions=positions)
     return G
 
-def handle_python_style_import(G, imp, file_path, files, methods, imported_methods):
+def add_spatial_information(G, changed=None, positions=None):
+    # Seeded, so the same graph always gets the same positions, in [0, LAYOUT_SIZE] on both axes
+    if changed is None:
+        return apply_layout(G)
+    # Warm start from the previous positions, moving only around what changed
+    return update_layout(G, changed, positions)
+
+def handle_python_style_import(G, imp, file_path, index, methods, imported_methods):
     if '.' in imp:
-        module_path, method = imp.rsplit('.', 1)
-        source_file = next((file for file in files if file.endswith(module_path.replace('.', '/') + '.py')), None)
-        if source_file:
+        module_path, method = split_python_import(imp)
+        source_file, name = index.python_import(file_path, imp)
+        if source_file and name is None:
+            # A module of the project imported whole, linked file to file
+            if source_file != file_path:
+                G.add_edge(source_file, file_path, relation="imports")
+        elif source_file:
             # This is an import from within the project
             if method not in imported_methods:
                 mid_point = f"{source_file}::{method}"
@@ -100,7 +181,9 @@ def handle_python_style_import(G, imp, file_path, files, methods, imported_metho
                 imported_methods[method] = mid_point
             G.add_edge(imported_methods[method], file_path, relation="imports")
         else:
-            # This is a package import
+            # This is a package import (`from . import x` outside the ingested files is labelled as written)
+            if not module_path.strip('.'):
+                module_path = imp
             G.add_node(module_path, type="package", label=module_path, shape="star", level=module_path.count('.') + 1)
             G.add_edge(module_path, file_path, relation="imports", label=method)
     elif imp in methods:
@@ -118,7 +201,23 @@ def handle_python_style_import(G, imp, file_path, files, methods, imported_metho
         G.add_node(imp, type="package", label=imp, shape="star", level=1)
         G.add_edge(imp, file_path, relation="imports")
 
-def handle_java_style_import(G, imp, file_path):
+def handle_javascript_style_import(G, imp, file_path, index):
+    source_file = index.javascript_module(file_path, imp)
+    if source_file:
+        # A module of the project, linked file to file
+        if source_file != file_path:
+            G.add_edge(source_file, file_path, relation="imports")
+    else:
+        # A package, or a path outside what was ingested
+        G.add_node(imp, type="package", label=imp, shape="star", level=1)
+        G.add_edge(imp, file_path, relation="imports")
+
+def handle_java_style_import(G, imp, file_path, index):
+    source_file = index.java_class(imp)
+    if source_file:
+        if source_file != file_path:
+            G.add_edge(source_file, file_path, relation="imports")
+        return
     package_path = imp.rsplit('.', 1)[0]
     G.add_node(package_path, type="package", label=package_path, shape="star", level=package_path.count('.') + 1)
     G.add_edge(package_path, file_path, relation="imports")
@@ -127,7 +226,12 @@ def handle_go_style_import(G, imp, file_path):
     G.add_node(imp, type="package", label=imp, shape="star", level=imp.count('/') + 1)
     G.add_edge(imp, file_path, relation="imports")
 
-def handle_c_style_import(G, imp, file_path):
+def handle_c_style_import(G, imp, file_path, index):
+    header_file = index.c_header(file_path, imp)
+    if header_file:
+        if header_file != file_path:
+            G.add_edge(header_file, file_path, relation="includes")
+        return
     G.add_node(imp, type="header", label=imp, shape="diamond", level=imp.count('/') + 1)
     G.add_edge(imp, file_path, relation="includes")
 
@@ -145,15 +249,19 @@ def cluster_edges(G):
     
     return G
 
+def graph_to_json(graph: nx.DiGraph) -> str:
+    return json.dumps(json_graph.node_link_data(graph))
+
+def graph_from_json(text: str) -> nx.DiGraph:
+    return json_graph.node_link_graph(json.loads(text))
+
 def save_graph_as_json(graph: nx.DiGraph, file_path: str) -> None:
-    data = json_graph.node_link_data(graph)
     with open(file_path, 'w') as f:
-        json.dump(data, f)
+        f.write(graph_to_json(graph))
 
 def load_graph_from_json(file_path: str) -> nx.DiGraph:
     with open(file_path, 'r') as f:
-        data = json.load(f)
-    return json_graph.node_link_graph(data)
+        return graph_from_json(f.read())
 
 def get_subgraph_at_level(G: nx.DiGraph, level: int) -> nx.DiGraph:
     nodes = [node for node, data in G.nodes(data=True) if data['level'] <= level]
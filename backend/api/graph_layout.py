@@ -0,0 +1,415 @@
+# backend/api/graph_layout.py
+import os
+import time
+from collections import deque
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+import numpy as np
+import networkx as nx
+from scipy.signal import fftconvolve
+from scipy.spatial import cKDTree
+
+# "force" (multilevel force-directed) or "hierarchical" (rows by the nodes' `level`)
+LAYOUT_MODES = ("force", "hierarchical")
+LAYOUT_MODE = os.getenv("VISDEP_LAYOUT_MODE", "force")
+# The same graph and seed always give the same picture
+LAYOUT_SEED = int(os.getenv("VISDEP_LAYOUT_SEED", "42"))
+# Positions are scaled into [0, LAYOUT_SIZE] on both axes
+LAYOUT_SIZE = 1000.0
+
+# Levels up to this many nodes get exact all-pairs repulsion; larger ones only feel nodes within a cutoff radius
+_EXACT_REPULSION_LIMIT = 500
+# Coarsening stops at this many nodes, or once a level no longer shrinks by at least 10%
+_COARSEST_SIZE = 50
+_MIN_SHRINK = 0.9
+# Members a center takes per level, and rounds of picking centers per level
+_CLUSTER_LIMIT = 8
+_COARSEN_ROUNDS = 4
+# Ideal edge length, in layout units before scaling
+_K = 1.0
+_CUTOFF = 3.0
+# Near-field pairs per node, so that a dense clump costs O(n) rather than O(n²)
+_NEIGHBOURS = 12
+# Upper bound on the far-field grid's cells per side
+_MESH_CELLS = 128
+_GRAVITY = 0.05
+# Incremental updates: hops around each changed node that move with it, iterations they get,
+# and the share of the graph moving above which a full layout is done instead
+_UPDATE_HOPS = 1
+_UPDATE_ITERATIONS = 60
+_UPDATE_LIMIT = 0.5
+# Ideal edge length relative to the nearest-neighbour spacing of a finished layout
+_UPDATE_SPACING = 1.5
+
+def _graph_arrays(G: nx.Graph) -> Tuple[List[Any], np.ndarray]:
+    """Nodes in a stable order and the undirected, de-duplicated edges between their indices."""
+    nodes = sorted(G.nodes, key=str)
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges() if u != v], dtype=np.int64).reshape(-1, 2)
+    return nodes, _undirected(edges, len(nodes))
+
+def _undirected(edges: np.ndarray, n: int) -> np.ndarray:
+    """Each pair once, as (low, high), without self-loops."""
+    low, high = np.minimum(edges[:, 0], edges[:, 1]), np.maximum(edges[:, 0], edges[:, 1])
+    keys = np.unique(low[low != high] * n + high[low != high])
+    return np.stack([keys // n, keys % n], axis=1)
+
+def _coarsen(n: int, edges: np.ndarray, rng: np.random.Generator) -> Tuple[np.ndarray, int]:
+    """
+    Collapse nodes into neighbouring "centers": nodes whose degree (with a
+    random tie-break) is highest among their free neighbours. Each center
+    takes at most _CLUSTER_LIMIT of the nodes picking it; the others, such
+    as the thousands of leaves of a hub, are grouped _CLUSTER_LIMIT at a
+    time, so no cluster is spread blindly. Nodes with no center among their
+    neighbours try again, among themselves, in the next round.
+    Returns the coarse cluster of each node and the number of clusters.
+    """
+    degree = np.bincount(edges.ravel(), minlength=n)
+    key = degree + rng.random(n)
+    owner = np.arange(n)
+    free = np.ones(n, dtype=bool)
+    source = np.concatenate([edges[:, 0], edges[:, 1]])
+    target = np.concatenate([edges[:, 1], edges[:, 0]])
+    for _ in range(_COARSEN_ROUNDS):
+        live = free[source] & free[target]
+        source, target = source[live], target[live]
+        if not len(source):
+            break
+        best_neighbour = np.full(n, -1.0)
+        np.maximum.at(best_neighbour, source, key[target])
+        center = free & (key > best_neighbour)
+
+        # Every other node picks its highest-keyed neighbouring center...
+        joins = ~center[source] & center[target]
+        joiner, chosen = source[joins], target[joins]
+        order = np.lexsort((key[chosen], joiner))
+        last = np.r_[joiner[order][1:] != joiner[order][:-1], True]
+        joiner, chosen = joiner[order][last], chosen[order][last]
+        # ...and a random few of those picking each center are taken
+        order = np.lexsort((rng.random(len(chosen)), chosen))
+        joiner, chosen = joiner[order], chosen[order]
+        first = np.r_[True, chosen[1:] != chosen[:-1]]
+        rank = np.arange(len(chosen)) - np.maximum.accumulate(np.where(first, np.arange(len(chosen)), 0))
+        taken = rank < _CLUSTER_LIMIT
+        owner[joiner[taken]] = chosen[taken]
+        # The rest, siblings around a hub, are grouped among themselves
+        position = np.arange(len(chosen))
+        leader = position - (rank - _CLUSTER_LIMIT) % _CLUSTER_LIMIT
+        owner[joiner[~taken]] = joiner[leader[~taken]]
+        free[joiner] = False
+        free[center] = False
+
+    roots, cluster = np.unique(owner, return_inverse=True)
+    return cluster, len(roots)
+
+def _mesh_repulsion(pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+    """
+    The far-field part of the repulsion: node masses binned on a grid and
+    convolved (by FFT) with the k²/d field of a unit mass, read back at each
+    node's cell. The field is zero within the cutoff, which the exact
+    near-field pairs cover.
+    """
+    n = len(pos)
+    cells = int(np.clip(np.sqrt(n) / 2, 16, _MESH_CELLS))
+    low = pos.min(axis=0)
+    size = max(float(np.ptp(pos, axis=0).max()), _K) * (1 + 1e-9)
+    h = size / cells
+    index = np.minimum(((pos - low) / h).astype(np.int64), cells - 1)
+    flat = index[:, 0] * cells + index[:, 1]
+    density = np.bincount(flat, weights=mass, minlength=cells * cells).reshape(cells, cells)
+
+    offsets = np.arange(-cells + 1, cells) * h
+    dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+    distance2 = dx * dx + dy * dy
+    field = np.where(distance2 > (_CUTOFF * _K) ** 2, _K ** 2 / np.maximum(distance2, 1e-9), 0.0)
+    force = np.empty_like(pos)
+    for axis, offset in enumerate((dx, dy)):
+        grid = fftconvolve(density, offset * field, mode='same')
+        force[:, axis] = grid.ravel()[flat] * mass
+    return force
+
+def _repulsion(pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+    """
+    Sum of m·m'·k²/d pushes on each node: exact on small levels; on larger ones
+    exact from the nearest nodes within the cutoff (found through a k-d
+    tree) and from the mesh beyond it.
+    """
+    n = len(pos)
+    if n <= _EXACT_REPULSION_LIMIT:
+        force = np.zeros_like(pos)
+        dx = pos[:, 0, None] - pos[None, :, 0]
+        dy = pos[:, 1, None] - pos[None, :, 1]
+        push = _K ** 2 * np.outer(mass, mass) / np.maximum(dx * dx + dy * dy, 1e-4)
+        np.fill_diagonal(push, 0)
+        force[:, 0] = (dx * push).sum(1)
+        force[:, 1] = (dy * push).sum(1)
+        return force
+    force = _mesh_repulsion(pos, mass)
+    _, neighbours = cKDTree(pos).query(pos, k=_NEIGHBOURS + 1, distance_upper_bound=_CUTOFF * _K)
+    # Column 0 is the node itself; missing neighbours come back as index n
+    i = np.repeat(np.arange(n), _NEIGHBOURS)
+    j = neighbours[:, 1:].ravel()
+    found = j < n
+    i, j = i[found], j[found]
+    delta = pos[i] - pos[j]
+    push = delta * (_K ** 2 * mass[i] * mass[j] / np.maximum((delta ** 2).sum(-1), 1e-4))[:, None]
+    for axis in range(2):
+        force[:, axis] += np.bincount(i, weights=push[:, axis], minlength=n)
+    return force
+
+def _refine(pos: np.ndarray, edges: np.ndarray, iterations: int, temperature: float,
+            movable: Optional[np.ndarray] = None, gravity: float = _GRAVITY) -> np.ndarray:
+    """
+    Fruchterman-Reingold steps with a pull to the center, capped by a
+    cooling temperature. Nodes repel in proportion to their degree (relative
+    to the median), as in ForceAtlas2, so hubs make room for their leaves.
+    Only `movable` nodes (all by default) are moved.
+    """
+    n = len(pos)
+    degree = np.bincount(edges.ravel(), minlength=n) + 1
+    mass = degree / np.median(degree)
+    cooling = (0.05 / temperature) ** (1 / max(iterations, 1)) if temperature > 0.05 else 1.0
+    for _ in range(iterations):
+        force = _repulsion(pos, mass)
+        if len(edges):
+            u, v = edges[:, 0], edges[:, 1]
+            delta = pos[u] - pos[v]
+            pull = delta * (np.sqrt((delta ** 2).sum(-1)) / _K)[:, None]
+            for axis in range(2):
+                force[:, axis] -= np.bincount(u, weights=pull[:, axis], minlength=n)
+                force[:, axis] += np.bincount(v, weights=pull[:, axis], minlength=n)
+        # Keeps loose components and leaves from drifting off
+        distance = np.maximum(np.sqrt((pos ** 2).sum(-1)), 1e-9)
+        force -= (gravity * degree / distance)[:, None] * pos
+        length = np.maximum(np.sqrt((force ** 2).sum(-1)), 1e-9)
+        step = force * (np.minimum(length, temperature) / length)[:, None]
+        if movable is not None:
+            step[~movable] = 0
+        pos = pos + step
+        temperature *= cooling
+    return pos
+
+def _iterations(n: int) -> int:
+    # Full effort on small levels, a few smoothing passes on huge ones
+    return int(np.clip(300_000 // max(n, 1), 10, 150))
+
+def force_layout(n: int, edges: np.ndarray, seed: int = LAYOUT_SEED) -> np.ndarray:
+    """
+    Multilevel force-directed layout of `n` nodes (positions in layout units).
+    The graph is coarsened until small and the coarsest level is laid out
+    with exact forces. Each finer level starts from its clusters' positions,
+    spread out to its own node count, and is refined with near-field
+    repulsion from a k-d tree and far-field repulsion from an FFT mesh.
+    """
+    rng = np.random.default_rng(seed)
+    hierarchy = []
+    while n > _COARSEST_SIZE and len(edges):
+        cluster, coarse_n = _coarsen(n, edges, rng)
+        if coarse_n > _MIN_SHRINK * n:
+            break
+        hierarchy.append((n, edges, cluster))
+        edges = _undirected(cluster[edges], coarse_n)
+        n = coarse_n
+
+    spread = np.sqrt(n) * _K
+    pos = _refine(rng.uniform(-spread, spread, (n, 2)), edges, _iterations(n), temperature=spread / 2)
+    while hierarchy:
+        coarse_n = n
+        n, edges, cluster = hierarchy.pop()
+        # Children start spread over a disc around their cluster's position, sized to hold them
+        size = np.bincount(cluster, minlength=coarse_n)[cluster]
+        radius = _K * np.sqrt(size * rng.random(n))
+        angle = rng.uniform(0, 2 * np.pi, n)
+        pos = pos[cluster] * np.sqrt(n / coarse_n) + radius[:, None] * np.stack([np.cos(angle), np.sin(angle)], 1)
+        pos = _refine(pos, edges, _iterations(n) // 2, temperature=_K * 2)
+    return pos
+
+def hierarchical_layout(levels: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    One row per `level`; within a row nodes are ordered by the mean position
+    of their neighbours in the rows above (one barycenter sweep), keeping
+    the given node order for ties and for nodes with no such neighbour.
+    """
+    n = len(levels)
+    pos = np.zeros((n, 2))
+    pos[:, 1] = levels
+    if n == 0:
+        return pos
+    # Edges oriented from the higher row to the lower one, grouped by the lower row
+    u, v = edges[:, 0], edges[:, 1]
+    upper = np.where(levels[u] < levels[v], u, v)
+    lower = np.where(levels[u] < levels[v], v, u)
+    keep = levels[upper] != levels[lower]
+    upper, lower = upper[keep], lower[keep]
+    by_row = np.argsort(levels[lower], kind='stable')
+    upper, lower = upper[by_row], lower[by_row]
+    edge_rows = levels[lower]
+
+    by_level = np.argsort(levels, kind='stable')
+    row_levels, row_starts = np.unique(levels[by_level], return_index=True)
+    slot = np.empty(n, dtype=np.int64)
+    for level, row in zip(row_levels, np.split(by_level, row_starts[1:])):
+        slot[row] = np.arange(len(row))
+        start, end = np.searchsorted(edge_rows, level, 'left'), np.searchsorted(edge_rows, level, 'right')
+        rows_below = slot[lower[start:end]]
+        total = np.bincount(rows_below, weights=pos[upper[start:end], 0], minlength=len(row))
+        count = np.bincount(rows_below, minlength=len(row))
+        # Without parents, a node keeps its place in the row
+        centered = np.arange(len(row)) - (len(row) - 1) / 2
+        barycenter = np.where(count > 0, total / np.maximum(count, 1), centered)
+        order = np.lexsort((np.arange(len(row)), barycenter))
+        pos[row[order], 0] = centered
+    return pos
+
+def normalize_positions(pos: np.ndarray, size: float = LAYOUT_SIZE) -> np.ndarray:
+    """Scale each axis into [0, size]; an axis with no extent is centered."""
+    low, high = pos.min(axis=0), pos.max(axis=0)
+    extent = np.where(high > low, high - low, 1.0)
+    scaled = (pos - low) / extent * size
+    scaled[:, high <= low] = size / 2
+    return scaled
+
+def compute_layout(G: nx.Graph, mode: Optional[str] = None, seed: Optional[int] = None) -> Dict[Any, Tuple[float, float]]:
+    """Node -> (x, y) in [0, LAYOUT_SIZE], laid out by `mode` (LAYOUT_MODE by default)."""
+    mode = mode or LAYOUT_MODE
+    nodes, edges = _graph_arrays(G)
+    if not nodes:
+        return {}
+    if mode == "hierarchical":
+        levels = np.array([G.nodes[node].get("level", 0) for node in nodes], dtype=float)
+        pos = hierarchical_layout(levels, edges)
+        # Rows and columns one unit apart would be flattened by a wide row; keep rows readable
+        pos[:, 1] *= max(1.0, np.ptp(pos[:, 0]) / max(np.ptp(pos[:, 1]), 1.0) / 2)
+    elif mode == "force":
+        pos = force_layout(len(nodes), edges, LAYOUT_SEED if seed is None else seed)
+    else:
+        raise ValueError(f"Unknown layout mode {mode!r}; expected one of {LAYOUT_MODES}")
+    pos = normalize_positions(pos)
+    return {node: (float(x), float(y)) for node, (x, y) in zip(nodes, pos)}
+
+def apply_layout(G: nx.Graph, mode: Optional[str] = None, seed: Optional[int] = None) -> nx.Graph:
+    """Store the layout as each node's `x` and `y`."""
+    for node, (x, y) in compute_layout(G, mode, seed).items():
+        G.nodes[node]['x'] = x
+        G.nodes[node]['y'] = y
+    return G
+
+def _neighbours(G: nx.Graph, node: Any) -> Iterator[Any]:
+    if G.is_directed():
+        return chain(G.predecessors(node), G.successors(node))
+    return iter(G.neighbors(node))
+
+def _layout_unit(tree: cKDTree, coords: np.ndarray, rng: np.random.Generator) -> float:
+    """
+    The ideal edge length of a stored layout, in stored coordinates, from
+    the distance between nearest neighbours (over a sample of nodes). Edge
+    lengths themselves would be skewed by long imports across the picture.
+    """
+    sample = coords[rng.choice(len(coords), min(len(coords), 2000), replace=False)]
+    spacing = np.median(tree.query(sample, k=2)[0][:, 1]) if len(coords) > 1 else 0.0
+    return float(spacing) * _UPDATE_SPACING if spacing > 0 else LAYOUT_SIZE / 10
+
+def update_layout(G: nx.Graph, changed: Iterable[Any] = (), positions: Optional[Mapping[Any, Tuple[float, float]]] = None,
+                  mode: Optional[str] = None, seed: Optional[int] = None) -> nx.Graph:
+    """
+    Re-lay out only what changed since `positions` (by default the nodes'
+    stored `x`/`y`): new nodes start next to their positioned neighbours,
+    and they, the `changed` nodes and everything within _UPDATE_HOPS of
+    either move for _UPDATE_ITERATIONS steps among the fixed nodes around
+    them, and are kept within [0, LAYOUT_SIZE]. Every other node keeps its
+    position, so the cost follows the size of the change. The hierarchical mode, a graph with no positions yet and
+    a change touching most of the graph get a full layout instead.
+    """
+    mode = mode or LAYOUT_MODE
+    seed = LAYOUT_SEED if seed is None else seed
+    if mode not in LAYOUT_MODES:
+        raise ValueError(f"Unknown layout mode {mode!r}; expected one of {LAYOUT_MODES}")
+    if positions is None:
+        positions = {node: (data['x'], data['y']) for node, data in G.nodes(data=True) if 'x' in data and 'y' in data}
+    positions = {node: xy for node, xy in positions.items() if node in G}
+    new = [node for node in G if node not in positions]
+    moving = set(new) | {node for node in changed if node in G}
+    for _ in range(_UPDATE_HOPS):
+        moving |= {neighbour for node in moving for neighbour in _neighbours(G, node)}
+    if mode != "force" or not positions or len(moving) > _UPDATE_LIMIT * G.number_of_nodes():
+        return apply_layout(G, mode, seed)
+
+    for node, (x, y) in positions.items():
+        G.nodes[node]['x'] = x
+        G.nodes[node]['y'] = y
+    if not moving:
+        return G
+
+    rng = np.random.default_rng(seed)
+    fixed = list(positions)
+    coords = np.array([positions[node] for node in fixed], dtype=float)
+    tree = cKDTree(coords)
+    unit = _layout_unit(tree, coords, rng)
+
+    # New nodes start next to their positioned neighbours, spreading out breadth-first from them
+    placed = dict(positions)
+    queue = deque(sorted((node for node in new if any(neighbour in placed for neighbour in _neighbours(G, node))),
+                         key=str))
+    queued = set(queue)
+    while queue:
+        node = queue.popleft()
+        anchors = [placed[neighbour] for neighbour in _neighbours(G, node) if neighbour in placed]
+        placed[node] = tuple(np.mean(anchors, axis=0) + rng.normal(scale=unit / 2, size=2))
+        for neighbour in _neighbours(G, node):
+            if neighbour not in placed and neighbour not in queued:
+                queue.append(neighbour)
+                queued.add(neighbour)
+    # Nodes connected to nothing positioned land anywhere in the picture
+    low, high = coords.min(axis=0), coords.max(axis=0)
+    for node in sorted((node for node in new if node not in placed), key=str):
+        placed[node] = tuple(rng.uniform(low, high))
+
+    # The fixed nodes near the moving ones and the other ends of their edges hold them in place
+    moving = sorted(moving, key=str)
+    start = np.array([placed[node] for node in moving], dtype=float)
+    _, nearby = tree.query(start, k=min(_NEIGHBOURS, len(fixed)), distance_upper_bound=_CUTOFF * unit)
+    anchors = {fixed[i] for i in np.unique(nearby) if i < len(fixed)}
+    anchors.update(neighbour for node in moving for neighbour in _neighbours(G, node))
+    moving_set = set(moving)
+    nodes = moving + sorted(anchors - moving_set, key=str)
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[node], index[neighbour]) for node in moving for neighbour in _neighbours(G, node)
+                      if neighbour != node], dtype=np.int64).reshape(-1, 2)
+    edges = _undirected(edges, len(nodes))
+
+    pos = np.array([placed[node] for node in nodes], dtype=float) / unit
+    movable = np.arange(len(nodes)) < len(moving)
+    pos = _refine(pos, edges, _UPDATE_ITERATIONS, temperature=_K, movable=movable, gravity=0.0) * unit
+    # Moved nodes stay within the picture rather than rescaling it, which would move every other node
+    pos = np.clip(pos, 0.0, LAYOUT_SIZE)
+    for node, (x, y) in zip(moving, pos):
+        G.nodes[node]['x'] = float(x)
+        G.nodes[node]['y'] = float(y)
+    return G
+
+def benchmark(sizes=(1_000, 10_000, 100_000), seed: int = LAYOUT_SEED) -> List[Dict[str, Any]]:
+    """
+    Time both modes on synthetic dependency-like graphs: a directory tree
+    of files plus preferential-attachment imports, about 2.5 edges per node.
+    """
+    results = []
+    for size in sizes:
+        rng = np.random.default_rng(seed)
+        G = nx.DiGraph()
+        parents = rng.integers(0, np.maximum(np.arange(size) // 8, 1))
+        G.add_nodes_from((i, {"level": 0}) for i in range(size))
+        G.add_edges_from((int(parent), i) for i, parent in enumerate(parents) if i)
+        targets = np.minimum(rng.pareto(1.2, size * 3 // 2).astype(int), size - 1)
+        G.add_edges_from(zip(targets.tolist(), rng.integers(0, size, len(targets)).tolist()))
+        for i in range(1, size):
+            G.nodes[i]["level"] = G.nodes[int(parents[i])]["level"] + 1
+        for mode in ("force", "hierarchical"):
+            start = time.perf_counter()
+            compute_layout(G, mode, seed)
+            results.append({"nodes": size, "edges": G.number_of_edges(), "mode": mode,
+                            "seconds": round(time.perf_counter() - start, 3)})
+    return results
+
+if __name__ == "__main__":
+    for result in benchmark():
+        print(result)
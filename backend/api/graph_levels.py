@@ -0,0 +1,220 @@
+# backend/api/graph_levels.py
+import json
+import os
+import posixpath
+import re
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+import networkx as nx
+from backend.api.directory_tree import DirectoryTree, symbol_count
+
+# The most nodes and edges any view returns: the lightest nodes beyond are folded
+# into one MORE_NODE, the lightest edges beyond are left out
+LOD_MAX_NODES = int(os.getenv("VISDEP_LOD_MAX_NODES", "300"))
+LOD_MAX_EDGES = int(os.getenv("VISDEP_LOD_MAX_EDGES", "1500"))
+MORE_NODE = "*"
+# Prefix of package supernode ids, so they cannot clash with a directory or file path
+PACKAGE_PREFIX = "package:"
+
+# Edges of the dependency graph that are structure rather than dependencies
+_STRUCTURAL_RELATIONS = ("contains", "exports")
+_PACKAGE_SEPARATORS = re.compile(r'[./:]')
+
+def package_root(name: str) -> str:
+    """The top-level package of an import: `os` for `os.path`, `@scope/pkg` for `@scope/pkg/sub`."""
+    if name.startswith('@') and '/' in name:
+        return '/'.join(name.split('/', 2)[:2])
+    return _PACKAGE_SEPARATORS.split(name, 1)[0] or name
+
+def _depth(directory: str) -> int:
+    return directory.count('/') + 1 if directory else 0
+
+class GraphLevels:
+    """
+    A dependency graph at several resolutions. At level L every directory
+    L + 1 deep is collapsed into one supernode holding everything under it,
+    the files above stay files, and external packages are collapsed to
+    their top-level name; edges between supernodes carry the number of
+    imports they stand for. Supernodes can be expanded one at a time.
+
+    Only file-level import counts, file positions and the directory tree are
+    kept. The levels that fit LOD_MAX_NODES unfolded are precomputed; any
+    other view is aggregated on demand.
+    """
+
+    def __init__(self, tree: DirectoryTree, files: Dict[str, List[float]], packages: Dict[str, List[float]],
+                 edges: Dict[Tuple[str, str], int]):
+        self.tree = tree
+        # file -> [x, y, symbols]; package id -> [x, y, imported names]
+        self.files = files
+        self.packages = packages
+        # (source, importing file) -> imports, sources being files or package ids
+        self.edges = edges
+        self.views = []
+
+    @classmethod
+    def build(cls, G: nx.DiGraph, tree: DirectoryTree, ast_data: Optional[Mapping[str, Any]] = None) -> 'GraphLevels':
+        """From the dependency graph and its directory tree; symbol counts come from `ast_data` when given."""
+        files, packages = {}, {}
+        positions = defaultdict(list)
+        owners = {}
+        for node, data in G.nodes(data=True):
+            node_type = data.get("type")
+            if node_type == "file":
+                owner = node
+                info = (ast_data or {}).get(node)
+                files[node] = [0.0, 0.0, symbol_count(info) if info is not None else 0]
+            elif node_type == "import":
+                owner = node.split("::", 1)[0]
+            elif node_type in ("package", "header"):
+                owner = PACKAGE_PREFIX + package_root(node)
+                packages.setdefault(owner, [0.0, 0.0, 0])[2] += 1
+            else:
+                continue
+            owners[node] = owner
+            if "x" in data and "y" in data:
+                positions[owner].append((data["x"], data["y"]))
+        for owner, entry in chain(files.items(), packages.items()):
+            if positions[owner]:
+                entry[0] = sum(x for x, _ in positions[owner]) / len(positions[owner])
+                entry[1] = sum(y for _, y in positions[owner]) / len(positions[owner])
+
+        edges = Counter()
+        for source, target, data in G.edges(data=True):
+            if data.get("relation") in _STRUCTURAL_RELATIONS or target not in files:
+                continue
+            owner = owners.get(source)
+            if owner is not None and owner != target and (owner in files or owner in packages):
+                edges[(owner, target)] += data.get("count", 1)
+
+        levels = cls(tree, files, packages, dict(edges))
+        for level in range(levels.depth() + 1):
+            view = levels.view(level)
+            if view["hidden_nodes"]:
+                break
+            levels.views.append(view)
+        return levels
+
+    def depth(self) -> int:
+        """The deepest level: every directory expanded."""
+        return max((_depth(directory) for directory in self.tree.directories()), default=0)
+
+    def frontier(self, level: int, expand: Iterable[str] = ()) -> Set[str]:
+        """
+        The collapsed directories of a view: those level + 1 deep, with each
+        `expand`ed directory (and any collapsed directory above it) replaced by
+        its sub-directories. Raises KeyError for an unknown directory.
+        """
+        frontier = {directory for directory in self.tree.directories() if _depth(directory) == level + 1}
+        for directory in sorted((directory.strip('/') for directory in expand), key=_depth):
+            if directory not in self.tree:
+                raise KeyError(directory)
+            path = [directory]
+            while path[-1] not in frontier and path[-1]:
+                path.append(self.tree.parent[path[-1]])
+            if path[-1] in frontier:
+                for current in reversed(path):
+                    frontier.discard(current)
+                    frontier.update(self.tree.children.get(current, ()))
+        return frontier
+
+    def view(self, level: int = 0, expand: Iterable[str] = ()) -> Dict[str, Any]:
+        """The graph at `level` with the `expand`ed directories opened, within LOD_MAX_NODES/LOD_MAX_EDGES."""
+        expand = sorted(set(expand))
+        if not expand and 0 <= level < len(self.views):
+            return self.views[level]
+        level = max(level, 0)
+        frontier = self.frontier(level, expand)
+
+        # Each file stands for itself unless a collapsed directory holds it
+        unit = {}
+        for directory in frontier:
+            for file_path in self.tree.files_under(directory):
+                unit[file_path] = directory
+        members = defaultdict(list)
+        for file_path in self.files:
+            members[unit.setdefault(file_path, file_path)].append(file_path)
+        for package in self.packages:
+            unit[package] = package
+            members[package].append(package)
+
+        weights = Counter()
+        edges = Counter()
+        for (source, target), count in self.edges.items():
+            source, target = unit[source], unit[target]
+            if source != target:
+                edges[(source, target)] += count
+                weights[source] += count
+                weights[target] += count
+
+        # Over the limit, the lightest nodes are folded into MORE_NODE
+        nodes = sorted(members, key=lambda node: (-weights[node], -len(members[node]), node))
+        hidden = nodes[LOD_MAX_NODES - 1:] if len(nodes) > LOD_MAX_NODES else []
+        if hidden:
+            folded = {node: MORE_NODE for node in hidden}
+            members[MORE_NODE] = [member for node in hidden for member in members.pop(node)]
+            nodes = nodes[:LOD_MAX_NODES - 1] + [MORE_NODE]
+            merged = Counter()
+            for (source, target), count in edges.items():
+                source, target = folded.get(source, source), folded.get(target, target)
+                if source != target:
+                    merged[(source, target)] += count
+            edges = merged
+
+        kept = sorted(edges.items(), key=lambda item: (-item[1], item[0]))
+        return {
+            "level": level,
+            "levels": self.depth() + 1,
+            "expanded": expand,
+            "nodes": [self._node(node, members[node], len(hidden)) for node in nodes],
+            "edges": [{"source": source, "target": target, "count": count}
+                      for (source, target), count in kept[:LOD_MAX_EDGES]],
+            "hidden_nodes": len(hidden),
+            "hidden_edges": max(len(kept) - LOD_MAX_EDGES, 0),
+        }
+
+    def _node(self, node: str, members: List[str], hidden: int) -> Dict[str, Any]:
+        positions = [self.files.get(member) or self.packages[member] for member in members]
+        node_data = {
+            "id": node,
+            "x": sum(position[0] for position in positions) / len(positions),
+            "y": sum(position[1] for position in positions) / len(positions),
+        }
+        if node == MORE_NODE:
+            node_data.update(type="more", label=f"{hidden} more", file_count=len(members))
+        elif node in self.packages:
+            node_data.update(type="package", label=node[len(PACKAGE_PREFIX):], imports=self.packages[node][2])
+        elif node in self.files:
+            node_data.update(type="file", label=posixpath.basename(node), level=node.count('/') + 1,
+                             symbol_count=self.files[node][2])
+        else:
+            node_data.update(type="directory", label=posixpath.basename(node), level=node.count('/'),
+                             expandable=True, file_count=self.tree.counts[node]["files"],
+                             symbol_count=self.tree.counts[node]["symbols"],
+                             imports_in=self.tree.counts[node]["imports_in"],
+                             imports_out=self.tree.counts[node]["imports_out"])
+        return node_data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tree": self.tree.to_dict(),
+            "files": self.files,
+            "packages": self.packages,
+            "edges": [[source, target, count] for (source, target), count in self.edges.items()],
+            "views": self.views,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'GraphLevels':
+        levels = cls(DirectoryTree.from_dict(data["tree"]), data["files"], data["packages"],
+                     {(source, target): count for source, target, count in data["edges"]})
+        levels.views = data["views"]
+        return levels
+
+    def dumps(self) -> bytes:
+        return json.dumps(self.to_dict(), separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'GraphLevels':
+        return cls.from_dict(json.loads(data))
@@ -0,0 +1,345 @@
+# backend/api/ingestion.py
+import json
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+from backend.api.github_api import (
+    normalize_repo_url, iter_repo_archive, fetch_repo_metadata, stream_repo_tree, fetch_repo_blobs,
+    fetch_commit_sha, fetch_commit_diff, fetch_file_text, DEFAULT_FETCH_CONCURRENCY,
+)
+from backend.api.pipeline import run_pipeline, emit_from_thread, PIPELINE_PARSE_WORKERS, PIPELINE_BATCH_SIZE
+from backend.api.local_source import (
+    resolve_local_path, is_git_repository, resolve_commit, list_git_files, iter_git_blobs, iter_working_tree,
+    diff_git_commits, local_repo_metadata,
+)
+from backend.api.file_filter import PathFilter, is_rules_file, rules_files_for, filter_from_files
+from backend.api.ast_parser import parse_code_to_ast, PARSE_WORKERS, PARSE_CHUNK_SIZE
+from backend.api.cpp_parser import find_compile_database, CompileDatabase, COMPILE_DATABASE_LOCATIONS
+from backend.api.data_storage import (
+    store_repository_metadata, update_repository, retrieve_latest_ingestion, retrieve_ast_data, iter_ast_data,
+    ast_data_writer, store_ast_data_batch, begin_snapshot, publish_snapshot, discard_snapshot, record_revision,
+    retrieve_latest_revision, store_artifact, retrieve_artifact,
+)
+from backend.api.file_record import FileRecordSet
+from backend.api.directory_tree import DirectoryTree
+from backend.api.graph_levels import GraphLevels
+from backend.api.graph_generator import (
+    create_dependency_graph, update_dependency_graph, graph_to_json, graph_from_json,
+)
+from backend.api.graph_layout import LAYOUT_MODE, compute_layout
+
+# Per-revision artifacts kept in storage next to the repository's rows
+GRAPH_ARTIFACT = "dependency_graph"
+# Content-free parse results, in compact form
+RECORDS_ARTIFACT = "file_records"
+# Directories with their files and aggregate counts
+TREE_ARTIFACT = "directory_tree"
+# The graph with directories collapsed into supernodes, level by level
+LEVELS_ARTIFACT = "graph_levels"
+# Node positions in a layout mode other than the graph's own, computed on first request
+LAYOUT_ARTIFACT = "layout_{mode}"
+
+class GitHubSource:
+    """A repository read over the GitHub REST API."""
+
+    def __init__(self, repo_url: str, auth_token: str, sub_directory: Optional[str] = None,
+                 ref: Optional[str] = None, bulk: bool = False, concurrency: int = DEFAULT_FETCH_CONCURRENCY):
+        _, path = normalize_repo_url(repo_url)
+        self.repo_url = repo_url
+        self.auth_token = auth_token
+        self.prefix = (sub_directory or path or '').strip('/')
+        self.ref = ref
+        self.bulk = bulk
+        self.concurrency = concurrency
+        # Set by load_compile_database when a compile_commands.json is committed
+        self.compile_database = None
+        self.path_filter = PathFilter()
+
+    async def resolve(self):
+        """Return (repo_metadata, commit_sha) for the requested ref."""
+        return await asyncio.gather(
+            asyncio.to_thread(fetch_repo_metadata, self.repo_url, self.auth_token),
+            asyncio.to_thread(fetch_commit_sha, self.repo_url, self.auth_token, self.ref),
+        )
+
+    async def load_compile_database(self, commit_sha):
+        """Fetch the compile_commands.json at `commit_sha` ahead of the files, so every parse batch uses it."""
+        self.compile_database = await asyncio.to_thread(fetch_compile_database, self.repo_url, self.auth_token,
+                                                        commit_sha)
+
+    async def produce(self, commit_sha, emit):
+        """Await emit(record) for every file under the prefix; return fetch stats."""
+        if self.bulk:
+            await emit_from_thread(
+                lambda: iter_repo_archive(self.repo_url, self.auth_token, self.prefix, commit_sha, self.path_filter),
+                emit)
+            return None
+        _, stats = await stream_repo_tree(self.repo_url, self.auth_token, emit, self.prefix,
+                                          commit_sha, self.concurrency, self.path_filter)
+        return stats.as_dict()
+
+    async def diff(self, base_sha, head_sha):
+        return await asyncio.to_thread(fetch_commit_diff, self.repo_url, self.auth_token, base_sha, head_sha)
+
+    async def fetch_entries(self, entries, path_filter):
+        repo_content, stats = await fetch_repo_blobs(self.repo_url, self.auth_token, entries, self.concurrency,
+                                                     path_filter)
+        return repo_content, stats.as_dict()
+
+class LocalSource:
+    """
+    A repository on local disk: a bare mirror or working copy read at `ref`
+    straight from the object store, or a plain directory read as-is.
+    """
+
+    def __init__(self, local_path: str, sub_directory: Optional[str] = None, ref: Optional[str] = None):
+        self.path = resolve_local_path(local_path)
+        self.prefix = (sub_directory or '').strip('/')
+        self.ref = ref
+        self.is_git = is_git_repository(self.path)
+        if ref and not self.is_git:
+            raise ValueError(f"{local_path} is not a git repository; cannot read ref {ref}")
+        self.compile_database = None
+        self.path_filter = PathFilter()
+
+    async def resolve(self):
+        commit_sha = await asyncio.to_thread(resolve_commit, self.path, self.ref) if self.is_git else None
+        return local_repo_metadata(self.path, commit_sha), commit_sha
+
+    async def load_compile_database(self, commit_sha):
+        self.compile_database = await asyncio.to_thread(find_compile_database, self.path)
+
+    async def produce(self, commit_sha, emit):
+        if commit_sha is None:
+            await emit_from_thread(lambda: iter_working_tree(self.path, self.prefix, self.path_filter), emit)
+            return None
+        entries = await asyncio.to_thread(list_git_files, self.path, commit_sha, self.prefix, self.path_filter)
+        await emit_from_thread(lambda: self._read_blobs(entries, self.path_filter), emit)
+        return None
+
+    def _read_blobs(self, entries, path_filter):
+        return (blob for blob in iter_git_blobs(self.path, entries) if path_filter.accepts_content(blob['content']))
+
+    async def diff(self, base_sha, head_sha):
+        return await asyncio.to_thread(diff_git_commits, self.path, base_sha, head_sha)
+
+    async def fetch_entries(self, entries, path_filter):
+        return await asyncio.to_thread(lambda: list(self._read_blobs(path_filter.select(entries), path_filter))), None
+
+def fetch_compile_database(repo_url: str, auth_token: str, ref: Optional[str] = None) -> Optional[CompileDatabase]:
+    """The compile_commands.json committed at the root or in build/ of the repository, if any."""
+    for location in COMPILE_DATABASE_LOCATIONS:
+        text = fetch_file_text(repo_url, auth_token, location, ref)
+        if text is not None:
+            try:
+                return CompileDatabase.from_json(text)
+            except (ValueError, KeyError):
+                return None
+    return None
+
+def in_sub_directory(file_path: str, prefix: str) -> bool:
+    return not prefix or file_path == prefix or file_path.startswith(prefix + '/')
+
+def rules_changed(changed_files, prefix: str) -> bool:
+    """Whether an ignore or attributes file that applies under `prefix` changed."""
+    paths = [file['filename'] for file in changed_files] + \
+            [file['previous_filename'] for file in changed_files if file.get('previous_filename')]
+    return bool(rules_files_for(paths, prefix))
+
+def compile_database_changed(changed_files) -> bool:
+    paths = {file['filename'] for file in changed_files} | \
+            {file['previous_filename'] for file in changed_files if file.get('previous_filename')}
+    return not paths.isdisjoint(COMPILE_DATABASE_LOCATIONS)
+
+def plan_incremental_update(changed_files, prefix: str):
+    """Split compare-API file entries into blobs to fetch and paths to drop."""
+    to_fetch, removed = [], set()
+    for file in changed_files:
+        if file['status'] == 'renamed' and in_sub_directory(file['previous_filename'], prefix):
+            removed.add(file['previous_filename'])
+        if not in_sub_directory(file['filename'], prefix):
+            continue
+        if file['status'] == 'removed':
+            removed.add(file['filename'])
+        else:
+            to_fetch.append({'path': file['filename'], 'sha': file['sha']})
+    return to_fetch, removed
+
+def load_previous_graph(repo_id: int):
+    """The graph saved by the latest ingestion of the given repository row."""
+    data = retrieve_artifact(repo_id, GRAPH_ARTIFACT)
+    return graph_from_json(data.decode('utf-8')) if data is not None else None
+
+def load_graph(repo_id: int, revision_id: Optional[int] = None, layout: Optional[str] = None):
+    """
+    The graph saved for a revision (the newest by default), or None. Its
+    positions come from LAYOUT_MODE; any other `layout` is computed once per
+    revision and saved next to the graph.
+    """
+    data = retrieve_artifact(repo_id, GRAPH_ARTIFACT, revision_id)
+    if data is None:
+        return None
+    graph = graph_from_json(data.decode('utf-8'))
+    if layout is None or layout == LAYOUT_MODE:
+        return graph
+    name = LAYOUT_ARTIFACT.format(mode=layout)
+    revision_id = graph.graph.get('revision_id', revision_id)
+    stored = retrieve_artifact(repo_id, name, revision_id) if revision_id is not None else None
+    if stored is not None:
+        positions = {node: (x, y) for node, x, y in json.loads(stored)}
+    else:
+        positions = compute_layout(graph, layout)
+        if revision_id is not None:
+            store_artifact(repo_id, revision_id, name, json.dumps(
+                [[node, x, y] for node, (x, y) in positions.items()], separators=(',', ':')).encode('utf-8'))
+    for node, (x, y) in positions.items():
+        if node in graph:
+            graph.nodes[node]['x'] = x
+            graph.nodes[node]['y'] = y
+    return graph
+
+def load_previous_records(repo_id: int) -> FileRecordSet:
+    """
+    The saved file records of the given repository row, falling back to the
+    stored rows (read one at a time) when the saved ones are missing or unreadable.
+    """
+    data = retrieve_artifact(repo_id, RECORDS_ARTIFACT)
+    if data is not None:
+        try:
+            return FileRecordSet.loads(data)
+        except (ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable {RECORDS_ARTIFACT} of repository {repo_id}: {e}")
+    records = FileRecordSet(meta={"repo_id": repo_id})
+    for file_path, info in iter_ast_data(repo_id, include_content=False):
+        records.add(file_path, info)
+    return records
+
+def save_artifacts(repo_id: int, commit_sha: Optional[str], prefix: str, records: FileRecordSet, graph) -> int:
+    """Record the stored files as a revision and save the graph, records, directory tree and graph levels under it."""
+    revision_id = record_revision(repo_id, commit_sha, prefix)
+    graph.graph.update(repo_id=repo_id, revision_id=revision_id)
+    records.meta.update(repo_id=repo_id, revision_id=revision_id)
+    store_artifact(repo_id, revision_id, GRAPH_ARTIFACT, graph_to_json(graph).encode('utf-8'))
+    store_artifact(repo_id, revision_id, RECORDS_ARTIFACT, records.dumps())
+    tree = DirectoryTree.build(records, graph)
+    store_artifact(repo_id, revision_id, TREE_ARTIFACT, tree.dumps())
+    store_artifact(repo_id, revision_id, LEVELS_ARTIFACT, GraphLevels.build(graph, tree, records).dumps())
+    return revision_id
+
+def apply_changes(repo_id: int, removed, changed_data: Dict[str, Any]) -> None:
+    """Swap the changed files' rows in one transaction."""
+    with ast_data_writer(repo_id) as writer:
+        writer.delete_many(removed | set(changed_data))
+        writer.store_many(changed_data.items())
+
+async def ingest_repo(repo_url: str, auth_token: str, sub_directory: Optional[str] = None, ref: Optional[str] = None,
+                      bulk: bool = False, concurrency: int = DEFAULT_FETCH_CONCURRENCY) -> Dict[str, Any]:
+    return await ingest_source(GitHubSource(repo_url, auth_token, sub_directory, ref, bulk, concurrency))
+
+async def ingest_local(local_path: str, sub_directory: Optional[str] = None,
+                       ref: Optional[str] = None) -> Dict[str, Any]:
+    return await ingest_source(LocalSource(local_path, sub_directory, ref))
+
+async def ingest_source(source) -> Dict[str, Any]:
+    """
+    Fetch, parse, store and graph a repository. When the same repository and
+    sub-directory were ingested before, only the files changed since the
+    recorded commit are fetched and parsed, and the stored rows and graph are
+    patched in place. Storage calls run on worker threads and only hold
+    short transactions, so other ingestions and readers are not locked out.
+    """
+    repo_metadata, commit_sha = await source.resolve()
+    repo_name = repo_metadata['full_name']
+
+    previous = await asyncio.to_thread(retrieve_latest_ingestion, repo_name, source.prefix) if commit_sha else None
+    previous_graph = None
+    if previous:
+        previous_graph = await asyncio.to_thread(load_previous_graph, previous['repo_id'])
+    if previous_graph is not None and previous['commit_sha'] == commit_sha:
+        await asyncio.to_thread(update_repository, previous['repo_id'], repo_metadata, commit_sha, source.prefix)
+        return {"mode": "unchanged", "repo_id": previous['repo_id'],
+                "revision_id": await asyncio.to_thread(retrieve_latest_revision, previous['repo_id']),
+                "commit_sha": commit_sha, "changed": 0, "removed": 0, "fetch_stats": None}
+
+    # Loaded before any file is parsed, so full and incremental runs use the same C/C++ flags
+    await source.load_compile_database(commit_sha)
+    if previous_graph is not None:
+        changed_files = await source.diff(previous['commit_sha'], commit_sha)
+        # Changed ignore rules can bring back or drop files anywhere, changed compile flags
+        # can change any C/C++ file; start over
+        if changed_files is not None and (rules_changed(changed_files, source.prefix) or
+                                          compile_database_changed(changed_files)):
+            changed_files = None
+        if changed_files is not None:
+            return await ingest_changes(source, previous['repo_id'], repo_metadata, commit_sha,
+                                        changed_files, previous_graph)
+        logging.info(f"Diff from {previous['commit_sha']} to {commit_sha} unusable; re-ingesting {repo_name}")
+
+    # Full ingestion, pinned to the resolved commit. Files are parsed and stored
+    # as they arrive; only compact, content-free records are kept for the graph.
+    repo_id = await asyncio.to_thread(store_repository_metadata, repo_name, repo_metadata, source.prefix)
+    records = FileRecordSet(meta={"repo_id": repo_id})
+
+    def parse_batch(records):
+        return list(parse_code_to_ast(records, compile_database=source.compile_database,
+                                      path_filter=source.path_filter).items())
+
+    # Each batch is committed under a staging snapshot, which replaces the repository's rows once
+    # the pipeline has drained; unchanged contents are already in the blob table and are not rewritten
+    snapshot = await asyncio.to_thread(begin_snapshot, repo_id)
+
+    def store_batch(batch):
+        store_ast_data_batch(snapshot, batch)
+        for file_path, ast_info in batch:
+            records.add(file_path, ast_info)
+
+    try:
+        # Enough parse batches in flight to keep every parse process busy
+        parse_workers = max(PIPELINE_PARSE_WORKERS, PARSE_WORKERS * PARSE_CHUNK_SIZE // PIPELINE_BATCH_SIZE)
+        fetch_stats, pipeline_stats = await run_pipeline(lambda emit: source.produce(commit_sha, emit),
+                                                         parse_batch, store_batch, parse_workers=parse_workers)
+    except BaseException:
+        await asyncio.to_thread(discard_snapshot, snapshot)
+        raise
+    await asyncio.to_thread(publish_snapshot, repo_id, snapshot)
+    logging.info(f"Fetch stats for {repo_name}: {fetch_stats}; pipeline stats: {pipeline_stats}")
+
+    graph = await asyncio.to_thread(create_dependency_graph, records)
+    revision_id = await asyncio.to_thread(save_artifacts, repo_id, commit_sha, source.prefix, records, graph)
+    await asyncio.to_thread(update_repository, repo_id, repo_metadata, commit_sha, source.prefix)
+
+    return {"mode": "full", "repo_id": repo_id, "revision_id": revision_id, "commit_sha": commit_sha,
+            "changed": len(records), "removed": 0,
+            "skipped": dict(source.path_filter.skipped), "fetch_stats": fetch_stats, "pipeline_stats": pipeline_stats}
+
+async def ingest_changes(source, repo_id, repo_metadata, commit_sha, changed_files, graph):
+    to_fetch, removed = plan_incremental_update(changed_files, source.prefix)
+    previous_records = await asyncio.to_thread(load_previous_records, repo_id)
+    # The rules files are unchanged (see rules_changed), so their stored copies still apply
+    rules_files = await asyncio.to_thread(retrieve_ast_data, repo_id,
+                                          [file_path for file_path in previous_records if is_rules_file(file_path)])
+    path_filter = filter_from_files({'path': file_path, 'content': info.get('content')}
+                                    for file_path, info in rules_files.items())
+
+    repo_content, fetch_stats = await source.fetch_entries(to_fetch, path_filter)
+    changed_data = await asyncio.to_thread(parse_code_to_ast, repo_content, compile_database=source.compile_database,
+                                           path_filter=path_filter)
+    # Files that became undecodable or are now filtered out disappear from the parse results
+    removed |= {entry['path'] for entry in to_fetch} - set(changed_data)
+
+    records = previous_records.copy()
+    for file_path in removed:
+        records.discard(file_path)
+    for file_path, ast_info in changed_data.items():
+        records.add(file_path, ast_info)
+
+    await asyncio.to_thread(apply_changes, repo_id, removed, changed_data)
+
+    graph = await asyncio.to_thread(update_dependency_graph, graph, records, previous_records, set(changed_data),
+                                    removed)
+    revision_id = await asyncio.to_thread(save_artifacts, repo_id, commit_sha, source.prefix, records, graph)
+    await asyncio.to_thread(update_repository, repo_id, repo_metadata, commit_sha, source.prefix)
+
+    return {"mode": "incremental", "repo_id": repo_id, "revision_id": revision_id, "commit_sha": commit_sha,
+            "changed": len(changed_data), "removed": len(removed),
+            "skipped": dict(path_filter.skipped), "fetch_stats": fetch_stats}
@@ -9,11 +9,16 @@ import asyncio
 from typing import List
 
 # Adjust the import path for data_storage
-from backend.api.data_storage import initialize_database, store_repository_metadata, store_ast_data
+from backend.api.data_storage import (
+    initialize_database, store_repository_metadata, store_ast_data_batch, retrieve_ast_data, retrieve_latest_revision,
+    store_artifact, retrieve_artifact,
+)
+from backend.api.ingestion import GRAPH_ARTIFACT, TREE_ARTIFACT
+from backend.api.directory_tree import DirectoryTree
 from backend.api.github_api import fetch_repo_content, fetch_repo_metadata
 from backend.api.ast_parser import parse_code_to_ast
 from langchain.prompts import MessagesPlaceholder
-from backend.api.graph_generator import create_dependency_graph, get_subgraph_at_level
+from backend.api.graph_generator import create_dependency_graph, get_subgraph_at_level, graph_from_json
 import networkx as nx
 from sklearn.metrics.pairwise import cosine_similarity
 
@@ -79,8 +84,7 @@ def fetch_parse_store_repo(repo_url, auth_token):
                 **ast_data.get(file_path, {})
             }
         
-        for file_path, file_info in ast_data.items():
-            store_ast_data(repo_id, file_path, file_info)
+        store_ast_data_batch(repo_id, ast_data.items())
         
         return repo_id, full_context
     except Exception as e:
@@ -182,7 +186,10 @@ class CustomAI21ChatLLM(LLM):
     def _identifying_params(self) -> Mapping[str, Any]:
         return {"model": self.model, "api_base": self.api_base}
 
+# Sessions keyed by repository revision (or by a hash of an ad-hoc context)
 chat_sessions = {}
+# The FAISS index of a revision's files, kept with its other artifacts
+VECTOR_INDEX_ARTIFACT = "vector_index"
 
 class ChatSession:
     def __init__(self):
@@ -190,16 +197,28 @@ class ChatSession:
         self.conversation_chain = None
         self.vector_store = None
         self.full_context = None
+        self.directory_tree = None
 
-    async def initialize_conversation_chain(self, context):
+    async def initialize_conversation_chain(self, context, repo_id: Optional[int] = None,
+                                            revision_id: Optional[int] = None):
         try:
             logging.debug("Initializing CustomAI21ChatLLM")
             llm = CustomAI21ChatLLM(api_key=os.getenv("AI21_API_KEY"))
             logging.debug(f"CustomAI21ChatLLM initialized with model: {llm.model}")
             
             self.full_context = context
-            self.vector_store = await self.initialize_vector_store(context)
-            self.dependency_graph = create_dependency_graph(context)
+            if repo_id is not None and revision_id is not None:
+                self.vector_store = await self.load_vector_store(context, repo_id, revision_id)
+                graph = retrieve_artifact(repo_id, GRAPH_ARTIFACT, revision_id)
+                self.dependency_graph = graph_from_json(graph.decode('utf-8')) if graph is not None \
+                    else create_dependency_graph(context)
+                tree = retrieve_artifact(repo_id, TREE_ARTIFACT, revision_id)
+                self.directory_tree = DirectoryTree.loads(tree) if tree is not None \
+                    else DirectoryTree.build(context, self.dependency_graph)
+            else:
+                self.vector_store = await self.initialize_vector_store(context)
+                self.dependency_graph = create_dependency_graph(context)
+                self.directory_tree = DirectoryTree.build(context, self.dependency_graph)
 
             prompt = ChatPromptTemplate(
                 messages=[
@@ -220,6 +239,17 @@ class ChatSession:
             logging.error(f"Error initializing conversation chain: {e}", exc_info=True)
             raise
 
+    async def load_vector_store(self, context, repo_id: int, revision_id: int):
+        """The revision's saved index, or a new one (then saved) when there is none yet."""
+        embeddings = AI21Embeddings(api_key=os.getenv("AI21_API_KEY"))
+        data = retrieve_artifact(repo_id, VECTOR_INDEX_ARTIFACT, revision_id)
+        if data is not None:
+            # Pickled by serialize_to_bytes below, from our own database
+            return FAISS.deserialize_from_bytes(data, embeddings, allow_dangerous_deserialization=True)
+        vector_store = await self.initialize_vector_store(context)
+        store_artifact(repo_id, revision_id, VECTOR_INDEX_ARTIFACT, vector_store.serialize_to_bytes())
+        return vector_store
+
     async def initialize_vector_store(self, context):
         documents = []
         text_splitter = RecursiveCharacterTextSplitter(
@@ -262,11 +292,11 @@ class ChatSession:
             if query_type == 'codebase':
                 return list(self.dependency_graph.nodes())
             elif query_type == 'directory':
-                directories = [node for node, data in self.dependency_graph.nodes(data=True) if data['type'] == 'directory']
+                directories = self.directory_tree.directories()
                 if not directories:
                     return []
                 most_relevant = max(directories, key=lambda d: self.calculate_relevance(d, query))
-                return list(nx.descendants(self.dependency_graph, most_relevant))
+                return list(self.directory_tree.files_under(most_relevant))
             elif query_type == 'file':
                 files = [node for node, data in self.dependency_graph.nodes(data=True) if data['type'] == 'file']
                 if not files:
@@ -355,6 +385,10 @@ class ChatSession:
         return "\n\n".join(all_context)
     def get_full_context_summary(self) -> str:
         summary = "Repository Overview:\n"
+        for directory in self.directory_tree.children.get('', ()):
+            counts = self.directory_tree.counts[directory]
+            summary += (f"- {directory}/: {counts['files']} files, {counts['symbols']} symbols, "
+                        f"imported {counts['imports_in']} times from elsewhere, {counts['imports_out']} imports out\n")
         for file_path, file_info in self.full_context.items():
             summary += f"- {file_path}\n"
             if isinstance(file_info, dict):
@@ -400,17 +434,30 @@ class ChatSession:
             logging.error(f"Error in ChatSession.chat: {e}", exc_info=True)
             raise
 
-async def get_jamba_response(query: str, context: Dict[str, Any]) -> str:
+async def get_jamba_response(query: str, context: Optional[Dict[str, Any]] = None,
+                             repo_id: Optional[int] = None) -> str:
+    """
+    Answer `query` about an ingested repository (its latest revision's stored
+    files) or, without `repo_id`, about the given context.
+    """
     try:
         logging.debug(f"Entering get_jamba_response with query: {query}")
         logging.debug(f"API Key: {os.getenv('AI21_API_KEY')[:5]}...")
 
-        context_string = json.dumps(context, sort_keys=True)
-        session_id = hashlib.md5(context_string.encode()).hexdigest()
+        revision_id = None
+        if repo_id is not None:
+            revision_id = retrieve_latest_revision(repo_id)
+            session_id = f"{repo_id}:{revision_id}"
+        else:
+            context_string = json.dumps(context, sort_keys=True)
+            session_id = hashlib.md5(context_string.encode()).hexdigest()
 
         if session_id not in chat_sessions:
-            chat_sessions[session_id] = ChatSession()
-            await chat_sessions[session_id].initialize_conversation_chain(context)
+            if repo_id is not None:
+                context = await asyncio.to_thread(retrieve_ast_data, repo_id)
+            chat_session = ChatSession()
+            await chat_session.initialize_conversation_chain(context, repo_id, revision_id)
+            chat_sessions[session_id] = chat_session
 
         chat_session = chat_sessions[session_id]
         response = await chat_session.chat(query)
@@ -0,0 +1,176 @@
+# backend/api/local_source.py
+import os
+import hashlib
+import subprocess
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+from backend.api.blob_cache import git_blob_sha
+from backend.api.file_filter import PathFilter, RULES_FILE_NAMES, is_rules_file, walk_directory
+
+# Directories local ingestion may read from, separated like PATH. Empty disables it.
+LOCAL_SOURCE_ROOTS = [root for root in os.getenv("VISDEP_LOCAL_ROOTS", "").split(os.pathsep) if root]
+
+def _is_within(path: str, root: str) -> bool:
+    return path == root or path.startswith(root + os.sep)
+
+def resolve_local_path(local_path: str) -> str:
+    path = os.path.realpath(local_path)
+    roots = [os.path.realpath(root) for root in LOCAL_SOURCE_ROOTS]
+    if not roots:
+        raise ValueError("Local ingestion is disabled; set VISDEP_LOCAL_ROOTS")
+    if not any(_is_within(path, root) for root in roots):
+        raise ValueError(f"{local_path} is outside the allowed local source roots")
+    if not os.path.isdir(path):
+        raise ValueError(f"{local_path} is not a directory")
+    return path
+
+def is_git_repository(path: str) -> bool:
+    """True for a working copy with a .git directory or a bare repository/mirror."""
+    if os.path.exists(os.path.join(path, '.git')):
+        return True
+    return os.path.isfile(os.path.join(path, 'HEAD')) and os.path.isdir(os.path.join(path, 'objects'))
+
+def _git(repo_path: str, *args: str) -> bytes:
+    try:
+        return subprocess.run(['git', '-C', repo_path, *args], check=True, capture_output=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"git {' '.join(args)} failed: {e.stderr.decode('utf-8', 'replace').strip()}")
+
+def resolve_commit(repo_path: str, ref: Optional[str] = None) -> str:
+    return _git(repo_path, 'rev-parse', '--verify', f"{ref or 'HEAD'}^{{commit}}").decode('ascii').strip()
+
+def _ls_tree(repo_path: str, *args: str) -> List[Dict[str, Any]]:
+    entries = []
+    for record in _git(repo_path, 'ls-tree', '-z', '-l', *args).split(b'\0'):
+        if not record:
+            continue
+        info, path = record.split(b'\t', 1)
+        _, object_type, sha, size = info.split()
+        # Submodules show up as commits and have no content here
+        if object_type == b'blob':
+            entries.append({'path': path.decode('utf-8', 'surrogateescape'), 'sha': sha.decode('ascii'),
+                            'size': int(size)})
+    return entries
+
+def list_git_tree(repo_path: str, commit_sha: str, sub_directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    prefix = (sub_directory or '').strip('/')
+    args = ['-r', '--full-tree', commit_sha]
+    if prefix:
+        args += ['--', prefix]
+    return _ls_tree(repo_path, *args)
+
+def list_git_files(repo_path: str, commit_sha: str, sub_directory: Optional[str] = None,
+                   path_filter: Optional[PathFilter] = None) -> List[Dict[str, Any]]:
+    """
+    The tree entries under `sub_directory` that `path_filter` accepts, after
+    loading the rules files in it and in its ancestors into the filter.
+    """
+    path_filter = path_filter if path_filter is not None else PathFilter()
+    entries = list_git_tree(repo_path, commit_sha, sub_directory)
+    prefix = (sub_directory or '').strip('/')
+    parts = prefix.split('/') if prefix else []
+    ancestor_rules = ['/'.join(parts[:i] + [name]) for i in range(len(parts)) for name in RULES_FILE_NAMES]
+    rules_entries = [entry for entry in entries if is_rules_file(entry['path'])]
+    if ancestor_rules:
+        rules_entries = _ls_tree(repo_path, '--full-tree', commit_sha, '--', *ancestor_rules) + rules_entries
+    for rules_file in iter_git_blobs(repo_path, rules_entries):
+        path_filter.load(rules_file['path'], rules_file['content'])
+    return path_filter.select(entries)
+
+def iter_git_blobs(repo_path: str, entries: List[Dict[str, str]]) -> Iterator[Dict[str, Any]]:
+    """
+    Read blobs straight from the object store through one `git cat-file --batch`
+    process and yield {'path', 'sha', 'content'} records in entry order.
+    """
+    process = subprocess.Popen(['git', '-C', repo_path, 'cat-file', '--batch'],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def write_requests():
+        try:
+            for entry in entries:
+                process.stdin.write(entry['sha'].encode('ascii') + b'\n')
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+
+    # Feed requests from a thread so a full stdout pipe cannot deadlock us
+    writer = threading.Thread(target=write_requests, daemon=True)
+    writer.start()
+    try:
+        for entry in entries:
+            header = process.stdout.readline().split()
+            if len(header) != 3:
+                raise RuntimeError(f"git cat-file could not read {entry['path']} ({entry['sha']})")
+            data = process.stdout.read(int(header[2]))
+            process.stdout.read(1)  # trailing newline
+            try:
+                content = data.decode('utf-8')
+            except UnicodeDecodeError:
+                continue
+            yield {'path': entry['path'], 'sha': entry['sha'], 'content': content}
+    finally:
+        process.stdout.close()
+        writer.join()
+        process.wait()
+
+def iter_working_tree(path: str, sub_directory: Optional[str] = None,
+                      path_filter: Optional[PathFilter] = None) -> Iterator[Dict[str, Any]]:
+    """
+    {'path', 'sha', 'content'} records of the files on disk under `path`.
+    Files whose real path lies outside it through a symlink are skipped.
+    """
+    if '..' in (sub_directory or '').split('/'):
+        raise ValueError(f"{sub_directory} is outside {path}")
+    path_filter = path_filter if path_filter is not None else PathFilter()
+    root = os.path.realpath(path)
+    for relative_path, file_path, _ in walk_directory(path, path_filter, sub_directory):
+        if not _is_within(os.path.realpath(file_path), root):
+            continue
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        if not path_filter.accepts_content(data):
+            continue
+        try:
+            content = data.decode('utf-8')
+        except UnicodeDecodeError:
+            continue
+        yield {'path': relative_path, 'sha': git_blob_sha(data), 'content': content}
+
+def diff_git_commits(repo_path: str, base_sha: str, head_sha: str) -> Optional[List[Dict[str, str]]]:
+    """
+    Changed files between two commits in the shape of compare-API file entries,
+    or None when head does not descend from base (or base is unknown here).
+    """
+    is_ancestor = subprocess.run(['git', '-C', repo_path, 'merge-base', '--is-ancestor', base_sha, head_sha],
+                                 capture_output=True)
+    if is_ancestor.returncode != 0:
+        return None
+
+    statuses = {'A': 'added', 'M': 'modified', 'T': 'modified', 'D': 'removed'}
+    files = []
+    records = _git(repo_path, 'diff-tree', '-r', '-z', '--no-renames', base_sha, head_sha).split(b'\0')
+    for info, path in zip(records[0::2], records[1::2]):
+        if not info:
+            continue
+        old_mode, new_mode, _, new_sha, status = info.decode('ascii').split()
+        if '160000' in (old_mode.lstrip(':'), new_mode):
+            continue  # submodule pointer
+        files.append({
+            'filename': path.decode('utf-8', 'surrogateescape'),
+            'status': statuses.get(status[0], 'modified'),
+            'sha': new_sha,
+        })
+    return files
+
+def local_repo_metadata(path: str, commit_sha: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Metadata of a local repository. Its full name carries a hash of the real
+    path, so same-named directories in different places stay apart.
+    """
+    path = os.path.realpath(path)
+    name = os.path.basename(path.rstrip(os.sep))
+    if name.endswith('.git'):
+        name = name[:-len('.git')]
+    digest = hashlib.sha256(path.encode('utf-8', 'surrogateescape')).hexdigest()[:12]
+    return {'full_name': f"local/{name}-{digest}", 'name': name, 'local_path': path, 'commit_sha': commit_sha}
@@ -0,0 +1,222 @@
+# backend/api/module_resolver.py
+import json
+import os
+import posixpath
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+PYTHON_EXTENSIONS = ('.py',)
+JAVASCRIPT_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs')
+JAVA_EXTENSIONS = ('.java', '.kt')
+C_EXTENSIONS = ('.c', '.cpp', '.h', '.hpp')
+
+# Configs whose compilerOptions.baseUrl/paths define JavaScript/TypeScript import aliases
+JS_CONFIG_FILES = ('tsconfig.json', 'jsconfig.json')
+
+# Strings are matched first so that '//' or '/*' inside them survive; comments, then trailing commas, are dropped
+_JSON_STRING = r'("(?:\\.|[^"\\])*")'
+_JSONC_COMMENTS = re.compile(_JSON_STRING + r'|//[^\n]*|/\*.*?\*/', re.S)
+_JSONC_TRAILING_COMMAS = re.compile(_JSON_STRING + r'|,(?=\s*[}\]])')
+# Leading '../' components, dropped before looking an include up by suffix
+_PARENT_PREFIX = re.compile(r'^(\.\./)+')
+
+def extract_js_config_info(source: str) -> Dict[str, Any]:
+    """
+    The import aliases of a tsconfig/jsconfig file (which may have comments
+    and trailing commas): `base_url` and `paths`, relative to the config's directory.
+    """
+    def keep_strings(match):
+        return match.group(1) or ''
+
+    config = json.loads(_JSONC_TRAILING_COMMAS.sub(keep_strings, _JSONC_COMMENTS.sub(keep_strings, source)))
+    options = config.get('compilerOptions') or {}
+    info = {"path_aliases": {pattern: list(targets) for pattern, targets in (options.get('paths') or {}).items()
+                             if isinstance(targets, list)}}
+    if options.get('baseUrl') is not None:
+        info["base_url"] = options['baseUrl']
+    return info
+
+def _join(directory: str, path: str) -> str:
+    joined = posixpath.normpath(posixpath.join(directory, path))
+    return '' if joined == '.' else joined
+
+class _SuffixMap:
+    """
+    Keys (paths without extension) found by any trailing run of path
+    components, e.g. `pkg/models` for `src/pkg/models`. Keys are bucketed by
+    their last component, so a lookup only compares the few keys sharing it;
+    the shortest matching key wins.
+    """
+
+    def __init__(self):
+        self._by_name = defaultdict(list)
+        self._cache = {}
+
+    def add(self, key: str, file_path: str) -> None:
+        self._by_name[key.rsplit('/', 1)[-1]].append((key, file_path))
+
+    def find(self, suffix: str) -> Optional[str]:
+        if suffix in self._cache:
+            return self._cache[suffix]
+        best = None
+        for key, file_path in self._by_name.get(suffix.rsplit('/', 1)[-1], ()):
+            if key == suffix or key.endswith('/' + suffix):
+                if best is None or (len(key), key) < (len(best[0]), best[0]):
+                    best = (key, file_path)
+        self._cache[suffix] = best[1] if best else None
+        return self._cache[suffix]
+
+class ModuleIndex:
+    """
+    Where the imports of a repository's files point, built once from its file
+    paths so each import resolves with a few dict lookups instead of a scan
+    of every file.
+
+    - Python: dotted modules by path suffix, packages by their `__init__.py`,
+      and relative imports (`.models.User`) from the importing file's package.
+    - JavaScript/TypeScript: relative specifiers and tsconfig/jsconfig path
+      aliases, trying the listed extensions and `index` files.
+    - Java/Kotlin: fully qualified class names by path suffix.
+    - C/C++: includes next to the including file, else by path suffix.
+    """
+
+    def __init__(self, files: Iterable[str], js_configs: Optional[Mapping[str, Dict[str, Any]]] = None):
+        self._python_modules = {}
+        self._python_suffixes = _SuffixMap()
+        self._js_modules = {}
+        self._java_suffixes = _SuffixMap()
+        self._c_files = set()
+        self._c_suffixes = _SuffixMap()
+
+        # Sorted so that ties (`x.ts` and `x.js`, `x.py` and `x/__init__.py`) resolve the same way every time
+        for file_path in sorted(files):
+            base, extension = posixpath.splitext(file_path)
+            extension = extension.lower()
+            if extension in PYTHON_EXTENSIONS:
+                if posixpath.basename(base) == '__init__':
+                    base = posixpath.dirname(base)
+                self._python_modules.setdefault(base, file_path)
+                self._python_suffixes.add(base, file_path)
+            elif extension in JAVASCRIPT_EXTENSIONS:
+                self._js_modules.setdefault(base, file_path)
+                if posixpath.basename(base) == 'index':
+                    self._js_modules.setdefault(posixpath.dirname(base), file_path)
+            elif extension in JAVA_EXTENSIONS:
+                self._java_suffixes.add(base, file_path)
+            elif extension in C_EXTENSIONS:
+                self._c_files.add(file_path)
+                self._c_suffixes.add(file_path, file_path)
+            # Any file can be imported by its full name ('./data.json', './styles.css')
+            self._js_modules.setdefault(file_path, file_path)
+
+        self._aliases = []
+        self._base_urls = []
+        for config_path, config in sorted((js_configs or {}).items()):
+            self._add_js_config(posixpath.dirname(config_path), config)
+        # Longest prefix first, as TypeScript matches them
+        self._aliases.sort(key=lambda alias: -len(alias[0]))
+
+    @classmethod
+    def from_ast_data(cls, ast_data: Mapping[str, Any]) -> 'ModuleIndex':
+        js_configs = {file_path: {"path_aliases": info.get("path_aliases") or {}, "base_url": info.get("base_url")}
+                      for file_path, info in ast_data.items() if "path_aliases" in info}
+        return cls(ast_data.keys(), js_configs)
+
+    def _add_js_config(self, directory: str, config: Dict[str, Any]) -> None:
+        base_url = _join(directory, config["base_url"]) if config.get("base_url") is not None else None
+        # Targets are relative to baseUrl when there is one, else to the config itself
+        root = base_url if base_url is not None else directory
+        for pattern, targets in config.get("path_aliases", {}).items():
+            prefix, star, suffix = pattern.partition('*')
+            self._aliases.append((prefix, suffix if star else None, [_join(root, target) for target in targets]))
+        if base_url is not None:
+            self._base_urls.append(base_url)
+
+    def python_module(self, file_path: str, module: str) -> Optional[str]:
+        """The file of a dotted module as imported from `file_path`; leading dots make it relative."""
+        level = len(module) - len(module.lstrip('.'))
+        path = module[level:].replace('.', '/')
+        if level:
+            package = posixpath.dirname(file_path)
+            for _ in range(level - 1):
+                package = posixpath.dirname(package)
+            return self._python_modules.get(_join(package, path) if path else package)
+        return self._python_suffixes.find(path) if path else None
+
+    def python_import(self, file_path: str, imp: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        (file, name) for an import as the Python extractor records it: the
+        module file and the name imported from it, or the file and None when
+        the whole import names a module (`from pkg import views`).
+        """
+        if '.' not in imp:
+            return None, None
+        module_file = self.python_module(file_path, imp)
+        if module_file:
+            return module_file, None
+        module, name = split_python_import(imp)
+        return self.python_module(file_path, module), name
+
+    def javascript_module(self, file_path: str, specifier: str) -> Optional[str]:
+        """The file an import specifier refers to, or None for packages and anything unresolved."""
+        if specifier.startswith(('./', '../')) or specifier in ('.', '..'):
+            return self._js_file(_join(posixpath.dirname(file_path), specifier))
+        for prefix, suffix, targets in self._aliases:
+            if suffix is None:
+                if specifier != prefix:
+                    continue
+                match = ''
+            elif specifier.startswith(prefix) and specifier.endswith(suffix) \
+                    and len(specifier) >= len(prefix) + len(suffix):
+                match = specifier[len(prefix):len(specifier) - len(suffix)]
+            else:
+                continue
+            for target in targets:
+                resolved = self._js_file(target.replace('*', match, 1))
+                if resolved:
+                    return resolved
+        for base_url in self._base_urls:
+            resolved = self._js_file(_join(base_url, specifier))
+            if resolved:
+                return resolved
+        return None
+
+    def _js_file(self, path: str) -> Optional[str]:
+        resolved = self._js_modules.get(path)
+        if resolved is None:
+            # './util.js' written for a TypeScript './util.ts'
+            base, extension = posixpath.splitext(path)
+            if extension in JAVASCRIPT_EXTENSIONS:
+                resolved = self._js_modules.get(base)
+        return resolved
+
+    def java_class(self, name: str) -> Optional[str]:
+        """The file declaring a fully qualified class name."""
+        return self._java_suffixes.find(name.replace('.', '/'))
+
+    def c_header(self, file_path: str, header: str) -> Optional[str]:
+        """The file an #include names, looked up next to the including file first."""
+        local = _join(posixpath.dirname(file_path), header)
+        if local in self._c_files:
+            return local
+        return self._c_suffixes.find(_PARENT_PREFIX.sub('', posixpath.normpath(header)))
+
+    def resolve(self, file_path: str, imp: str) -> Optional[str]:
+        """The project file an import of `file_path` points at, for its language, or None."""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in PYTHON_EXTENSIONS:
+            return self.python_import(file_path, imp)[0]
+        if extension in JAVASCRIPT_EXTENSIONS:
+            return self.javascript_module(file_path, imp)
+        if extension in JAVA_EXTENSIONS:
+            return self.java_class(imp)
+        if extension in C_EXTENSIONS:
+            return self.c_header(file_path, imp)
+        return None
+
+def split_python_import(imp: str) -> Tuple[str, str]:
+    """(module, name) of an import as the Python extractor records it: `pkg.mod.Name`, `.mod.Name`, `.Name`."""
+    level = len(imp) - len(imp.lstrip('.'))
+    module, _, name = imp[level:].rpartition('.')
+    return '.' * level + module, name
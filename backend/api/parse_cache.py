@@ -0,0 +1,148 @@
+# backend/api/parse_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+from backend.api.blob_cache import CACHE_DIR
+
+PARSE_CACHE_PATH = os.getenv("VISDEP_PARSE_CACHE_PATH", os.path.join(CACHE_DIR, "parse_cache.sqlite"))
+# 0 disables the cache
+PARSE_CACHE_MAX_BYTES = int(os.getenv("VISDEP_PARSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Re-measure the table size every so many writes, since other processes write to it too
+_SIZE_CHECK_INTERVAL = 256
+
+def content_key(source: str, *extra: str) -> str:
+    digest = hashlib.sha256()
+    for part in extra:
+        digest.update(part.encode('utf-8', 'surrogateescape') + b'\0')
+    digest.update(source.encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+class ParseCache:
+    """
+    Extracted file info keyed by (language, content hash), shared by every
+    parse process through one sqlite file. Each row remembers the extractor
+    version that produced it; rows from another version are never returned
+    and are dropped when the cache is opened. Least-recently-used rows are
+    evicted once the stored info exceeds max_bytes.
+    """
+
+    def __init__(self, path: str, versions: Dict[str, int], max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.path = path
+        self.versions = versions
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS parse_results (
+                language TEXT NOT NULL,
+                key TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                info TEXT NOT NULL,
+                PRIMARY KEY (language, key)
+            )
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_parse_results_last_used ON parse_results (last_used)")
+        self._purge_stale_versions()
+        self._total_bytes = self._measure()
+
+    def _purge_stale_versions(self):
+        with self._lock, self._conn:
+            placeholders = ','.join('?' * len(self.versions))
+            self._conn.execute(f"DELETE FROM parse_results WHERE language NOT IN ({placeholders})",
+                               list(self.versions))
+            for language, version in self.versions.items():
+                self._conn.execute("DELETE FROM parse_results WHERE language = ? AND version != ?",
+                                   (language, version))
+
+    def get(self, language: str, key: str) -> Optional[Dict[str, Any]]:
+        # A busy or damaged cache only costs a re-parse, never a failed file
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT info FROM parse_results WHERE language = ? AND key = ? AND version = ?",
+                    (language, key, self.versions[language])).fetchone()
+                if row is None:
+                    return None
+                with self._conn:
+                    self._conn.execute("UPDATE parse_results SET last_used = ? WHERE language = ? AND key = ?",
+                                       (time.time(), language, key))
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0])
+
+    def put(self, language: str, key: str, info: Dict[str, Any]) -> None:
+        data = json.dumps(info)
+        if len(data) > self.max_bytes:
+            return
+        try:
+            self._put(language, key, data)
+        except sqlite3.Error:
+            pass
+
+    def _put(self, language: str, key: str, data: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parse_results (language, key, version, size, last_used, info) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (language, key, self.versions[language], len(data), time.time(), data))
+            self._writes += 1
+            self._total_bytes += len(data)
+            if self._writes % _SIZE_CHECK_INTERVAL == 0:
+                self._total_bytes = self._measure()
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _measure(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM parse_results").fetchone()[0]
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._measure()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM parse_results").fetchone()[0]
+
+    def _evict(self):
+        total = self._measure()
+        self._total_bytes = total
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so the next few writes do not each trigger an eviction
+        excess = total - self.max_bytes * 9 // 10
+        victims = []
+        for language, key, size in self._conn.execute(
+                "SELECT language, key, size FROM parse_results ORDER BY last_used"):
+            if excess <= 0:
+                break
+            victims.append((language, key))
+            excess -= size
+        self._conn.executemany("DELETE FROM parse_results WHERE language = ? AND key = ?", victims)
+        self._total_bytes = self.max_bytes * 9 // 10 + excess
+
+_parse_cache = None
+_parse_cache_lock = threading.Lock()
+
+def get_parse_cache(versions: Dict[str, int]) -> Optional[ParseCache]:
+    """The process-wide cache, or None when caching is disabled or the cache file is unusable."""
+    global _parse_cache
+    if PARSE_CACHE_MAX_BYTES <= 0:
+        return None
+    with _parse_cache_lock:
+        if _parse_cache is None:
+            try:
+                _parse_cache = ParseCache(PARSE_CACHE_PATH, versions)
+            except sqlite3.Error:
+                return None
+        return _parse_cache
@@ -0,0 +1,159 @@
+# backend/api/pipeline.py
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("VISDEP_PIPELINE_QUEUE_SIZE", "256"))
+PIPELINE_PARSE_WORKERS = int(os.getenv("VISDEP_PIPELINE_PARSE_WORKERS", "2"))
+PIPELINE_BATCH_SIZE = int(os.getenv("VISDEP_PIPELINE_BATCH_SIZE", "32"))
+
+_DONE = object()
+
+class MeteredQueue:
+    """Bounded asyncio queue that records its depth and how long producers were blocked on it."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self._queue = asyncio.Queue(maxsize)
+        self.items = 0
+        self.max_depth = 0
+        self.blocked_puts = 0
+        self.blocked_seconds = 0.0
+        self._depth_total = 0
+
+    async def put(self, item):
+        if self._queue.full():
+            start = time.perf_counter()
+            await self._queue.put(item)
+            self.blocked_puts += 1
+            self.blocked_seconds += time.perf_counter() - start
+        else:
+            self._queue.put_nowait(item)
+        if item is not _DONE:
+            self.items += 1
+            depth = self._queue.qsize()
+            self._depth_total += depth
+            self.max_depth = max(self.max_depth, depth)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def get_nowait(self):
+        return self._queue.get_nowait()
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.maxsize,
+            "items": self.items,
+            "max_depth": self.max_depth,
+            "mean_depth": round(self._depth_total / self.items, 2) if self.items else 0.0,
+            "blocked_puts": self.blocked_puts,
+            "blocked_seconds": round(self.blocked_seconds, 4),
+        }
+
+async def emit_from_thread(iterate: Callable[[], Iterable[Any]], emit: Callable[[Any], Awaitable[None]]) -> None:
+    """
+    Drain a blocking iterator on a worker thread into an async `emit`, so the
+    thread is paused whenever the consumer applies backpressure.
+    """
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    pending = []
+
+    def run():
+        for item in iterate():
+            if stop.is_set():
+                return
+            future = asyncio.run_coroutine_threadsafe(emit(item), loop)
+            pending[:] = [future]
+            future.result()
+
+    try:
+        await asyncio.to_thread(run)
+    finally:
+        stop.set()
+        for future in pending:
+            future.cancel()
+
+async def run_pipeline(produce: Callable[[Callable[[Any], Awaitable[None]]], Awaitable[Any]],
+                       parse_batch: Callable[[List[Any]], List[Any]],
+                       store_batch: Callable[[List[Any]], None],
+                       queue_size: int = PIPELINE_QUEUE_SIZE,
+                       parse_workers: int = PIPELINE_PARSE_WORKERS,
+                       batch_size: int = PIPELINE_BATCH_SIZE):
+    """
+    Run fetch -> parse -> store with bounded queues between the stages.
+
+    `produce(emit)` awaits `emit(record)` for every fetched record and returns
+    its own stats. Parse workers take up to `batch_size` queued records at a
+    time and run `parse_batch` off the event loop; a single store stage runs
+    `store_batch` on each parsed batch as it arrives. Returns
+    (produce_result, pipeline_stats).
+    """
+    fetched = MeteredQueue("fetched", queue_size)
+    parsed = MeteredQueue("parsed", max(1, queue_size // batch_size))
+    started = time.perf_counter()
+    stage_seconds = {"parse": 0.0, "store": 0.0}
+    first_result = []
+
+    async def fetch_stage():
+        result = await produce(fetched.put)
+        for _ in range(parse_workers):
+            await fetched.put(_DONE)
+        return result
+
+    async def parse_worker():
+        done = False
+        while not done:
+            batch = []
+            item = await fetched.get()
+            while True:
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+                if len(batch) >= batch_size or fetched.empty():
+                    break
+                item = fetched.get_nowait()
+            if batch:
+                start = time.perf_counter()
+                results = await asyncio.to_thread(parse_batch, batch)
+                stage_seconds["parse"] += time.perf_counter() - start
+                await parsed.put(results)
+
+    async def parse_stage():
+        await asyncio.gather(*(parse_worker() for _ in range(parse_workers)))
+        await parsed.put(_DONE)
+
+    async def store_stage():
+        while True:
+            batch = await parsed.get()
+            if batch is _DONE:
+                return
+            start = time.perf_counter()
+            await asyncio.to_thread(store_batch, batch)
+            stage_seconds["store"] += time.perf_counter() - start
+            if not first_result:
+                first_result.append(time.perf_counter() - started)
+
+    tasks = [asyncio.ensure_future(stage) for stage in (fetch_stage(), parse_stage(), store_stage())]
+    try:
+        produce_result, _, _ = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    stats = {
+        "elapsed": round(time.perf_counter() - started, 4),
+        "time_to_first_result": round(first_result[0], 4) if first_result else None,
+        "stages": {name: round(seconds, 4) for name, seconds in stage_seconds.items()},
+        "queues": {queue.name: queue.stats() for queue in (fetched, parsed)},
+    }
+    return produce_result, stats
@@ -0,0 +1,75 @@
+# backend/api/symbols.py
+import re
+from bisect import bisect_right
+from typing import Any, Dict, Optional
+
+_NEWLINE = re.compile('\n')
+
+class SourceLines:
+    """
+    Converts between character offsets, (line, column) positions and UTF-8
+    byte offsets of one source text. Lines are 1-based; byte offsets are
+    what `source.encode('utf-8')` would be indexed with.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.starts = [0] + [match.end() for match in _NEWLINE.finditer(source)]
+        self._ascii = source.isascii()
+        self._byte_starts = None
+
+    def line(self, offset: int) -> int:
+        return bisect_right(self.starts, offset)
+
+    def offset(self, line: int, column: int) -> int:
+        """Character offset of a 0-based character column on a line."""
+        return self.starts[line - 1] + column
+
+    def line_byte(self, line: int) -> int:
+        """Byte offset at which a line starts."""
+        if self._ascii:
+            return self.starts[line - 1]
+        if self._byte_starts is None:
+            byte_starts = [0]
+            for start, end in zip(self.starts, self.starts[1:]):
+                byte_starts.append(byte_starts[-1] + len(self.source[start:end].encode('utf-8', 'surrogatepass')))
+            self._byte_starts = byte_starts
+        return self._byte_starts[line - 1]
+
+    def byte(self, offset: int) -> int:
+        if self._ascii:
+            return offset
+        line = self.line(offset)
+        start = self.starts[line - 1]
+        return self.line_byte(line) + len(self.source[start:offset].encode('utf-8', 'surrogatepass'))
+
+def qualify(parent: Optional[str], name: str) -> str:
+    return f"{parent}.{name}" if parent else name
+
+def make_symbol(kind: str, name: str, parent: Optional[str], start_line: int, end_line: int,
+                start_byte: Optional[int], end_byte: Optional[int]) -> Dict[str, Any]:
+    """
+    One declared symbol. `parent` is the qualified name of the enclosing
+    class or function, if any; `end_byte` is exclusive.
+    """
+    return {
+        "kind": kind,
+        "name": name,
+        "qualified_name": qualify(parent, name),
+        "parent": parent,
+        "start_line": start_line,
+        "end_line": end_line,
+        "start_byte": start_byte,
+        "end_byte": end_byte,
+    }
+
+def symbol_from_offsets(kind: str, name: str, parent: Optional[str], lines: SourceLines,
+                        start: int, end: int) -> Dict[str, Any]:
+    """A symbol spanning the characters [start, end) of the source."""
+    return make_symbol(kind, name, parent, lines.line(start), lines.line(max(start, end - 1)),
+                       lines.byte(start), lines.byte(end))
+
+def symbol_source(source: str, symbol: Dict[str, Any]) -> str:
+    """The text of a symbol, cut from the source it was extracted from."""
+    data = source.encode('utf-8', 'surrogatepass')
+    return data[symbol["start_byte"]:symbol["end_byte"]].decode('utf-8', 'replace')
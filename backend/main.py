@@ -1,18 +1,23 @@
 # backend/main.py
 import os
 import json
-from fastapi import FastAPI, HTTPException
+import asyncio
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from backend.api.github_api import fetch_repo_content, fetch_repo_metadata
+from backend.api.github_api import DEFAULT_FETCH_CONCURRENCY
+from backend.api.ingestion import ingest_repo, ingest_local, load_graph, TREE_ARTIFACT, LEVELS_ARTIFACT
+from backend.api.data_storage import iter_ast_data, retrieve_artifact
 from backend.api.langchain_integration import get_jamba_response
-from backend.api.ast_parser import parse_code_to_ast
-from backend.api.data_storage import store_repository_metadata, store_ast_data
 from backend.api.chatbot import router as chatbot_router
-from backend.api.graph_generator import create_dependency_graph, save_graph_as_json, load_graph_from_json
+from backend.api.graph_layout import LAYOUT_MODES
+from backend.api.directory_tree import DirectoryTree
+from backend.api.graph_levels import GraphLevels
+from backend.api.code_queries import resolve_repo_id, find_definitions, find_importers, list_directory
 from networkx.readwrite import json_graph
 from dotenv import load_dotenv
-from typing import Optional
+from typing import List, Optional
 import logging
 
 # Load environment variables from .env file
@@ -29,19 +34,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Ensure AI21 API key and GitHub token are set
+# Ensure AI21 API key is set; the GitHub token is only needed for repo_url uploads
 if not os.getenv("AI21_API_KEY"):
     raise RuntimeError("AI21_API_KEY environment variable is not set")
-if not os.getenv("GITHUB_AUTH_TOKEN"):
-    raise RuntimeError("GITHUB_AUTH_TOKEN environment variable is not set")
 
 class RepoLink(BaseModel):
-    repo_url: str
+    repo_url: Optional[str] = None
+    # A local directory, working copy or bare mirror under VISDEP_LOCAL_ROOTS, instead of repo_url
+    local_path: Optional[str] = None
     sub_directory: Optional[str] = None
+    ref: Optional[str] = None
+    # Force a single archive download. Otherwise blobs are served from the SHA cache and
+    # only fall back to the archive when too many are missing.
+    bulk: bool = False
+    concurrency: Optional[int] = None
 
 class QueryRequest(BaseModel):
     query: str
-    context: dict  # Adjust to accept dictionary context
+    # The ingested repository to chat about (id or name); its stored files are the context
+    repo: Optional[str] = None
+    context: Optional[dict] = None
 
 def store_repo_data(repo_metadata):
     # Log the storage action for debugging
@@ -53,79 +65,157 @@ def store_parsed_data(parsed_data):
 
 @app.post("/api/upload_repo")
 async def upload_repo(link: RepoLink):
+    if bool(link.repo_url) == bool(link.local_path):
+        raise HTTPException(status_code=400, detail="Provide exactly one of repo_url or local_path")
+    auth_token = os.getenv("GITHUB_AUTH_TOKEN")
+    if link.repo_url and not auth_token:
+        raise HTTPException(status_code=503, detail="GITHUB_AUTH_TOKEN environment variable is not set")
     try:
         repo_url = link.repo_url
         sub_directory = link.sub_directory
-        auth_token = os.getenv("GITHUB_AUTH_TOKEN")
         
-        # Fetch repository content and metadata
-        logging.debug(f"Fetching content for repo: {repo_url}")
-        repo_content = fetch_repo_content(repo_url, auth_token, sub_directory)
-        logging.debug(f"Fetched repo content: {repo_content}")
-        
-        repo_metadata = fetch_repo_metadata(repo_url, auth_token)
-        logging.debug(f"Fetched repo metadata: {repo_metadata}")
-        
-        # Parse the repository content to AST
-        parsed_data = parse_code_to_ast(repo_content)
-        logging.debug(f"Parsed AST data: {parsed_data}")
-        
-        # Store repository metadata and parsed AST data
-        repo_id = store_repository_metadata(repo_metadata['full_name'], repo_metadata)
-        for file_path, ast_info in parsed_data.items():
-            store_ast_data(repo_id, file_path, ast_info)
-
-        # Save parsed data as context
-        with open("context.json", "w") as context_file:
-            json.dump(parsed_data, context_file)
-        
-        # Create and save the dependency graph
-        graph = create_dependency_graph(parsed_data)
-        save_graph_as_json(graph, "dependency_graph.json")
+        if link.local_path:
+            logging.debug(f"Ingesting local repo: {link.local_path}")
+            result = await ingest_local(link.local_path, sub_directory, link.ref)
+        else:
+            logging.debug(f"Ingesting repo: {repo_url}")
+            result = await ingest_repo(
+                repo_url, auth_token, sub_directory, link.ref, bulk=link.bulk,
+                concurrency=link.concurrency or DEFAULT_FETCH_CONCURRENCY,
+            )
+        logging.info(f"Ingested {repo_url or link.local_path}: {result}")
         
-        return {"message": "Repository data successfully uploaded, parsed, and graph generated."}
+        return {"message": "Repository data successfully uploaded, parsed, and graph generated.", **result}
     
     except Exception as e:
         logging.error(f"Error in upload_repo: {e}")
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
+def _repo_id_or_404(repo: str) -> int:
+    repo_id = resolve_repo_id(repo)
+    if repo_id is None:
+        raise HTTPException(status_code=404, detail=f"Repository {repo} has not been ingested")
+    return repo_id
+
 @app.get("/api/dependency_graph")
-async def get_dependency_graph():
+async def get_dependency_graph(repo: str, revision: Optional[int] = None, layout: Optional[str] = None):
     try:
-        graph = load_graph_from_json("dependency_graph.json")
-        data = json_graph.node_link_data(graph)
+        if layout is not None and layout not in LAYOUT_MODES:
+            raise HTTPException(status_code=400, detail=f"layout must be one of {', '.join(LAYOUT_MODES)}")
+        repo_id = _repo_id_or_404(repo)
+        # Other layout modes are computed off the event loop on first request, then saved per revision
+        G = await asyncio.to_thread(load_graph, repo_id, revision, layout)
+        if G is None:
+            raise HTTPException(status_code=404, detail=f"No dependency graph stored for repository {repo}")
+        data = json_graph.node_link_data(G)
         return {"nodes": data["nodes"], "edges": data["links"]}
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error in get_dependency_graph: {e}")
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
+@app.get("/api/graph_levels")
+async def get_graph_levels(repo: str, level: int = 0, expand: List[str] = Query(default=[]),
+                           revision: Optional[int] = None):
+    try:
+        data = retrieve_artifact(_repo_id_or_404(repo), LEVELS_ARTIFACT, revision)
+        if data is None:
+            raise HTTPException(status_code=404, detail=f"No graph levels stored for repository {repo}")
+        try:
+            return GraphLevels.loads(data).view(level, expand)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=f"No directory {e.args[0]} in repository {repo}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error in get_graph_levels: {e}")
+        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
 @app.post("/api/query")
 async def query_jamba(request: QueryRequest):
     try:
         query = request.query
-        context = request.context
-        
+        repo_id = _repo_id_or_404(request.repo) if request.repo else None
+        if repo_id is None and request.context is None:
+            raise HTTPException(status_code=400, detail="Provide repo or context")
+
         # Get response from Jamba model (now awaited)
-        response = await get_jamba_response(query, context)
+        response = await get_jamba_response(query, request.context, repo_id=repo_id)
         
         if response:
             return {"response": response}
         else:
             raise HTTPException(status_code=500, detail="Failed to get a response from the model.")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
+def _stream_context(repo_id: int):
+    # One file at a time, so contents are never all held in memory
+    yield "{"
+    for index, (file_path, info) in enumerate(iter_ast_data(repo_id)):
+        yield f"{', ' if index else ''}{json.dumps(file_path)}: {json.dumps(info)}"
+    yield "}"
+
 @app.get("/api/context")
-async def get_context():
+async def get_context(repo: str):
     try:
-        with open("context.json", "r") as context_file:
-            context = json.load(context_file)
-        return context
+        return StreamingResponse(_stream_context(_repo_id_or_404(repo)), media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error in get_context: {e}")
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
+@app.get("/api/definitions")
+async def get_definitions(repo: str, name: str, kind: Optional[str] = None):
+    try:
+        return {"definitions": find_definitions(_repo_id_or_404(repo), name, kind)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error in get_definitions: {e}")
+        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
+@app.get("/api/importers")
+async def get_importers(repo: str, module: str):
+    try:
+        return {"importers": find_importers(_repo_id_or_404(repo), module)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error in get_importers: {e}")
+        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
+@app.get("/api/directory")
+async def get_directory(repo: str, path: str = ''):
+    try:
+        return list_directory(_repo_id_or_404(repo), path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error in get_directory: {e}")
+        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
+@app.get("/api/directory_tree")
+async def get_directory_tree(repo: str, path: str = '', revision: Optional[int] = None):
+    try:
+        data = retrieve_artifact(_repo_id_or_404(repo), TREE_ARTIFACT, revision)
+        if data is None:
+            raise HTTPException(status_code=404, detail=f"No directory tree stored for repository {repo}")
+        tree = DirectoryTree.loads(data)
+        if path.strip('/') not in tree:
+            raise HTTPException(status_code=404, detail=f"No directory {path} in repository {repo}")
+        return tree.summary(path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error in get_directory_tree: {e}")
+        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
 # Include the chatbot router
 app.include_router(chatbot_router, prefix="/api")
 
@@ -0,0 +1,68 @@
+# backend/tests/mock_github.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+class MockGitHubServer:
+    """
+    Local stand-in for api.github.com. `routes` maps request paths (with query
+    string) to a JSON-serializable body or raw bytes. `failures` maps a path to
+    a list of (status, headers) responses served, in order, before the route.
+    While entered, github_api sends all traffic here.
+    """
+
+    def __init__(self, routes, failures=None):
+        self.routes = routes
+        self.failures = {path: list(responses) for path, responses in (failures or {}).items()}
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append(self.path)
+                    pending = server.failures.get(self.path)
+                    failure = pending.pop(0) if pending else None
+                if failure:
+                    status, headers = failure
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if self.path not in server.routes:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.routes[self.path]
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self._patch = patch('backend.api.github_api.GITHUB_API_URL', self.url)
+        self._patch.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._patch.stop()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, path):
+        return self.requests.count(path)
@@ -1,6 +1,12 @@
 import unittest
-from backend.api.ast_parser import parse_code_file, extract_python_info, parse_python_file
+from backend.api.ast_parser import (
+    parse_code_file, extract_python_info, parse_python_file, parse_code_to_ast, parse_in_parallel,
+    scan_javascript_source, parse_code_source, parse_python_source, _parse_isolated
+)
+from backend.api.cpp_parser import CompileDatabase
+from backend.api.symbols import symbol_source
 import os
+from unittest.mock import patch
 
 class TestASTParser(unittest.TestCase):
     
@@ -18,6 +24,168 @@ def hello_world():
         self.assertIn('hello_world', info['functions'])
         os.remove('test_file.py')
     
+    def test_python_symbols_carry_scope_and_spans(self):
+        source = '''"""Ünïcode docstring shifts byte offsets."""
+@register
+class Worker:
+    def run(self):
+        def step():
+            pass
+
+async def main():
+    pass
+'''
+        info = extract_python_info(parse_python_source(source), source)
+
+        self.assertEqual(info['functions'], ['run', 'step', 'main'])
+        symbols = {symbol['qualified_name']: symbol for symbol in info['symbols']}
+        self.assertEqual(list(symbols), ['Worker', 'Worker.run', 'Worker.run.step', 'main'])
+        self.assertEqual([symbols[name]['kind'] for name in symbols], ['class', 'method', 'function', 'function'])
+        self.assertEqual(symbols['Worker.run.step']['parent'], 'Worker.run')
+        self.assertEqual((symbols['Worker']['start_line'], symbols['Worker']['end_line']), (2, 6))
+        self.assertTrue(symbol_source(source, symbols['Worker']).startswith('@register\nclass Worker:'))
+        self.assertEqual(symbol_source(source, symbols['main']), 'async def main():\n    pass')
+
+    def test_java_symbols_span_annotations_to_closing_brace(self):
+        source = '''package app;
+@Entity
+public class Order {
+    @Override
+    public String toString() { return "{"; }
+    interface Visitor { void visit(); }
+}
+'''
+        info = parse_code_source('Order.java', source)
+
+        self.assertEqual(info['functions'], ['toString', 'visit'])
+        symbols = {symbol['qualified_name']: symbol for symbol in info['symbols']}
+        self.assertEqual(symbols['Order']['kind'], 'class')
+        self.assertEqual((symbols['Order']['start_line'], symbols['Order']['end_line']), (2, 7))
+        self.assertEqual(symbol_source(source, symbols['Order.toString']),
+                         '@Override\n    public String toString() { return "{"; }')
+        self.assertEqual(symbols['Order.Visitor.visit']['parent'], 'Order.Visitor')
+        self.assertEqual(symbol_source(source, symbols['Order.Visitor.visit']), 'void visit();')
+
+    def test_parse_code_to_ast_in_memory(self):
+        repo_content = [
+            {'path': 'pkg/app.py', 'content': 'import os\n\ndef main():\n    pass\n'},
+            {'path': 'README.md', 'content': 'héllo'},
+        ]
+        # In-process, so the patch below sees every read
+        with patch('backend.api.ast_parser.PARSE_TIMEOUT_SECONDS', 0), \
+                patch('backend.api.ast_parser.PARSE_MEMORY_LIMIT_BYTES', 0), \
+                patch('builtins.open', side_effect=AssertionError("parse_code_to_ast touched the disk")):
+            parsed = parse_code_to_ast(repo_content, workers=1)
+
+        self.assertEqual(parsed['pkg/app.py']['functions'], ['main'])
+        self.assertEqual(parsed['pkg/app.py']['content'], repo_content[0]['content'])
+        self.assertEqual(parsed['README.md']['size'], 6)
+
+    def test_parse_in_parallel_keeps_input_order(self):
+        items = [(f'module{i}.py', f'def function{i}():\n    pass\n', None) for i in range(9)]
+        results = parse_in_parallel(items, workers=2, chunk_size=2)
+        self.assertEqual([info['functions'] for info in results], [[f'function{i}'] for i in range(9)])
+
+    def test_small_runs_skip_the_process_pool(self):
+        items = [('app.py', 'def main():\n    pass\n', None), ('lib.py', 'class Lib:\n    pass\n', None)]
+        with patch('backend.api.ast_parser._parse_pool', None), \
+                patch('backend.api.ast_parser.ProcessPoolExecutor', side_effect=AssertionError("pool started")):
+            results = parse_in_parallel(items, workers=8, timeout=5)
+            self.assertEqual(parse_in_parallel(items * 20, workers=1, timeout=5), results * 20)
+
+        self.assertEqual(results[0]['functions'], ['main'])
+        self.assertEqual(results[1]['classes'], ['Lib'])
+
+    def test_file_over_time_budget_is_skipped(self):
+        items = [('dump.sql', 'select 1;' * 2000000, None), ('app.py', 'def main():\n    pass\n', None)]
+        results = parse_in_parallel(items, workers=2, timeout=0.01)
+
+        self.assertEqual(results[0]['skipped'], 'timeout')
+        self.assertGreaterEqual(results[0]['elapsed'], 0.01)
+        self.assertEqual(results[1]['functions'], ['main'])
+
+    def test_crashing_worker_only_costs_the_chunks_in_flight(self):
+        # Evaluating the static_assert keeps libclang busy in native code until the watchdog kills the worker
+        spin = ('spin.cpp', 'constexpr long f() { long s = 0; for (long i = 0; i < (1L << 40); ++i) s += i; '
+                            'return s; }\nstatic_assert(f() != 0, "");\n', ['-std=c++17', '-fconstexpr-steps=2147483647'])
+        items = [(f'module{i}.py', f'def function{i}():\n    pass\n', None) for i in range(60)]
+        items.insert(5, spin)
+        isolated = []
+
+        def record_isolated(chunk, *args):
+            isolated.append(len(chunk))
+            return _parse_isolated(chunk, *args)
+
+        with patch('backend.api.ast_parser._parse_isolated', record_isolated):
+            results = parse_in_parallel(items, workers=2, chunk_size=4, timeout=0.5)
+
+        self.assertEqual(results[5]['skipped'], 'timeout')
+        self.assertEqual([info['functions'] for info in results[:5] + results[6:]], [[f'function{i}'] for i in range(60)])
+        # Only the chunks in flight when the worker died are re-run, each whole and in parallel
+        self.assertLessEqual(sum(isolated), 2 * 2 * 4)
+        self.assertTrue(all(size == 4 for size in isolated))
+
+    def test_scan_javascript_source_handles_typescript(self):
+        source = '''
+// import commented from 'nope'
+import React, { useState } from 'react';
+import type { Props } from "./types"
+export * from './reexport'
+const fs = require('fs')
+const pattern = /from 'regex'/g, half = total / 2;
+const label = `import ${name} from 'template'`;
+export default function App({ title }: Props): JSX.Element {
+  function inner() {}
+  return <h1>Don't {title}</h1>
+}
+export abstract class Base<T> extends Thing implements Shape {}
+const expression = class Named {}
+'''
+        info = scan_javascript_source(source)
+
+        self.assertEqual(info['imports'], ['react', './types', './reexport', 'fs'])
+        self.assertEqual(info['functions'], ['App'])
+        self.assertEqual(info['classes'], ['Base'])
+        app, base = info['symbols']
+        self.assertEqual((app['start_line'], app['end_line']), (9, 12))
+        self.assertTrue(symbol_source(source, app).startswith('export default function App('))
+        self.assertEqual(symbol_source(source, base), 'export abstract class Base<T> extends Thing implements Shape {}')
+
+    def test_parse_cpp_source_records_includes_of_the_file_only(self):
+        source = '''
+#include <vector>
+#include "widgets/button.h"
+#ifdef WITH_EXTRA
+int extra();
+#endif
+namespace ui {
+class Window { void draw() { int unused = 0; } };
+int main_loop(int argc) { return argc; }
+}
+'''
+        info = parse_code_source('src/window.cpp', source, compile_args=['-std=c++17', '-DWITH_EXTRA'])
+
+        self.assertEqual(info['imports'], ['vector', 'widgets/button.h'])
+        self.assertEqual([include['line'] for include in info['includes']], [2, 3])
+        self.assertEqual(info['functions'], ['extra', 'main_loop'])
+        self.assertEqual(info['classes'], ['Window'])
+        spans = {symbol['qualified_name']: (symbol['kind'], symbol['start_line'], symbol['end_line'])
+                 for symbol in info['symbols']}
+        self.assertEqual(spans['ui.Window.draw'], ('method', 8, 8))
+        self.assertEqual(spans['ui.main_loop'], ('function', 9, 9))
+
+    def test_compile_database_matches_repository_paths(self):
+        database = CompileDatabase([{
+            'directory': '/build/project',
+            'command': 'c++ -Iinclude -DNDEBUG -O2 -std=c++20 -c src/window.cpp -o window.o',
+            'file': 'src/window.cpp',
+        }])
+
+        expected = ['-I', '/build/project/include', '-DNDEBUG', '-std=c++20']
+        self.assertEqual(database.flags_for('src/window.cpp'), expected)
+        self.assertEqual(database.flags_for('src/window.h'), expected)
+        self.assertIsNone(database.flags_for('other/main.cpp'))
+
     # Add more tests for other languages and file types
 
 if __name__ == '__main__':
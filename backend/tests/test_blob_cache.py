@@ -0,0 +1,51 @@
+import tempfile
+import unittest
+from backend.api.blob_cache import BlobCache, ETagCache, git_blob_sha
+
+class TestBlobCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_git_blob_sha(self):
+        # `printf 'hello world' | git hash-object --stdin`
+        self.assertEqual(git_blob_sha(b'hello world'), '95d09f2b10159347eece71399a7e2e907ea3df4f')
+
+    def test_put_get_and_lru_eviction(self):
+        cache = BlobCache(self.tmp_dir.name, max_bytes=10)
+        cache.put('a' * 40, b'1234')
+        cache.put('b' * 40, b'5678')
+        self.assertEqual(cache.get('a' * 40), b'1234')  # 'a' becomes most recently used
+
+        cache.put('c' * 40, b'9012')
+
+        self.assertNotIn('b' * 40, cache)
+        self.assertEqual(cache.get('a' * 40), b'1234')
+        self.assertEqual(cache.total_bytes, 8)
+
+        reopened = BlobCache(self.tmp_dir.name, max_bytes=10)
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.get('c' * 40), b'9012')
+
+    def test_etag_cache(self):
+        cache = ETagCache(self.tmp_dir.name)
+        self.assertIsNone(cache.get('https://api.github.com/repos/test/repo'))
+        cache.put('https://api.github.com/repos/test/repo', '"abc"', {'full_name': 'test/repo'})
+        self.assertEqual(cache.get('https://api.github.com/repos/test/repo'), ('"abc"', {'full_name': 'test/repo'}))
+        cache.put('https://api.github.com/repos/test/repo', '"def"', {'full_name': 'test/repo', 'stars': 1})
+        self.assertEqual(cache.get('https://api.github.com/repos/test/repo')[0], '"def"')
+
+    def test_etag_cache_is_bounded(self):
+        cache = ETagCache(self.tmp_dir.name, max_bytes=200)
+        for i in range(20):
+            cache.put(f'https://api.github.com/repos/test/repo{i}', f'"{i}"', {'id': i})
+        self.assertLess(len(cache), 20)
+        self.assertIsNone(cache.get('https://api.github.com/repos/test/repo0'))
+        self.assertEqual(cache.get('https://api.github.com/repos/test/repo19'), ('"19"', {'id': 19}))
+        self.assertLessEqual(len(ETagCache(self.tmp_dir.name, max_bytes=200)), len(cache))
+
+if __name__ == '__main__':
+    unittest.main()
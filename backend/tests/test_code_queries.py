@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from backend.api.data_storage import (
+    initialize_database, store_repository_metadata, update_repository, ast_data_writer, delete_ast_data,
+)
+from backend.api.code_queries import resolve_repo_id, find_definitions, find_importers, list_directory
+
+class TestCodeQueries(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        patcher = patch('backend.api.data_storage.DATABASE_PATH', os.path.join(tmp_dir.name, 'index.db'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        initialize_database()
+
+        self.repo_id = store_repository_metadata('acme/shop', {})
+        update_repository(self.repo_id, {}, commit_sha='abc', sub_directory='')
+        with ast_data_writer(self.repo_id) as writer:
+            writer.store_many([
+                ('shop/models.py', {'imports': ['django.db.models'], 'symbols': [
+                    {'kind': 'class', 'name': 'Order', 'qualified_name': 'Order', 'parent': None,
+                     'start_line': 3, 'end_line': 9, 'start_byte': 20, 'end_byte': 180},
+                    {'kind': 'method', 'name': 'total', 'qualified_name': 'Order.total', 'parent': 'Order',
+                     'start_line': 5, 'end_line': 9, 'start_byte': 60, 'end_byte': 180},
+                ]}),
+                ('shop/views/orders.py', {'imports': ['shop.models.Order', 'django.http'],
+                                          'functions': ['list_orders'], 'classes': []}),
+                ('shop/views/api/v1.py', {'imports': ['shopping']}),
+                ('main.go', {'functions': ['main'], 'imports': ['fmt']}),
+            ])
+
+    def test_definitions(self):
+        self.assertEqual(resolve_repo_id('acme/shop'), self.repo_id)
+        self.assertIsNone(resolve_repo_id('acme/unknown'))
+
+        [order] = find_definitions(self.repo_id, 'Order')
+        self.assertEqual((order['path'], order['kind'], order['start_line']), ('shop/models.py', 'class', 3))
+        self.assertEqual([d['parent'] for d in find_definitions(self.repo_id, 'Order.total')], ['Order'])
+        # Files stored without symbols still have their names indexed
+        self.assertEqual([d['path'] for d in find_definitions(self.repo_id, 'main', kind='function')], ['main.go'])
+
+    def test_importers_and_directories(self):
+        self.assertEqual([(i['path'], i['module']) for i in find_importers(self.repo_id, 'shop')],
+                         [('shop/views/orders.py', 'shop.models.Order')])
+        self.assertEqual(len(find_importers(self.repo_id, 'django')), 2)
+
+        self.assertEqual(list_directory(self.repo_id, ''), {'directory': '', 'files': ['main.go'],
+                                                            'directories': ['shop']})
+        self.assertEqual(list_directory(self.repo_id, 'shop/'),
+                         {'directory': 'shop', 'files': ['models.py'], 'directories': ['views']})
+
+        delete_ast_data(self.repo_id, ['shop/models.py'])
+        self.assertEqual(find_definitions(self.repo_id, 'Order'), [])
+        self.assertEqual(len(find_importers(self.repo_id, 'django')), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 import sys
 import os
+import tempfile
+from unittest.mock import patch
 
 # Add the parent directory to the sys.path to ensure modules can be found
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -10,13 +12,35 @@ from api.data_storage import (
     store_repository_metadata,
     store_ast_data,
     retrieve_repository_metadata,
-    retrieve_ast_data
+    retrieve_ast_data,
+    update_repository,
+    retrieve_latest_ingestion,
+    delete_ast_data,
+    ast_data_writer,
+    retrieve_ast_data_bulk,
+    record_revision,
+    list_revisions,
+    retrieve_revision_files,
+    retrieve_blob,
+    get_pool,
+    retrieve_latest_revision,
+    store_artifact,
+    store_ast_data_batch,
+    begin_snapshot,
+    publish_snapshot,
+    discard_snapshot,
+    retrieve_artifact
 )
 
 class TestDataStorage(unittest.TestCase):
 
-    @classmethod
-    def setUpClass(cls):
+    def setUp(self):
+        # A fresh database per test, so upserted repositories and their revisions do not carry over between runs
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        patcher = patch('api.data_storage.DATABASE_PATH', os.path.join(tmp_dir.name, 'data_storage.db'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
         initialize_database()
 
     def test_store_and_retrieve_repository_metadata(self):
@@ -39,5 +63,127 @@ class TestDataStorage(unittest.TestCase):
         retrieved_ast_data = retrieve_ast_data(repo_name)
         self.assertEqual({file_path: ast_info}, retrieved_ast_data)
 
+    def test_incremental_ingestion_bookkeeping(self):
+        repo_name = 'incremental_repo'
+        metadata = {'description': 'Test repository'}
+        repo_id = store_repository_metadata(repo_name, metadata)
+        update_repository(repo_id, metadata, commit_sha='abc123', sub_directory='src')
+
+        self.assertEqual(retrieve_latest_ingestion(repo_name),
+                         {'repo_id': repo_id, 'commit_sha': 'abc123', 'sub_directory': 'src'})
+
+        store_ast_data(repo_id, 'src/a.py', {'functions': ['a']})
+        store_ast_data(repo_id, 'src/b.py', {'functions': ['b']})
+        delete_ast_data(repo_id, ['src/a.py'])
+        self.assertEqual(retrieve_ast_data(repo_id), {'src/b.py': {'functions': ['b']}})
+
+    def test_sub_directories_keep_their_own_rows(self):
+        docs_id = store_repository_metadata('split/repo', {}, 'docs')
+        src_id = store_repository_metadata('split/repo', {}, 'src')
+        self.assertNotEqual(docs_id, src_id)
+        self.assertEqual(store_repository_metadata('split/repo', {'stars': 1}, 'docs'), docs_id)
+        update_repository(docs_id, {}, commit_sha='c1', sub_directory='docs')
+        update_repository(src_id, {}, commit_sha='c1', sub_directory='src')
+
+        self.assertEqual(retrieve_latest_ingestion('split/repo')['repo_id'], src_id)
+        self.assertEqual(retrieve_latest_ingestion('split/repo', 'docs')['repo_id'], docs_id)
+        self.assertIsNone(retrieve_latest_ingestion('split/repo', ''))
+
+    def test_batched_writes_commit_or_roll_back_together(self):
+        repo_id = store_repository_metadata('batched_repo', {})
+        other_id = store_repository_metadata('other_repo', {})
+        with ast_data_writer(repo_id) as writer:
+            writer.store_many((f'src/{i}.py', {'functions': [f'f{i}']}) for i in range(1200))
+        with ast_data_writer(other_id) as writer:
+            writer.store_many([('main.py', {'functions': ['main']})])
+
+        with self.assertRaises(RuntimeError):
+            with ast_data_writer(repo_id) as writer:
+                writer.delete_many(['src/0.py'])
+                writer.store_many([('src/new.py', {})])
+                raise RuntimeError('ingestion failed')
+
+        self.assertEqual(len(retrieve_ast_data(repo_id)), 1200)
+        paths = [f'src/{i}.py' for i in range(0, 1200, 2)] + ['missing.py']
+        self.assertEqual(sorted(retrieve_ast_data(repo_id, paths)), sorted(paths[:-1]))
+        bulk = retrieve_ast_data_bulk([repo_id, other_id])
+        self.assertEqual((len(bulk[repo_id]), bulk[other_id]), (1200, {'main.py': {'functions': ['main']}}))
+
+    def test_snapshots_are_swapped_in_whole(self):
+        repo_id = store_repository_metadata('snapshot/repo', {})
+        store_ast_data_batch(repo_id, [('old.py', {'functions': ['old']})])
+
+        snapshot = begin_snapshot(repo_id)
+        for i in range(3):
+            store_ast_data_batch(snapshot, [(f'new{i}.py', {'functions': [f'new{i}']})])
+        # Committed batches stay out of sight until the snapshot is published
+        self.assertEqual(list(retrieve_ast_data(repo_id)), ['old.py'])
+        publish_snapshot(repo_id, snapshot)
+        self.assertEqual(sorted(retrieve_ast_data(repo_id)), ['new0.py', 'new1.py', 'new2.py'])
+        with get_pool().connection() as conn:
+            self.assertEqual(conn.execute('SELECT path FROM files WHERE repo_id = ?', (repo_id,)).fetchall(),
+                             [('new0.py',), ('new1.py',), ('new2.py',)])
+
+        snapshot = begin_snapshot(repo_id)
+        store_ast_data_batch(snapshot, [('abandoned.py', {})])
+        discard_snapshot(snapshot)
+        self.assertEqual(retrieve_ast_data(snapshot), {})
+        self.assertEqual(len(retrieve_ast_data(repo_id)), 3)
+
+    def test_contents_are_stored_once_across_repositories_and_revisions(self):
+        repo_id = store_repository_metadata('dedup/repo', {'stars': 1})
+        self.assertEqual(store_repository_metadata('dedup/repo', {'stars': 2}), repo_id)
+        self.assertEqual(retrieve_repository_metadata('dedup/repo'), {'stars': 2})
+        fork_id = store_repository_metadata('dedup/fork', {})
+
+        content = 'def shared():\n    return "é"\n' * 50
+        for target in (repo_id, fork_id):
+            with ast_data_writer(target) as writer:
+                writer.clear()
+                writer.store_many([('lib/shared.py', {'functions': ['shared'], 'content': content})])
+        first = record_revision(repo_id, 'c1', '')
+        self.assertEqual(record_revision(repo_id, 'c1', ''), first)
+
+        with ast_data_writer(repo_id) as writer:
+            writer.delete_many(['lib/shared.py'])
+            writer.store_many([('lib/shared.py', {'functions': ['shared'], 'content': content + '# changed\n'})])
+        second = record_revision(repo_id, 'c2', '')
+
+        self.assertEqual(retrieve_ast_data(fork_id)['lib/shared.py']['content'], content)
+        self.assertNotIn('content', retrieve_ast_data(fork_id, include_content=False)['lib/shared.py'])
+        self.assertEqual([revision['commit_sha'] for revision in list_revisions(repo_id)], ['c1', 'c2'])
+        old_hash = retrieve_revision_files(first)['lib/shared.py']
+        self.assertEqual(retrieve_blob(old_hash).decode('utf-8'), content)
+        with get_pool().connection() as conn:
+            stored = conn.execute('SELECT size, LENGTH(data) FROM blobs WHERE hash = ?', (old_hash,)).fetchone()
+        self.assertLess(stored[1], stored[0])
+
+    def test_artifacts_are_kept_per_revision(self):
+        repo_id = store_repository_metadata('artifacts/repo', {})
+        other_id = store_repository_metadata('artifacts/other', {})
+        revisions = []
+        for commit_sha in ('c1', 'c2', 'c3'):
+            with ast_data_writer(repo_id) as writer:
+                writer.clear()
+                writer.store_many([('main.py', {'content': commit_sha})])
+            revisions.append(record_revision(repo_id, commit_sha, ''))
+        self.assertEqual(retrieve_latest_revision(repo_id), revisions[-1])
+        self.assertIsNone(retrieve_latest_revision(other_id))
+
+        with patch('api.data_storage.ARTIFACT_REVISIONS', 2):
+            for revision_id in revisions:
+                store_artifact(repo_id, revision_id, 'graph', f'graph of {revision_id}'.encode())
+        store_artifact(other_id, 1, 'graph', b'other graph')
+
+        self.assertEqual(retrieve_artifact(repo_id, 'graph'), f'graph of {revisions[-1]}'.encode())
+        self.assertEqual(retrieve_artifact(repo_id, 'graph', revisions[1]), f'graph of {revisions[1]}'.encode())
+        self.assertEqual(retrieve_artifact(other_id, 'graph'), b'other graph')
+        self.assertIsNone(retrieve_artifact(repo_id, 'vector_index'))
+        # Only the newest two revisions keep theirs, and the pruned blob is gone
+        self.assertIsNone(retrieve_artifact(repo_id, 'graph', revisions[0]))
+        with get_pool().connection() as conn:
+            self.assertIsNone(conn.execute('SELECT 1 FROM blobs WHERE data = ?',
+                                           (f'graph of {revisions[0]}'.encode(),)).fetchone())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,46 @@
+import time
+import unittest
+from backend.api.directory_tree import DirectoryTree
+from backend.api.graph_generator import create_dependency_graph
+
+AST_DATA = {
+    'README.md': {'type': 'non-code', 'name': 'README.md', 'size': 10},
+    'app/main.py': {'functions': ['main'], 'classes': [], 'imports': ['app.core.models.User', 'os']},
+    'app/core/models.py': {'functions': [], 'classes': ['User', 'Team'], 'imports': []},
+    'app/core/db/session.py': {'functions': ['connect', 'close'], 'classes': [], 'imports': ['sqlite3']},
+    'tools/seed.py': {'functions': ['seed'], 'classes': [], 'imports': ['app.core.models.Team', 'app.main']},
+}
+
+class TestDirectoryTree(unittest.TestCase):
+
+    def test_counts(self):
+        graph = create_dependency_graph(AST_DATA)
+        tree = DirectoryTree.build(AST_DATA, graph)
+
+        self.assertEqual(sorted(tree.directories()), ['app', 'app/core', 'app/core/db', 'tools'])
+        self.assertEqual(list(tree.files_under('app/core')), ['app/core/models.py', 'app/core/db/session.py'])
+        self.assertEqual(tree.counts[''], {'files': 5, 'symbols': 6, 'imports_in': 0, 'imports_out': 2})
+        # main.py's import of models stays inside app; seed.py's two come in from tools
+        self.assertEqual(tree.counts['app'], {'files': 3, 'symbols': 5, 'imports_in': 2, 'imports_out': 2})
+        self.assertEqual(tree.counts['app/core'], {'files': 2, 'symbols': 4, 'imports_in': 2, 'imports_out': 1})
+        self.assertEqual(tree.counts['tools']['imports_out'], 2)
+
+        summary = tree.summary('app/')
+        self.assertEqual((summary['files'], [child['name'] for child in summary['directories']]),
+                         (['main.py'], ['core']))
+        self.assertEqual(graph.nodes['app/core']['symbol_count'], 4)
+        self.assertTrue(graph.has_edge('app/core', 'app/core/db'))
+        self.assertEqual(DirectoryTree.loads(tree.dumps()).summary('app'), summary)
+
+    def test_deep_trees_build_in_linear_time(self):
+        # A single 2000-deep chain plus many wide directories
+        ast_data = {'/'.join(f'd{level}' for level in range(2000)) + '/leaf.py': {}}
+        ast_data.update({f'wide/dir{i}/file{j}.py': {} for i in range(2000) for j in range(5)})
+        start = time.perf_counter()
+        tree = DirectoryTree.build(ast_data)
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual(tree.counts['']['files'], 10001)
+        self.assertEqual(len(tree.directories()), 4001)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import threading
+import unittest
+from backend.api.file_filter import PathFilter, walk_directory
+
+class TestPathFilter(unittest.TestCase):
+
+    def test_gitignore_gitattributes_and_project_rules(self):
+        path_filter = PathFilter(max_bytes=100)
+        path_filter.load('.gitignore', "build/\n*.log\n!keep.log\n/docs/_site\n")
+        path_filter.load('web/.gitignore', "dist\n")
+        path_filter.load('.gitattributes', "*.pb.go linguist-generated=true\n"
+                                           "third_party/** linguist-vendored\n"
+                                           "third_party/ours/** -linguist-vendored\n")
+        path_filter.load('.visdepignore', "examples/\n")
+
+        expected = {
+            'src/build/out.py': 'ignored',
+            'build': None,  # a file, and `build/` only matches directories
+            'debug.log': 'ignored',
+            'keep.log': None,
+            'docs/_site/index.html': 'ignored',
+            'src/docs/_site/index.html': None,
+            'web/dist/app.js': 'ignored',
+            'dist/app.js': None,
+            'api/service.pb.go': 'generated',
+            'third_party/zlib/inflate.c': 'vendored',
+            'third_party/ours/patch.c': None,
+            'examples/demo.py': 'ignored',
+            'web/node_modules/react/index.js': 'ignored',
+            'static/app.min.js': 'ignored',
+            'assets/logo.PNG': 'binary',
+            'src/main.py': None,
+        }
+        for path, reason in expected.items():
+            self.assertEqual(path_filter.excluded(path, 10), reason, path)
+        self.assertEqual(path_filter.excluded('src/main.py', 101), 'too large')
+        self.assertEqual(path_filter.content_excluded(b'\x89PNG\0\0'), 'binary')
+
+    def test_walk_directory_prunes_ignored_directories(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = {
+                '.gitignore': 'generated/\n',
+                'app.py': 'print(1)\n',
+                'generated/schema.py': 'x = 1\n',
+                'node_modules/pkg/index.js': 'module.exports = 1\n',
+                'lib/util.py': 'y = 2\n',
+            }
+            for path, content in files.items():
+                os.makedirs(os.path.join(directory, os.path.dirname(path)), exist_ok=True)
+                with open(os.path.join(directory, path), 'w') as f:
+                    f.write(content)
+
+            path_filter = PathFilter()
+            walked = [relative_path for relative_path, _, _ in walk_directory(directory, path_filter)]
+
+        self.assertEqual(walked, ['.gitignore', 'app.py', 'lib/util.py'])
+        self.assertEqual(path_filter.skipped['ignored'], 2)
+
+    def test_loading_while_matching(self):
+        path_filter = PathFilter()
+        errors = []
+
+        def match():
+            try:
+                for i in range(2000):
+                    path_filter.accepts(f'pkg{i % 50}/mod{i}.py', 10)
+                    path_filter.accepts_directory(f'pkg{i % 50}')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=match) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for i in range(50):
+            path_filter.load(f'pkg{i}/.gitignore', f"mod{i}.py\n*.tmp\n")
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(path_filter.excluded('pkg7/mod7.py'), 'ignored')
+        self.assertIsNone(path_filter.excluded('pkg7/mod8.py'))
+        self.assertEqual(sum(path_filter.skipped.values()), path_filter.skipped['ignored'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from backend.api.ast_parser import parse_code_source
+from backend.api.file_record import FileRecordSet
+from backend.api.graph_generator import collect_definitions
+
+class TestFileRecord(unittest.TestCase):
+
+    def setUp(self):
+        self.source = 'import os\n\nclass Job:\n    def run(self):\n        pass\n'
+        self.info = dict(parse_code_source('jobs/job.py', self.source), content=self.source)
+
+    def test_record_reads_like_the_parse_result_without_content(self):
+        records = FileRecordSet()
+        record = records.add('jobs/job.py', self.info)
+        records.add('jobs/other.py', {'functions': ['run'], 'imports': ['os'], 'size': 3})
+
+        expected = {key: value for key, value in self.info.items() if key != 'content'}
+        self.assertEqual(record.to_info(), expected)
+        self.assertNotIn('content', record)
+        self.assertEqual(record.get('symbols')[1]['qualified_name'], 'Job.run')
+        self.assertEqual(records['jobs/other.py']['size'], 3)
+        # Names repeated across files are stored once
+        self.assertEqual(records.table.strings.count('run'), 1)
+        self.assertEqual(collect_definitions(records)[1], {'Job': 'jobs/job.py', 'run': 'jobs/other.py'})
+
+    def test_compact_round_trip(self):
+        records = FileRecordSet(meta={'repo_id': 7})
+        records.add('jobs/job.py', self.info)
+        records.add('index.html', {'tags': ['html', 'body', 'div', 'div']})
+        copy = records.copy()
+        copy.discard('index.html')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'records.json')
+            records.dump(path)
+            loaded = FileRecordSet.load(path)
+
+        self.assertEqual(loaded.meta, {'repo_id': 7})
+        self.assertEqual({file_path: record.to_info() for file_path, record in loaded.items()},
+                         {file_path: record.to_info() for file_path, record in records.items()})
+        self.assertEqual(list(copy), ['jobs/job.py'])
+        self.assertEqual(len(records), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,23 +1,73 @@
+import io
+import os
+import json
+import base64
+import asyncio
+import tarfile
 import unittest
-from unittest.mock import patch
-from backend.api.github_api import fetch_repo_content, fetch_repo_metadata
+from functools import partial
+from unittest.mock import MagicMock, patch
+import tempfile
+import httpx
+from backend.api.blob_cache import BlobCache, ETagCache, git_blob_sha
+from backend.api.github_api import (
+    fetch_repo_content, fetch_repo_metadata, fetch_repo_archive, fetch_repo_tree, fetch_file_text, RateLimitScheduler
+)
+from backend.api import ingestion
+from backend.api.data_storage import initialize_database
+from backend.tests.mock_github import MockGitHubServer
 
 class TestGitHubAPI(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.blob_cache = BlobCache(self.cache_dir.name + '/blobs')
+        etag_cache = ETagCache(self.cache_dir.name + '/etags')
+        self.scheduler = RateLimitScheduler(rate=1000, burst=1000, max_retries=1, backoff=0.01)
+        for target, value in [('get_blob_cache', self.blob_cache), ('get_etag_cache', etag_cache),
+                              ('get_scheduler', self.scheduler)]:
+            patcher = patch(f'backend.api.github_api.{target}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch('backend.api.github_api.CHECKPOINT_DIR', self.cache_dir.name + '/checkpoints')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
     
     @patch('backend.api.github_api.requests.get')
     def test_fetch_repo_content(self, mock_get):
-        mock_response = {
-            'path': 'test_file.py',
-            'content': 'aGVsbG8gd29ybGQ='  # Base64 encoded 'hello world'
+        api = 'https://api.github.com/repos/test/repo'
+        bodies = {
+            f'{api}/commits/HEAD': 'c1',
+            f'{api}/contents?ref=c1': [
+                {'type': 'file', 'path': 'test_file.py', 'sha': 's1', 'size': 11, 'url': f'{api}/contents/test_file.py'},
+            ],
+            f'{api}/contents/test_file.py?ref=c1': {
+                'path': 'test_file.py',
+                'sha': 's1',
+                'content': 'aGVsbG8gd29ybGQ='  # Base64 encoded 'hello world'
+            },
         }
-        mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = [mock_response]
+
+        def respond(url, headers=None, **kwargs):
+            response = MagicMock(status_code=200, headers={})
+            response.json.return_value = bodies[url]
+            response.text = bodies[url] if isinstance(bodies[url], str) else ''
+            return response
+
+        mock_get.side_effect = respond
         
         repo_url = 'https://github.com/test/repo'
         auth_token = 'fake_token'
-        content = fetch_repo_content(repo_url, auth_token)
+        with patch('backend.api.github_api.GITHUB_API_URL', 'https://api.github.com'):
+            content = fetch_repo_content(repo_url, auth_token)
         
-        self.assertEqual(content, [mock_response])
+        self.assertEqual(content, [{'path': 'test_file.py', 'sha': 's1', 'content': 'hello world'}])
+        # Every listing and file is read at the resolved commit
+        self.assertEqual([call.args[0] for call in mock_get.call_args_list], list(bodies))
+        self.assertEqual(self.blob_cache.get('s1'), b'hello world')
     
     @patch('backend.api.github_api.requests.get')
     def test_fetch_repo_metadata(self, mock_get):
@@ -34,5 +84,246 @@ class TestGitHubAPI(unittest.TestCase):
         
         self.assertEqual(metadata, mock_response)
 
+    @patch('backend.api.github_api.requests.get')
+    def test_fetch_repo_archive(self, mock_get):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+            for name, data in [('test-repo-abc123/src/app.py', b'print("hi")'),
+                               ('test-repo-abc123/docs/readme.md', b'# docs')]:
+                member = tarfile.TarInfo(name)
+                member.size = len(data)
+                archive.addfile(member, io.BytesIO(data))
+        buffer.seek(0)
+
+        mock_get.return_value.__enter__.return_value = mock_get.return_value
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.raw = buffer
+
+        content = fetch_repo_archive('https://github.com/test/repo', 'fake_token', sub_directory='src')
+
+        sha = git_blob_sha(b'print("hi")')
+        self.assertEqual(content, [{'path': 'src/app.py', 'sha': sha, 'content': 'print("hi")'}])
+        self.assertIn(sha, self.blob_cache)
+        self.assertTrue(mock_get.call_args[0][0].endswith('/repos/test/repo/tarball'))
+
+    def test_fetch_repo_tree(self):
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            path = request.url.path
+            if path == '/repos/test/repo':
+                if request.headers.get('If-None-Match') == '"meta"':
+                    return httpx.Response(304)
+                return httpx.Response(200, json={'full_name': 'test/repo'}, headers={'ETag': '"meta"'})
+            if path == '/repos/test/repo/git/trees/HEAD':
+                if request.headers.get('If-None-Match') == '"tree"':
+                    return httpx.Response(304)
+                return httpx.Response(200, headers={'ETag': '"tree"'}, json={'truncated': False, 'tree': [
+                    {'path': 'src', 'type': 'tree', 'sha': 't1'},
+                    {'path': 'src/app.py', 'type': 'blob', 'sha': 'b1'},
+                    {'path': 'README.md', 'type': 'blob', 'sha': 'b2'},
+                ]})
+            if path == '/repos/test/repo/git/blobs/b1':
+                return httpx.Response(200, content=b'print("hi")')
+            return httpx.Response(404)
+
+        client = partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+        with patch('backend.api.github_api.httpx.AsyncClient', client):
+            content, metadata, stats = asyncio.run(
+                fetch_repo_tree('https://github.com/test/repo', 'fake_token', sub_directory='src', concurrency=4))
+
+            self.assertEqual(content, [{'path': 'src/app.py', 'sha': 'b1', 'content': 'print("hi")'}])
+            self.assertEqual(metadata, {'full_name': 'test/repo'})
+            self.assertEqual(stats.as_dict()['requests'], 3)
+            self.assertIn('blobs', stats.as_dict()['stages'])
+
+            # Re-fetching an unchanged repo only revalidates the tree and metadata
+            requests_seen.clear()
+            content, metadata, stats = asyncio.run(
+                fetch_repo_tree('https://github.com/test/repo', 'fake_token', sub_directory='src', concurrency=4))
+
+        self.assertEqual(content, [{'path': 'src/app.py', 'sha': 'b1', 'content': 'print("hi")'}])
+        self.assertEqual(metadata, {'full_name': 'test/repo'})
+        self.assertEqual(len(requests_seen), 2)
+        self.assertEqual(stats.as_dict()['not_modified'], 2)
+        self.assertEqual(stats.as_dict()['cache_hits'], 1)
+
+    def test_filtered_blobs_are_never_requested(self):
+        routes = {
+            '/repos/test/repo': {'full_name': 'test/repo'},
+            '/repos/test/repo/git/trees/HEAD?recursive=1': {'truncated': False, 'tree': [
+                {'path': '.gitignore', 'type': 'blob', 'sha': 'g1', 'size': 7},
+                {'path': 'app.py', 'type': 'blob', 'sha': 'b1', 'size': 9},
+                {'path': 'out/bundle.js', 'type': 'blob', 'sha': 'b2', 'size': 9},
+                {'path': 'node_modules/pkg/index.js', 'type': 'blob', 'sha': 'b3', 'size': 9},
+                {'path': 'data.json', 'type': 'blob', 'sha': 'b4', 'size': 50 * 1024 * 1024},
+            ]},
+            '/repos/test/repo/git/blobs/g1': b'/out/\n',
+            '/repos/test/repo/git/blobs/b1': b'import os',
+        }
+        with MockGitHubServer(routes) as server:
+            content, _, stats = asyncio.run(fetch_repo_tree('https://github.com/test/repo', 'fake_token'))
+
+        self.assertEqual(sorted(record['path'] for record in content), ['.gitignore', 'app.py'])
+        self.assertEqual(sorted(path for path in server.requests if '/git/blobs/' in path),
+                         ['/repos/test/repo/git/blobs/b1', '/repos/test/repo/git/blobs/g1'])
+        self.assertEqual(stats.as_dict()['skipped'], {'ignored': 2, 'too large': 1})
+
+    def test_rate_limited_requests_are_retried(self):
+        blob_path = '/repos/test/repo/git/blobs/b1'
+        routes = {
+            '/repos/test/repo': {'full_name': 'test/repo'},
+            '/repos/test/repo/git/trees/HEAD?recursive=1': {'truncated': False, 'tree': [
+                {'path': 'app.py', 'type': 'blob', 'sha': 'b1'},
+            ]},
+            blob_path: b'print("hi")',
+        }
+        failures = {blob_path: [(403, {'X-RateLimit-Remaining': '0', 'Retry-After': '0'})]}
+
+        with MockGitHubServer(routes, failures) as server:
+            content, _, stats = asyncio.run(fetch_repo_tree('https://github.com/test/repo', 'fake_token'))
+
+        self.assertEqual(content, [{'path': 'app.py', 'sha': 'b1', 'content': 'print("hi")'}])
+        self.assertEqual(server.count(blob_path), 2)
+        self.assertEqual(self.scheduler.retries, 1)
+
+    def test_interrupted_contents_fetch_resumes(self):
+        routes = {'/repos/test/repo/commits/HEAD': b'c1'}
+        failing_path = '/repos/test/repo/contents/src/b.py?ref=c1'
+        failures = {failing_path: [(502, {}), (502, {})]}
+
+        with MockGitHubServer(routes, failures) as server:
+            routes.update({
+                '/repos/test/repo/contents?ref=c1': [
+                    {'type': 'file', 'path': 'a.py', 'sha': 'sa', 'url': f'{server.url}/repos/test/repo/contents/a.py'},
+                    {'type': 'dir', 'path': 'src', 'sha': 'sd', 'url': f'{server.url}/repos/test/repo/contents/src'},
+                ],
+                '/repos/test/repo/contents/src?ref=c1': [
+                    {'type': 'file', 'path': 'src/b.py', 'sha': 'sb', 'url': f'{server.url}{failing_path}'},
+                ],
+                '/repos/test/repo/contents/a.py?ref=c1': {'path': 'a.py', 'sha': 'sa', 'content': 'YSA9IDE='},
+                failing_path: {'path': 'src/b.py', 'sha': 'sb', 'content': 'YiA9IDI='},
+            })
+
+            with self.assertRaises(RuntimeError):
+                fetch_repo_content('https://github.com/test/repo', 'fake_token')
+            content = fetch_repo_content('https://github.com/test/repo', 'fake_token')
+
+            # A checkpoint left by another commit is not reused
+            routes.update({
+                '/repos/test/repo/commits/HEAD': b'c2',
+                '/repos/test/repo/contents?ref=c2': [
+                    {'type': 'file', 'path': 'a.py', 'sha': 'sa', 'url': f'{server.url}/repos/test/repo/contents/a.py'},
+                ],
+            })
+            with self.assertRaises(RuntimeError):
+                fetch_repo_content('https://github.com/test/repo', 'fake_token', ref='missing')
+            self.assertEqual([file['path'] for file in fetch_repo_content('https://github.com/test/repo',
+                                                                          'fake_token')], ['a.py'])
+
+        self.assertEqual([(file['path'], file['content']) for file in content],
+                         [('a.py', 'a = 1'), ('src/b.py', 'b = 2')])
+        # Listings and a.py were checkpointed by the failed run
+        self.assertEqual(server.count('/repos/test/repo/contents?ref=c1'), 1)
+        self.assertEqual(server.count('/repos/test/repo/contents/src?ref=c1'), 1)
+        self.assertEqual(server.count('/repos/test/repo/contents/a.py?ref=c1'), 1)
+        self.assertEqual(server.count(failing_path), 3)
+        self.assertEqual(server.count('/repos/test/repo/contents?ref=c2'), 1)
+
+    def test_killed_contents_fetch_resumes(self):
+        routes = {'/repos/test/repo/commits/HEAD': b'c1'}
+        request = self.scheduler.request
+
+        def killed_at_b(url, *args, **kwargs):
+            if 'src/b.py' in url:
+                raise KeyboardInterrupt()
+            return request(url, *args, **kwargs)
+
+        with MockGitHubServer(routes) as server:
+            routes.update({
+                '/repos/test/repo/contents?ref=c1': [
+                    {'type': 'dir', 'path': 'src', 'sha': 'sd', 'url': f'{server.url}/repos/test/repo/contents/src'},
+                ],
+                '/repos/test/repo/contents/src?ref=c1': [
+                    {'type': 'file', 'path': 'src/b.py', 'sha': 'sb',
+                     'url': f'{server.url}/repos/test/repo/contents/src/b.py'},
+                ],
+                '/repos/test/repo/contents/src/b.py?ref=c1': {'path': 'src/b.py', 'sha': 'sb', 'content': 'YiA9IDI='},
+            })
+            with patch('backend.api.github_api.CHECKPOINT_INTERVAL', 0):
+                # Nothing is caught on the way out, as when the process is killed
+                with patch.object(self.scheduler, 'request', killed_at_b), self.assertRaises(KeyboardInterrupt):
+                    fetch_repo_content('https://github.com/test/repo', 'fake_token')
+                content = fetch_repo_content('https://github.com/test/repo', 'fake_token')
+
+        self.assertEqual([(file['path'], file['content']) for file in content], [('src/b.py', 'b = 2')])
+        self.assertEqual(server.count('/repos/test/repo/contents?ref=c1'), 1)
+        self.assertEqual(server.count('/repos/test/repo/contents/src?ref=c1'), 1)
+
+    def test_compile_database_is_loaded_before_parsing(self):
+        cwd = os.getcwd()
+        os.chdir(self.cache_dir.name)
+        self.addCleanup(os.chdir, cwd)
+        initialize_database()
+
+        commands = [{'directory': '/build', 'command': 'c++ -DFROM_DATABASE -c src/a.cpp', 'file': 'src/a.cpp'}]
+        encoded = base64.b64encode(json.dumps(commands).encode('utf-8')).decode('ascii')
+        routes = {
+            '/repos/test/repo': {'full_name': 'test/repo'},
+            '/repos/test/repo/commits/HEAD': b'c1',
+            '/repos/test/repo/git/trees/c1?recursive=1': {'truncated': False, 'tree': [
+                {'path': 'src/a.cpp', 'type': 'blob', 'sha': 'a1'},
+                {'path': 'compile_commands.json', 'type': 'blob', 'sha': 'cc'},
+            ]},
+            '/repos/test/repo/git/blobs/a1': b'int a() { return 1; }\n',
+            '/repos/test/repo/git/blobs/cc': json.dumps(commands).encode('utf-8'),
+            '/repos/test/repo/contents/compile_commands.json?ref=c1': {'type': 'file', 'sha': 'cc', 'content': encoded},
+        }
+        seen = []
+        parse = ingestion.parse_code_to_ast
+
+        def record_database(repo_content, *args, compile_database=None, **kwargs):
+            seen.append(compile_database)
+            return parse(repo_content, *args, compile_database=compile_database, **kwargs)
+
+        with MockGitHubServer(routes) as server, patch('backend.api.ingestion.parse_code_to_ast', record_database):
+            self.assertIsNone(fetch_file_text('https://github.com/test/repo', 'fake_token', 'missing.json', 'c1'))
+            result = asyncio.run(ingestion.ingest_repo('https://github.com/test/repo', 'fake_token'))
+            self.assertEqual(result['mode'], 'full')
+
+            routes.update({
+                '/repos/test/repo/commits/HEAD': b'c2',
+                '/repos/test/repo/compare/c1...c2': {'status': 'ahead', 'files': [
+                    {'filename': 'src/a.cpp', 'status': 'modified', 'sha': 'a2'},
+                ]},
+                '/repos/test/repo/git/blobs/a2': b'int a() { return 2; }\n',
+                '/repos/test/repo/contents/compile_commands.json?ref=c2': {'type': 'file', 'sha': 'cc',
+                                                                          'content': encoded},
+            })
+            result = asyncio.run(ingestion.ingest_repo('https://github.com/test/repo', 'fake_token'))
+            self.assertEqual(result['mode'], 'incremental')
+
+        self.assertGreaterEqual(len(seen), 2)
+        self.assertTrue(all(database is not None and database.flags_for('src/a.cpp') == ['-DFROM_DATABASE']
+                            for database in seen))
+        self.assertEqual(server.count('/repos/test/repo/contents/build/compile_commands.json?ref=c1'), 0)
+
+class TestRateLimitScheduler(unittest.TestCase):
+
+    def test_retry_delay(self):
+        scheduler = RateLimitScheduler(rate=1000, burst=1000, max_retries=2)
+        self.assertIsNone(scheduler.retry_delay(200, {'X-RateLimit-Remaining': '10'}, 0))
+        self.assertEqual(scheduler.retry_delay(403, {'Retry-After': '3'}, 0), 3)
+        self.assertIsNone(scheduler.retry_delay(404, {}, 0))
+        self.assertIsNone(scheduler.retry_delay(502, {}, 2))  # retries exhausted
+        self.assertGreater(scheduler.reserve(), 2)  # blocked until Retry-After elapses
+
+    def test_token_bucket_paces_requests(self):
+        scheduler = RateLimitScheduler(rate=10, burst=2)
+        self.assertEqual(scheduler.reserve(), 0.0)
+        self.assertEqual(scheduler.reserve(), 0.0)
+        self.assertAlmostEqual(scheduler.reserve(), 0.1, places=2)
+
 if __name__ == '__main__':
     unittest.main()
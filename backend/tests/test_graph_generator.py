@@ -1,6 +1,6 @@
 import json
 import networkx as nx
-from backend.api.graph_generator import create_dependency_graph, save_graph_as_json, load_graph_from_json
+from backend.api.graph_generator import create_dependency_graph, update_dependency_graph, save_graph_as_json, load_graph_from_json
 
 def test_create_dependency_graph():
     ast_data = {
@@ -29,3 +29,22 @@ def test_save_and_load_graph():
     loaded_graph = load_graph_from_json("test_graph.json")
     
     assert nx.is_isomorphic(graph, loaded_graph)
+
+def test_update_dependency_graph_matches_rebuild():
+    previous = {
+        "pkg/models.py": {"functions": [], "classes": ["User"], "imports": []},
+        "pkg/views.py": {"functions": ["index"], "classes": [], "imports": ["pkg.models.User", "os"]},
+        "pkg/old.py": {"functions": ["legacy"], "classes": [], "imports": ["json"]},
+    }
+    current = {
+        "pkg/models.py": {"functions": [], "classes": ["User", "Team"], "imports": []},
+        "pkg/views.py": {"functions": ["index"], "classes": [], "imports": ["pkg.models.User", "os"]},
+        "pkg/api/routes.py": {"functions": ["route"], "classes": [], "imports": ["pkg.models.Team"]},
+    }
+    graph = update_dependency_graph(create_dependency_graph(previous), current, previous,
+                                    changed_paths={"pkg/models.py", "pkg/api/routes.py"},
+                                    removed_paths={"pkg/old.py"})
+    rebuilt = create_dependency_graph(current)
+
+    assert set(graph.nodes) == set(rebuilt.nodes)
+    assert set(graph.edges) == set(rebuilt.edges)
@@ -0,0 +1,90 @@
+import time
+import unittest
+import networkx as nx
+from backend.api.graph_generator import create_dependency_graph, update_dependency_graph
+from backend.api.graph_layout import LAYOUT_SIZE, apply_layout, compute_layout, update_layout
+
+def tree_with_imports(size, seed=7):
+    G = nx.random_tree(size, seed=seed) if hasattr(nx, 'random_tree') else nx.random_labeled_tree(size, seed=seed)
+    G = nx.DiGraph(G)
+    G.add_edges_from((i, (i * 7919) % size) for i in range(0, size, 5))
+    return G
+
+class TestGraphLayout(unittest.TestCase):
+
+    def test_force_layout_is_seeded_and_normalized(self):
+        G = tree_with_imports(600)
+        first = compute_layout(G, 'force', seed=3)
+        self.assertEqual(first, compute_layout(G.copy(), 'force', seed=3))
+        self.assertNotEqual(first, compute_layout(G, 'force', seed=4))
+
+        xs, ys = zip(*first.values())
+        self.assertEqual((min(xs), max(xs), min(ys), max(ys)), (0.0, LAYOUT_SIZE, 0.0, LAYOUT_SIZE))
+        # Neighbours end up much closer than nodes in general
+        distance = lambda u, v: ((first[u][0] - first[v][0]) ** 2 + (first[u][1] - first[v][1]) ** 2) ** 0.5
+        edge_mean = sum(distance(u, v) for u, v in G.edges) / G.number_of_edges()
+        nodes = list(G)
+        pair_mean = sum(distance(nodes[i], nodes[-i - 1]) for i in range(300)) / 300
+        self.assertLess(edge_mean, pair_mean / 3)
+
+    def test_hierarchical_rows_follow_level(self):
+        G = nx.DiGraph([('app', 'app/a.py'), ('app', 'app/b.py'), ('app/a.py', 'app/a.py::f'), ('lib', 'lib/c.py')])
+        for node in G:
+            G.nodes[node]['level'] = node.count('/') + node.count('::')
+        apply_layout(G, 'hierarchical')
+        rows = {}
+        for node, data in G.nodes(data=True):
+            rows.setdefault(data['level'], set()).add(data['y'])
+        self.assertTrue(all(len(ys) == 1 for ys in rows.values()))
+        self.assertLess(rows[0].pop(), rows[1].pop())
+        # A parent's children sit next to each other
+        order = sorted(['app/a.py', 'app/b.py', 'lib/c.py'], key=lambda node: G.nodes[node]['x'])
+        self.assertIn(order.index('lib/c.py'), (0, 2))
+
+        with self.assertRaises(ValueError):
+            compute_layout(G, 'circular')
+
+    def test_large_graphs_lay_out_quickly(self):
+        G = tree_with_imports(20000)
+        start = time.perf_counter()
+        layout = compute_layout(G)
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertEqual(len(layout), 20000)
+
+    def test_updates_only_move_the_changed_neighbourhood(self):
+        G = apply_layout(tree_with_imports(20000))
+        before = {node: (data['x'], data['y']) for node, data in G.nodes(data=True)}
+        G.add_edges_from([('new.py', 10), ('new.py', 11), ('other.py', 'new.py')])
+
+        update_layout(G, changed=[500])
+        moved = {node for node, xy in before.items() if (G.nodes[node]['x'], G.nodes[node]['y']) != xy}
+        neighbourhood = {'new.py', 'other.py', 500, 10, 11, *G.predecessors(500), *G.successors(500)}
+        self.assertTrue(moved <= neighbourhood)
+        self.assertTrue(all(0 <= data[axis] <= LAYOUT_SIZE for _, data in G.nodes(data=True) for axis in 'xy'))
+
+    def test_repeated_updates_stay_within_bounds(self):
+        G = apply_layout(tree_with_imports(3000))
+        for step in range(30):
+            # Leaves hung off nodes on the edge of the picture push outwards
+            edge_node = max(G, key=lambda node: abs(G.nodes[node]['x'] - LAYOUT_SIZE / 2))
+            G.add_edges_from((edge_node, f'new{step}_{i}.py') for i in range(5))
+            update_layout(G, changed=[edge_node])
+        for axis in 'xy':
+            values = [data[axis] for _, data in G.nodes(data=True)]
+            self.assertGreaterEqual(min(values), 0)
+            self.assertLessEqual(max(values), LAYOUT_SIZE)
+
+    def test_graph_updates_keep_untouched_files_in_place(self):
+        ast_data = {f'pkg/mod{i}.py': {'functions': [f'f{i}'], 'classes': [],
+                                      'imports': [f'pkg.mod{i - 1}.f{i - 1}'] if i else []} for i in range(40)}
+        graph = create_dependency_graph(ast_data)
+        before = {node: (graph.nodes[node]['x'], graph.nodes[node]['y']) for node in ast_data}
+
+        current = dict(ast_data)
+        current['pkg/extra.py'] = {'functions': [], 'classes': [], 'imports': ['pkg.mod20.f20']}
+        graph = update_dependency_graph(graph, current, ast_data, {'pkg/extra.py'}, set())
+        self.assertIn('x', graph.nodes['pkg/extra.py'])
+        self.assertEqual((graph.nodes['pkg/mod5.py']['x'], graph.nodes['pkg/mod5.py']['y']), before['pkg/mod5.py'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+from backend.api.directory_tree import DirectoryTree
+from backend.api.graph_generator import create_dependency_graph
+from backend.api.graph_levels import GraphLevels, MORE_NODE, package_root
+
+AST_DATA = {
+    'setup.py': {'functions': [], 'classes': [], 'imports': ['app.main']},
+    'app/main.py': {'functions': ['main'], 'classes': [], 'imports': ['app.core.models.User', 'os.path']},
+    'app/core/models.py': {'functions': [], 'classes': ['User', 'Team'], 'imports': ['os']},
+    'app/core/db/session.py': {'functions': ['connect'], 'classes': [], 'imports': ['app.core.models.Team']},
+    'tools/seed.py': {'functions': ['seed'], 'classes': [], 'imports': ['app.core.models.Team', 'app.main']},
+}
+
+def build_levels(ast_data=AST_DATA):
+    graph = create_dependency_graph(ast_data)
+    return GraphLevels.build(graph, DirectoryTree.build(ast_data, graph), ast_data)
+
+def edge_counts(view):
+    return {(edge['source'], edge['target']): edge['count'] for edge in view['edges']}
+
+class TestGraphLevels(unittest.TestCase):
+
+    def test_levels_collapse_directories(self):
+        levels = build_levels()
+        self.assertEqual((levels.depth(), len(levels.views)), (3, 4))
+
+        top = levels.view(0)
+        nodes = {node['id']: node for node in top['nodes']}
+        self.assertEqual(set(nodes), {'setup.py', 'app', 'tools', 'package:os'})
+        self.assertEqual((nodes['app']['file_count'], nodes['app']['symbol_count']), (3, 4))
+        self.assertTrue(nodes['app']['expandable'])
+        # Both of seed.py's imports and both uses of `os` are aggregated
+        self.assertEqual(edge_counts(top), {('app', 'setup.py'): 1, ('app', 'tools'): 2, ('package:os', 'app'): 2})
+
+        deeper = levels.view(1)
+        self.assertEqual({node['id'] for node in deeper['nodes']},
+                         {'setup.py', 'app/main.py', 'app/core', 'tools/seed.py', 'package:os'})
+        self.assertEqual(edge_counts(deeper)[('app/core', 'app/main.py')], 1)
+
+    def test_expanding_a_supernode(self):
+        levels = build_levels()
+        view = levels.view(0, expand=['app'])
+        self.assertEqual({node['id'] for node in view['nodes']},
+                         {'setup.py', 'app/main.py', 'app/core', 'tools', 'package:os'})
+        # Expanding a directory inside a collapsed one opens everything above it
+        view = levels.view(0, expand=['app/core/db'])
+        self.assertIn('app/core/db/session.py', {node['id'] for node in view['nodes']})
+        self.assertIn(('app/core/models.py', 'app/core/db/session.py'), edge_counts(view))
+        with self.assertRaises(KeyError):
+            levels.view(0, expand=['missing'])
+
+        restored = GraphLevels.loads(levels.dumps())
+        self.assertEqual(restored.view(0, expand=['app']), levels.view(0, expand=['app']))
+        self.assertEqual(restored.view(0), levels.view(0))
+
+    def test_views_stay_bounded(self):
+        ast_data = {f'flat/mod{i}.py': {'functions': [f'f{i}'], 'classes': [],
+                                       'imports': [f'flat.mod{(i + 1) % 50}.f{(i + 1) % 50}', f'lib.part{i}']}
+                    for i in range(50)}
+        with patch('backend.api.graph_levels.LOD_MAX_NODES', 20), patch('backend.api.graph_levels.LOD_MAX_EDGES', 10):
+            levels = build_levels(ast_data)
+            # Level 0 is `flat` and `lib`; opening `flat` gives 50 files and `lib`
+            self.assertEqual(len(levels.views), 1)
+            view = levels.view(0, expand=['flat'])
+        self.assertEqual(len(view['nodes']), 20)
+        self.assertEqual(view['nodes'][-1]['id'], MORE_NODE)
+        self.assertEqual(view['hidden_nodes'], 32)
+        self.assertEqual(len(view['edges']), 10)
+        self.assertGreater(view['hidden_edges'], 0)
+
+    def test_package_root(self):
+        self.assertEqual(package_root('os.path'), 'os')
+        self.assertEqual(package_root('@angular/core/testing'), '@angular/core')
+        self.assertEqual(package_root('react-dom/client'), 'react-dom')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import os
+import asyncio
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+from backend.api.local_source import (
+    resolve_local_path, resolve_commit, list_git_tree, iter_git_blobs, iter_working_tree, diff_git_commits,
+    local_repo_metadata,
+)
+from backend.api.data_storage import initialize_database, retrieve_ast_data, retrieve_latest_ingestion, retrieve_artifact
+from backend.api.file_record import FileRecordSet
+from backend.api.graph_generator import graph_from_json
+from backend.api.ingestion import ingest_local, load_graph, GRAPH_ARTIFACT, RECORDS_ARTIFACT, LEVELS_ARTIFACT
+from backend.api.graph_levels import GraphLevels
+from backend.api.graph_layout import compute_layout
+
+def git(repo_path, *args):
+    return subprocess.run(['git', '-C', repo_path, '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+def write(repo_path, relative_path, content):
+    path = os.path.join(repo_path, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+class TestLocalSource(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmp_dir.name, 'project')
+        os.makedirs(self.repo)
+        git(self.repo, 'init', '-q')
+        write(self.repo, 'pkg/models.py', 'class User:\n    pass\n')
+        write(self.repo, 'pkg/views.py', 'from pkg.models import User\n\ndef index():\n    return User()\n')
+        git(self.repo, 'add', '-A')
+        git(self.repo, 'commit', '-q', '-m', 'initial')
+        self.first_commit = git(self.repo, 'rev-parse', 'HEAD')
+
+        patcher = patch('backend.api.local_source.LOCAL_SOURCE_ROOTS', [self.tmp_dir.name])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_resolve_local_path_is_confined_to_roots(self):
+        self.assertEqual(resolve_local_path(self.repo), os.path.realpath(self.repo))
+        with self.assertRaises(ValueError):
+            resolve_local_path('/etc')
+
+    def test_read_git_objects(self):
+        commit_sha = resolve_commit(self.repo)
+        entries = list_git_tree(self.repo, commit_sha, 'pkg')
+        self.assertEqual([entry['path'] for entry in entries], ['pkg/models.py', 'pkg/views.py'])
+
+        files = list(iter_git_blobs(self.repo, entries))
+        self.assertEqual(files[0]['content'], 'class User:\n    pass\n')
+        self.assertEqual([file['sha'] for file in files], [entry['sha'] for entry in entries])
+        self.assertEqual([file['path'] for file in iter_working_tree(self.repo)], ['pkg/models.py', 'pkg/views.py'])
+
+    def test_working_tree_stays_inside_the_repository(self):
+        outside = os.path.join(self.tmp_dir.name, 'secret.py')
+        write(self.tmp_dir.name, 'secret.py', 'TOKEN = "x"\n')
+        os.symlink(outside, os.path.join(self.repo, 'pkg/leak.py'))
+        os.symlink(os.path.join(self.repo, 'pkg/models.py'), os.path.join(self.repo, 'pkg/alias.py'))
+
+        paths = [file['path'] for file in iter_working_tree(self.repo)]
+        self.assertEqual(paths, ['pkg/alias.py', 'pkg/models.py', 'pkg/views.py'])
+        with self.assertRaises(ValueError):
+            list(iter_working_tree(self.repo, '..'))
+
+    def test_local_names_are_unique_per_path(self):
+        other = os.path.join(self.tmp_dir.name, 'elsewhere', 'project')
+        os.makedirs(other)
+        first, second = local_repo_metadata(self.repo), local_repo_metadata(other)
+        self.assertEqual((first['name'], second['name']), ('project', 'project'))
+        self.assertNotEqual(first['full_name'], second['full_name'])
+        self.assertEqual(local_repo_metadata(self.repo + '/')['full_name'], first['full_name'])
+
+    def test_diff_git_commits(self):
+        write(self.repo, 'pkg/api.py', 'def route():\n    pass\n')
+        os.remove(os.path.join(self.repo, 'pkg/views.py'))
+        git(self.repo, 'add', '-A')
+        git(self.repo, 'commit', '-q', '-m', 'second')
+
+        files = diff_git_commits(self.repo, self.first_commit, resolve_commit(self.repo))
+        self.assertEqual(sorted((file['filename'], file['status']) for file in files),
+                         [('pkg/api.py', 'added'), ('pkg/views.py', 'removed')])
+        self.assertIsNone(diff_git_commits(self.repo, resolve_commit(self.repo), self.first_commit))
+
+    def test_ingest_local_full_then_incremental(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        self.addCleanup(os.chdir, cwd)
+        initialize_database()
+
+        result = asyncio.run(ingest_local(self.repo))
+        self.assertEqual((result['mode'], result['changed']), ('full', 2))
+        first_revision = result['revision_id']
+
+        write(self.repo, 'pkg/models.py', 'class User:\n    pass\n\nclass Team:\n    pass\n')
+        git(self.repo, 'commit', '-q', '-am', 'add team')
+
+        result = asyncio.run(ingest_local(self.repo))
+        self.assertEqual((result['mode'], result['changed'], result['removed']), ('incremental', 1, 0))
+        repo_id = retrieve_latest_ingestion(local_repo_metadata(self.repo)['full_name'])['repo_id']
+        self.assertEqual(result['repo_id'], repo_id)
+        self.assertEqual(retrieve_ast_data(repo_id)['pkg/models.py']['classes'], ['User', 'Team'])
+        self.assertIn('class Team', retrieve_ast_data(repo_id)['pkg/models.py']['content'])
+        records = FileRecordSet.loads(retrieve_artifact(repo_id, RECORDS_ARTIFACT))
+        self.assertEqual(records['pkg/models.py']['classes'], ['User', 'Team'])
+        levels = GraphLevels.loads(retrieve_artifact(repo_id, LEVELS_ARTIFACT))
+        self.assertIn('pkg', {node['id'] for node in levels.view(0)['nodes']})
+        # The first revision's graph is still there next to the new one
+        graphs = [graph_from_json(retrieve_artifact(repo_id, GRAPH_ARTIFACT, revision).decode('utf-8'))
+                  for revision in (first_revision, result['revision_id'])]
+        self.assertEqual([graph.graph['revision_id'] for graph in graphs], [first_revision, result['revision_id']])
+
+        result = asyncio.run(ingest_local(self.repo))
+        self.assertEqual((result['mode'], result['revision_id']), ('unchanged', records.meta['revision_id']))
+
+        # Another layout mode is computed once per revision, then read back
+        with patch('backend.api.ingestion.compute_layout', wraps=compute_layout) as layout:
+            first = load_graph(repo_id, layout='hierarchical')
+            second = load_graph(repo_id, result['revision_id'], layout='hierarchical')
+        self.assertEqual(layout.call_count, 1)
+        positions = lambda graph: {node: (data['x'], data['y']) for node, data in graph.nodes(data=True)}
+        self.assertEqual(positions(first), positions(second))
+        self.assertNotEqual(positions(first), positions(load_graph(repo_id)))
+
+    def test_sub_directory_ingestions_coexist(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        self.addCleanup(os.chdir, cwd)
+        initialize_database()
+        write(self.repo, 'tools/seed.py', 'def seed():\n    pass\n')
+        git(self.repo, 'add', '-A')
+        git(self.repo, 'commit', '-q', '-m', 'tools')
+
+        tools = asyncio.run(ingest_local(self.repo, 'tools'))
+        pkg = asyncio.run(ingest_local(self.repo, 'pkg'))
+        self.assertNotEqual(tools['repo_id'], pkg['repo_id'])
+        self.assertEqual(list(retrieve_ast_data(tools['repo_id'], include_content=False)), ['tools/seed.py'])
+        self.assertEqual(sorted(retrieve_ast_data(pkg['repo_id'], include_content=False)),
+                         ['pkg/models.py', 'pkg/views.py'])
+        self.assertEqual(asyncio.run(ingest_local(self.repo, 'tools'))['mode'], 'unchanged')
+
+    def test_concurrent_ingestions(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        self.addCleanup(os.chdir, cwd)
+        initialize_database()
+        other = os.path.join(self.tmp_dir.name, 'other')
+        for i in range(100):
+            write(other, f'lib/mod{i}.py', f'import lib.mod{(i + 1) % 100}\n\ndef f{i}():\n    pass\n')
+
+        async def ingest_both():
+            return await asyncio.gather(ingest_local(self.repo), ingest_local(other))
+
+        results = asyncio.run(ingest_both())
+        self.assertEqual([(result['mode'], result['changed']) for result in results], [('full', 2), ('full', 100)])
+        self.assertEqual(len(retrieve_ast_data(results[1]['repo_id'], include_content=False)), 100)
+        self.assertEqual(sorted(retrieve_ast_data(results[0]['repo_id'], include_content=False)),
+                         ['pkg/models.py', 'pkg/views.py'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from backend.api.ast_parser import parse_code_source
+from backend.api.module_resolver import ModuleIndex, extract_js_config_info
+from backend.api.graph_generator import create_dependency_graph, update_dependency_graph
+
+FILES = [
+    'src/shop/__init__.py', 'src/shop/models.py', 'src/shop/views/__init__.py', 'src/shop/views/orders.py',
+    'tests/models.py',
+    'web/tsconfig.json', 'web/src/app.tsx', 'web/src/lib/index.ts', 'web/src/lib/format.ts',
+    'web/src/components/Button.jsx', 'web/src/data.json',
+    'java/com/acme/model/User.java',
+    'native/include/acme/util.h', 'native/src/util.c', 'native/src/local.h',
+]
+
+class TestModuleResolver(unittest.TestCase):
+
+    def setUp(self):
+        config = extract_js_config_info('{\n  // aliases\n  "compilerOptions": {\n    "baseUrl": "src",\n'
+                                        '    "paths": {"@/*": ["components/*"], "lib": ["lib/index.ts"],},\n  },\n}')
+        self.index = ModuleIndex(FILES, {'web/tsconfig.json': config})
+
+    def test_python_modules_packages_and_relative_imports(self):
+        index = self.index
+        self.assertEqual(index.python_import('src/shop/views/orders.py', 'shop.models.Order'),
+                         ('src/shop/models.py', 'Order'))
+        # Shortest match wins over tests/models.py; `__init__` stands for its package
+        self.assertEqual(index.python_module('x.py', 'models'), 'tests/models.py')
+        self.assertEqual(index.python_module('x.py', 'shop.views'), 'src/shop/views/__init__.py')
+        self.assertEqual(index.python_import('src/shop/views/orders.py', '..models.Order'),
+                         ('src/shop/models.py', 'Order'))
+        self.assertEqual(index.python_import('src/shop/models.py', '.views'), ('src/shop/views/__init__.py', None))
+        self.assertEqual(index.python_import('src/shop/models.py', 'os.path'), (None, 'path'))
+        # Suffixes match whole path components only
+        self.assertIsNone(index.python_module('x.py', 'hop.models'))
+
+    def test_javascript_java_and_c(self):
+        index = self.index
+        self.assertEqual(index.javascript_module('web/src/app.tsx', './lib'), 'web/src/lib/index.ts')
+        self.assertEqual(index.javascript_module('web/src/lib/index.ts', './format.js'), 'web/src/lib/format.ts')
+        self.assertEqual(index.javascript_module('web/src/app.tsx', './data.json'), 'web/src/data.json')
+        self.assertEqual(index.javascript_module('web/src/app.tsx', '@/Button'), 'web/src/components/Button.jsx')
+        self.assertEqual(index.javascript_module('web/src/app.tsx', 'lib'), 'web/src/lib/index.ts')
+        self.assertEqual(index.javascript_module('web/src/app.tsx', 'lib/format'), 'web/src/lib/format.ts')
+        self.assertIsNone(index.javascript_module('web/src/app.tsx', 'react'))
+
+        self.assertEqual(index.java_class('com.acme.model.User'), 'java/com/acme/model/User.java')
+        self.assertIsNone(index.java_class('com.acme.model.*'))
+
+        self.assertEqual(index.c_header('native/src/util.c', 'local.h'), 'native/src/local.h')
+        self.assertEqual(index.c_header('native/src/util.c', 'acme/util.h'), 'native/include/acme/util.h')
+        self.assertIsNone(index.c_header('native/src/util.c', 'stdio.h'))
+
+    def test_graph_links_resolved_imports(self):
+        tsconfig = '{"compilerOptions": {"paths": {"@lib/*": ["src/lib/*"]}}}'
+        ast_data = {
+            'pkg/__init__.py': parse_code_source('pkg/__init__.py', ''),
+            'pkg/models.py': parse_code_source('pkg/models.py', 'class User:\n    pass\n'),
+            'pkg/views.py': parse_code_source('pkg/views.py', 'from .models import User\nfrom . import models\n'),
+            'tsconfig.json': parse_code_source('tsconfig.json', tsconfig),
+            'src/lib/format.ts': {'functions': ['format'], 'imports': []},
+            'src/app.ts': {'functions': [], 'imports': ['@lib/format', 'react']},
+        }
+        self.assertEqual(ast_data['pkg/views.py']['imports'], ['.models.User', '.models'])
+        graph = create_dependency_graph(ast_data)
+
+        self.assertTrue(graph.has_edge('pkg/models.py::User', 'pkg/views.py'))
+        self.assertTrue(graph.has_edge('pkg/models.py', 'pkg/views.py'))
+        self.assertTrue(graph.has_edge('src/lib/format.ts', 'src/app.ts'))
+        self.assertEqual(graph.nodes['react']['type'], 'package')
+
+        # Moving the aliased module re-links its importer
+        current = dict(ast_data)
+        current['src/lib/text/format.ts'] = current.pop('src/lib/format.ts')
+        current['tsconfig.json'] = parse_code_source('tsconfig.json', tsconfig.replace('src/lib/*', 'src/lib/text/*'))
+        updated = update_dependency_graph(graph, current, ast_data, {'src/lib/text/format.ts', 'tsconfig.json'},
+                                          {'src/lib/format.ts'})
+        rebuilt = create_dependency_graph(current)
+        self.assertTrue(updated.has_edge('src/lib/text/format.ts', 'src/app.ts'))
+        self.assertEqual(set(updated.edges), set(rebuilt.edges))
+
+if __name__ == '__main__':
+    unittest.main()
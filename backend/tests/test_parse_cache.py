@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from backend.api.parse_cache import ParseCache, content_key
+from backend.api import ast_parser
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'parse_cache.sqlite')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_version_bump_invalidates_only_that_language(self):
+        cache = ParseCache(self.path, {'python': 1, 'go': 1})
+        cache.put('python', content_key('x = 1'), {'functions': ['a']})
+        cache.put('go', content_key('package x'), {'functions': ['b']})
+
+        reopened = ParseCache(self.path, {'python': 2, 'go': 1})
+
+        self.assertIsNone(reopened.get('python', content_key('x = 1')))
+        self.assertEqual(reopened.get('go', content_key('package x')), {'functions': ['b']})
+        self.assertEqual(len(reopened), 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = ParseCache(self.path, {'python': 1}, max_bytes=120)
+        info = {'functions': ['f' * 20]}  # 39 bytes as JSON
+        cache.put('python', 'a', info)
+        cache.put('python', 'b', info)
+        cache.put('python', 'c', info)
+        cache.get('python', 'a')
+
+        cache.put('python', 'd', info)
+
+        self.assertIsNone(cache.get('python', 'b'))
+        self.assertEqual(cache.get('python', 'a'), info)
+        self.assertLessEqual(cache.total_bytes(), 120)
+
+    def test_parse_code_source_reuses_cached_info(self):
+        cache = ParseCache(self.path, ast_parser.EXTRACTOR_VERSIONS)
+        with patch('backend.api.ast_parser.get_parse_cache', return_value=cache):
+            first = ast_parser.parse_code_source('a.py', 'def f():\n    pass\n')
+            with patch('backend.api.ast_parser.parse_python_source', side_effect=AssertionError('re-parsed')):
+                second = ast_parser.parse_code_source('other/b.py', 'def f():\n    pass\n')
+        self.assertEqual(first['functions'], ['f'])
+        self.assertEqual(second, first)
+
+if __name__ == '__main__':
+    unittest.main()
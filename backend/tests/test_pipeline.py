@@ -0,0 +1,40 @@
+import time
+import asyncio
+import unittest
+from backend.api.pipeline import run_pipeline, emit_from_thread
+
+class TestPipeline(unittest.TestCase):
+
+    def test_run_pipeline_applies_backpressure(self):
+        stored = []
+
+        async def produce(emit):
+            await emit_from_thread(lambda: ({'path': f'file{i}.py'} for i in range(50)), emit)
+            return {'produced': 50}
+
+        def parse_batch(records):
+            return [(record['path'], {'functions': []}) for record in records]
+
+        def store_batch(batch):
+            time.sleep(0.005)  # slow consumer
+            stored.extend(path for path, _ in batch)
+
+        produced, stats = asyncio.run(run_pipeline(produce, parse_batch, store_batch,
+                                                   queue_size=4, parse_workers=2, batch_size=2))
+
+        self.assertEqual(produced, {'produced': 50})
+        self.assertEqual(sorted(stored), sorted(f'file{i}.py' for i in range(50)))
+        self.assertLessEqual(stats['queues']['fetched']['max_depth'], 4)
+        self.assertGreater(stats['queues']['fetched']['blocked_puts'], 0)
+        self.assertIsNotNone(stats['time_to_first_result'])
+
+    def test_run_pipeline_propagates_errors(self):
+        async def produce(emit):
+            await emit({'path': 'a.py'})
+            raise RuntimeError("fetch failed")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run_pipeline(produce, lambda records: [], lambda batch: None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,9 @@ const API = axios.create({
 });
 
 export const uploadRepo = (repoUrl) => API.post('/api/upload_repo', { repo_url: repoUrl });
-export const queryChatbot = (query, context) => API.post('/api/chat', { query, context });
-export const fetchContext = () => API.get('/api/context');
+export const queryChatbot = (query, repo) => API.post('/api/chat', { query, repo });
+export const fetchContext = (repo) => API.get('/api/context', { params: { repo } });
+export const fetchGraphLevel = (repo, level, expand = []) =>
+  API.get('/api/graph_levels', { params: { repo, level, expand }, paramsSerializer: { indexes: null } });
 
 export default API;
@@ -11,26 +11,13 @@ const ListRenderer = ({ items }) => (
   </ul>
 );
 
-const Chatbot = () => {
+const Chatbot = ({ repo }) => {
   const [query, setQuery] = useState('');
-  const [context, setContext] = useState({});
   const [chatHistory, setChatHistory] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
   const chatContainerRef = useRef(null);
   const textareaRef = useRef(null);
 
-  useEffect(() => {
-    const fetchContext = async () => {
-      try {
-        const contextResponse = await axios.get('http://localhost:8000/api/context');
-        setContext(contextResponse.data);
-      } catch (error) {
-        console.error('Error fetching context:', error);
-      }
-    };
-    fetchContext();
-  }, []);
-
   useEffect(() => {
     if (chatContainerRef.current) {
       chatContainerRef.current.scrollTop = chatContainerRef.current.scrollHeight;
@@ -46,7 +33,7 @@ const Chatbot = () => {
     setIsLoading(true);
 
     try {
-      const res = await axios.post('http://localhost:8000/api/query', { query: currentQuery, context });
+      const res = await axios.post('http://localhost:8000/api/query', { query: currentQuery, repo });
       setChatHistory(prevHistory => [...prevHistory, { type: 'bot', text: res.data.response }]);
     } catch (error) {
       setChatHistory(prevHistory => [...prevHistory, { type: 'bot', text: 'Error querying Visdep' }]);
@@ -1,9 +1,9 @@
 // frontend/src/components/dependencygraph.jsx
 import React, { useEffect, useRef, useState, useCallback } from 'react';
 import { Network, DataSet } from 'vis-network/standalone';
-import axios from 'axios';
+import { fetchGraphLevel } from '../api';
 
-const DependencyGraph = () => {
+const DependencyGraph = ({ repo }) => {
   const networkRef = useRef(null);
   const [network, setNetwork] = useState(null);
   const [graphData, setGraphData] = useState(null);
@@ -16,12 +16,13 @@ const DependencyGraph = () => {
   const [isLegendMinimized, setIsLegendMinimized] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [currentLevel, setCurrentLevel] = useState(1);
+  // Directory supernodes opened by double-clicking them, reset when the level changes
+  const [expanded, setExpanded] = useState([]);
   
 
   const renderGraph = useCallback((data, level) => {
-    const filteredNodes = data.nodes.filter(node => 
-      selectedNodeTypes[node.type] && node.level <= level
-    );
+    // Levels are collapsed on the server; only the legend's type toggles apply here
+    const filteredNodes = data.nodes.filter(node => selectedNodeTypes[node.type] !== false);
     const nodes = new DataSet(filteredNodes.map(node => ({
       ...node,
       shape: getNodeShape(node.type),
@@ -143,6 +144,15 @@ const DependencyGraph = () => {
       newNetwork.body.nodes[nodeId].options.title = tooltipContent;
     });
   
+    newNetwork.on('doubleClick', (params) => {
+      if (params.nodes.length > 0) {
+        const node = nodes.get(params.nodes[0]);
+        if (node && node.expandable) {
+          setExpanded(prev => (prev.includes(node.id) ? prev : [...prev, node.id]));
+        }
+      }
+    });
+
     newNetwork.on('click', (params) => {
       if (params.nodes.length > 0) {
         const clickedNodeId = params.nodes[0];
@@ -157,8 +167,11 @@ const DependencyGraph = () => {
   useEffect(() => {
     const fetchGraphData = async () => {
       try {
-        const response = await axios.get('http://localhost:8000/api/dependency_graph');
-        const data = response.data;
+        const response = await fetchGraphLevel(repo, currentLevel - 1, expanded);
+        const data = {
+          ...response.data,
+          edges: response.data.edges.map(edge => ({ ...edge, relation: edge.count > 1 ? 'multiple' : 'imports' })),
+        };
         setGraphData(data);
         renderGraph(data, currentLevel);
       } catch (error) {
@@ -167,7 +180,7 @@ const DependencyGraph = () => {
     };
 
     fetchGraphData();
-  }, [renderGraph, currentLevel]);
+  }, [renderGraph, currentLevel, expanded, repo]);
 
   const highlightConnectedNodes = (nodeId, network) => {
     const connectedNodeIds = network.getConnectedNodes(nodeId);
@@ -212,7 +225,8 @@ const DependencyGraph = () => {
         const currentNodeId = queue.shift();
         const currentNode = graphData.nodes.find(node => node.id === currentNodeId);
 
-        if (currentNode.type === 'file') {
+        // Collapsed or expanded directories along a file's path may not be in the view
+        if (currentNode && currentNode.type === 'file') {
           let dirPath = currentNodeId.split('/').slice(0, -1).join('/');
           while (dirPath) {
             addNodeAndRelated(dirPath);
@@ -352,12 +366,12 @@ const DependencyGraph = () => {
           </button>
         </div>
         <div className="flex items-center ml-4">
-          <button onClick={() => setCurrentLevel(prev => prev + 1)} className="p-2 bg-gray-200 hover:bg-gray-300 transition-colors" title="Increase Level">
+          <button onClick={() => { setExpanded([]); setCurrentLevel(prev => Math.min(prev + 1, graphData ? graphData.levels : prev + 1)); }} className="p-2 bg-gray-200 hover:bg-gray-300 transition-colors" title="Increase Level">
             <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg">
               <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M12 4v16m8-8H4" />
             </svg>
           </button>
-          <button onClick={() => setCurrentLevel(prev => Math.max(prev - 1, 1))} className="p-2 bg-gray-200 hover:bg-gray-300 transition-colors" title="Decrease Level">
+          <button onClick={() => { setExpanded([]); setCurrentLevel(prev => Math.max(prev - 1, 1)); }} className="p-2 bg-gray-200 hover:bg-gray-300 transition-colors" title="Decrease Level">
             <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg">
               <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M20 12H4" />
             </svg>
@@ -408,6 +422,7 @@ const nodeTypes = {
   file: { border: '#2980b9', background: '#e0f7fa' },
   import: { border: '#27ae60', background: '#e9f7ef' },
   package: { border: '#f39c12', background: '#fef5e7' },
+  more: { border: '#7f8c8d', background: '#f8f9f9' },
   default: { border: '#95a5a6', background: '#f4f6f6' },
 };
 
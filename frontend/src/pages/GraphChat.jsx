@@ -1,12 +1,14 @@
 // frontend/src/pages/graphchat.jsx
 import React, { useState, useCallback, useEffect } from 'react';
-import { useNavigate } from 'react-router-dom';
+import { useNavigate, useSearchParams } from 'react-router-dom';
 import DependencyGraph from '../components/DependencyGraph';
 import Chatbot from '../components/Chatbot';
 
 const GraphChat = () => {
   const [graphWidth, setGraphWidth] = useState(65);
   const navigate = useNavigate();
+  const [searchParams] = useSearchParams();
+  const repo = searchParams.get('repo');
 
   const handleResize = useCallback((e) => {
     const newWidth = (e.clientX / window.innerWidth) * 100;
@@ -40,7 +42,7 @@ const GraphChat = () => {
       <div className="flex flex-1 overflow-hidden">
         <div style={{ width: `${graphWidth}%` }} className="bg-white shadow-lg">
           <div className="h-full">
-            <DependencyGraph />
+            <DependencyGraph repo={repo} />
           </div>
         </div>
         <div
@@ -48,7 +50,7 @@ const GraphChat = () => {
           onMouseDown={() => document.addEventListener('mousemove', handleResize)}
         />
         <div style={{ width: `${100 - graphWidth}%` }} className="bg-white shadow-lg flex flex-col">
-          <Chatbot />
+          <Chatbot repo={repo} />
         </div>
       </div>
     </div>
@@ -18,7 +18,7 @@ const Home = () => {
         sub_directory: subDirectory.trim() || undefined
       });
       setMessage(response.data.message);
-      setTimeout(() => navigate('/graph-chat'), 2000);
+      setTimeout(() => navigate(`/graph-chat?repo=${response.data.repo_id}`), 2000);
     } catch (error) {
       setMessage('Error uploading repository');
       setIsLoading(false);